@@ -0,0 +1,41 @@
+# Copyright (C) 2022 Indoc Research
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from fastapi import APIRouter, Depends
+from fastapi_utils import cbv
+
+from app.auth import jwt_required
+from models.api_response import APIResponse, EAPIResponseCode
+from resources.cache import get_caches
+
+router = APIRouter(tags=["Admin"])
+
+
+@cbv.cbv(router)
+class CacheStats:
+    current_identity: dict = Depends(jwt_required)
+
+    @router.get(
+        '/admin/cache/stats',
+        summary="Get size and hit/miss counters of in-process caches",
+    )
+    async def get(self):
+        api_response = APIResponse()
+        if self.current_identity["role"] != "admin":
+            api_response.set_code(EAPIResponseCode.forbidden)
+            api_response.set_error_msg("Permission Denied")
+            return api_response.json_response()
+
+        api_response.set_result({name: cache.stats() for name, cache in get_caches().items()})
+        return api_response.json_response()
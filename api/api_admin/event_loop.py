@@ -0,0 +1,60 @@
+# Copyright (C) 2022 Indoc Research
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from fastapi import APIRouter, Depends, Query
+from fastapi_utils import cbv
+
+from app.auth import jwt_required
+from app.loop_watchdog import loop_watchdog
+from models.api_response import APIResponse, EAPIResponseCode
+
+router = APIRouter(tags=["Admin"])
+
+
+@cbv.cbv(router)
+class EventLoopStalls:
+    current_identity: dict = Depends(jwt_required)
+
+    def is_admin(self, api_response: APIResponse) -> bool:
+        if self.current_identity["role"] != "admin":
+            api_response.set_code(EAPIResponseCode.forbidden)
+            api_response.set_error_msg("Permission Denied")
+            return False
+        return True
+
+    @router.get(
+        '/admin/event-loop/stalls',
+        summary="Get routes that blocked the event loop the longest",
+    )
+    async def get(self, limit: int = Query(10, ge=1, le=100)):
+        api_response = APIResponse()
+        if not self.is_admin(api_response):
+            return api_response.json_response()
+
+        api_response.set_result({'watchdog': loop_watchdog.stats(), 'offenders': loop_watchdog.top_offenders(limit)})
+        return api_response.json_response()
+
+    @router.delete(
+        '/admin/event-loop/stalls',
+        summary="Reset collected event loop stalls",
+    )
+    async def delete(self):
+        api_response = APIResponse()
+        if not self.is_admin(api_response):
+            return api_response.json_response()
+
+        loop_watchdog.reset()
+        api_response.set_result('success')
+        return api_response.json_response()
@@ -0,0 +1,66 @@
+# Copyright (C) 2022 Indoc Research
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from common import LoggerFactory
+from fastapi import APIRouter, Depends
+from fastapi_utils import cbv
+
+from app.auth import jwt_required
+from models.api_response import APIResponse, EAPIResponseCode
+from services.permissions_service.matrix import permission_matrix
+
+_logger = LoggerFactory('api_admin_permissions').get_logger()
+
+router = APIRouter(tags=["Admin"])
+
+
+@cbv.cbv(router)
+class PermissionMatrixAdmin:
+    current_identity: dict = Depends(jwt_required)
+
+    @router.get(
+        '/admin/permissions/matrix',
+        summary="Get state of the in-process permission matrix",
+    )
+    async def get(self):
+        api_response = APIResponse()
+        if self.current_identity["role"] != "admin":
+            api_response.set_code(EAPIResponseCode.forbidden)
+            api_response.set_error_msg("Permission Denied")
+            return api_response.json_response()
+
+        api_response.set_result(permission_matrix.stats())
+        return api_response.json_response()
+
+    @router.post(
+        '/admin/permissions/refresh',
+        summary="Reload the permission matrix from the auth service in all workers",
+    )
+    async def post(self):
+        api_response = APIResponse()
+        if self.current_identity["role"] != "admin":
+            api_response.set_code(EAPIResponseCode.forbidden)
+            api_response.set_error_msg("Permission Denied")
+            return api_response.json_response()
+
+        try:
+            await permission_matrix.refresh_all_workers()
+        except Exception as e:
+            _logger.error(f"Error refreshing permission matrix: {e}")
+            api_response.set_code(EAPIResponseCode.internal_error)
+            api_response.set_error_msg(f"Error refreshing permission matrix: {e}")
+            return api_response.json_response()
+
+        api_response.set_result(permission_matrix.stats())
+        return api_response.json_response()
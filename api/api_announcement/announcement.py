@@ -12,7 +12,6 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-import requests
 from common import ProjectClient
 from fastapi import APIRouter, Depends, Request
 from fastapi.responses import JSONResponse
@@ -21,6 +20,8 @@ from fastapi_utils import cbv
 from app.auth import jwt_required
 from config import ConfigClass
 from models.api_response import APIResponse, EAPIResponseCode
+from resources.request_body import get_request_json
+from resources.upstream import upstream_clients
 from services.permissions_service.decorators import PermissionsCheck
 
 router = APIRouter(tags=["Announcements"])
@@ -43,7 +44,7 @@ class AnnouncementRestful:
             api_response.set_code(EAPIResponseCode.bad_request)
             return api_response.json_response()
 
-        response = requests.get(ConfigClass.NOTIFY_SERVICE + "announcements", params=data)
+        response = await upstream_clients.get('notify').get(ConfigClass.NOTIFY_SERVICE + "announcements", params=data)
         if response.status_code != 200:
             api_response.set_error_msg(response.json())
             return api_response.json_response()
@@ -57,7 +58,7 @@ class AnnouncementRestful:
     )
     async def post(self, request: Request):
         api_response = APIResponse()
-        data = await request.json()
+        data = await get_request_json(request)
         if not data.get("project_code"):
             api_response.set_error_msg("Missing project code")
             api_response.set_code(EAPIResponseCode.bad_request)
@@ -71,7 +72,7 @@ class AnnouncementRestful:
         await project_client.get(code=data["project_code"])
 
         data["publisher"] = self.current_identity["username"]
-        response = requests.post(ConfigClass.NOTIFY_SERVICE + "announcements", json=data)
+        response = await upstream_clients.get('notify').post(ConfigClass.NOTIFY_SERVICE + "announcements", json=data)
         if response.status_code != 200:
             api_response.set_error_msg(response.json()["error_msg"])
             response_dict = api_response.to_dict
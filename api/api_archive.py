@@ -12,7 +12,6 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-import requests
 from common import LoggerFactory
 from fastapi import APIRouter, Depends
 from fastapi.responses import JSONResponse
@@ -21,6 +20,7 @@ from fastapi_utils import cbv
 from app.auth import jwt_required
 from config import ConfigClass
 from models.api_response import APIResponse, EAPIResponseCode
+from resources.upstream import upstream_clients
 from services.permissions_service.utils import get_project_role, has_permission
 
 router = APIRouter(tags=["Archive"])
@@ -36,12 +36,12 @@ class Archive:
         '/archive',
         summary="Get a zip preview given file id",
     )
-    def get(self, file_id: str):
+    async def get(self, file_id: str):
         _logger.info("GET archive called in bff")
         api_response = APIResponse()
 
         # Retrieve file info from metadata service
-        request = requests.get(f"{ConfigClass.METADATA_SERVICE}item/{file_id}")
+        request = await upstream_clients.get('metadata').get(f"{ConfigClass.METADATA_SERVICE}item/{file_id}")
         file_response = request.json()["result"]
         if not file_response:
             _logger.error(f"File not found with following id: {file_id}")
@@ -55,7 +55,7 @@ class Archive:
             zone = 'core'
 
         project_code = file_response["container_code"]
-        if not has_permission(project_code, 'file', zone, 'view', self.current_identity):
+        if not await has_permission(project_code, 'file', zone, 'view', self.current_identity):
             api_response.set_code(EAPIResponseCode.forbidden)
             api_response.set_result("Permission Denied")
             return api_response.json_response()
@@ -66,7 +66,9 @@ class Archive:
             return api_response.json_response()
 
         try:
-            response = requests.get(ConfigClass.DATAOPS_SERVICE + "archive", params={"file_id": file_id})
+            response = await upstream_clients.get('dataops').get(
+                ConfigClass.DATAOPS_SERVICE + "archive", params={"file_id": file_id}
+            )
         except Exception as e:
             _logger.info(f"Error calling dataops gr: {str(e)}")
             return JSONResponse(content=response.json(), status_code=response.status_code)
@@ -12,17 +12,17 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-import jwt as pyjwt
-import requests
 from common import LoggerFactory, ProjectClient
 from fastapi import APIRouter, Depends, Request
 from fastapi.responses import JSONResponse
 from fastapi_utils import cbv
 
-from app.auth import jwt_required
+from app.auth import decode_token, invalidate_identity, jwt_required
 from config import ConfigClass
 from models.api_response import EAPIResponseCode
 from resources.error_handler import APIException
+from resources.request_body import get_request_json
+from resources.upstream import forward_headers, upstream_clients
 from services.notifier_services.email_service import SrvEmail
 
 # init logger
@@ -41,10 +41,10 @@ class LastLoginRestful:
     )
     async def put(self, request: Request):
         try:
-            payload = await request.json()
+            payload = await get_request_json(request)
             # the auth api will format the last_login as "%Y-%m-%dT%H:%M:%S"
             payload.update({"last_login": True})
-            res = requests.put(ConfigClass.AUTH_SERVICE + 'admin/user', json=payload)
+            res = await upstream_clients.get('auth').put(ConfigClass.AUTH_SERVICE + 'admin/user', json=payload)
             return JSONResponse(content=res.json(), status_code=res.status_code)
         except Exception as e:
             return JSONResponse(content={'result': str(e)}, status_code=403)
@@ -56,18 +56,18 @@ class UserStatus:
         '/user/status',
         summary="Get users status given the email",
     )
-    def get(self, request: Request):
+    async def get(self, request: Request):
         try:
             token = request.headers.get('Authorization')
             token = token.split()[-1]
-            decoded = pyjwt.decode(token, verify=False)
+            decoded = await decode_token(token)
             email = decoded["email"]
         except Exception as e:
             return JSONResponse(content={'result': "JWT user status error " + str(e)}, status_code=500)
 
         try:
             payload = {"email": email}
-            response = requests.get(ConfigClass.AUTH_SERVICE + "admin/user", params=payload)
+            response = await upstream_clients.get('auth').get(ConfigClass.AUTH_SERVICE + "admin/user", params=payload)
             if not response.json()["result"]:
                 return JSONResponse(content="User not found", status_code=404)
             status = response.json()["result"]["attributes"]["status"]
@@ -92,7 +92,7 @@ class UserAccount:
     )
     async def put(self, request: Request):
         try:
-            req_body = await request.json()
+            req_body = await get_request_json(request)
             operation_type = req_body.get('operation_type', None)
             user_email = req_body.get('user_email', None)
             user_id = req_body.get('user_id', None)
@@ -124,12 +124,15 @@ class UserAccount:
                 "payload": operation_payload,
                 "operator": self.current_identity["username"],
             }
-            headers = request.headers
-            response = requests.put(ConfigClass.AUTH_SERVICE + "user/account", json=payload, headers=headers)
+            response = await upstream_clients.get('auth').put(
+                ConfigClass.AUTH_SERVICE + "user/account", json=payload, headers=forward_headers(request)
+            )
+            if response.status_code == 200:
+                await invalidate_identity(email=user_email, user_id=user_id)
 
             # send email
             payload = {"email": user_email}
-            response = requests.get(ConfigClass.AUTH_SERVICE + "admin/user", params=payload)
+            response = await upstream_clients.get('auth').get(ConfigClass.AUTH_SERVICE + "admin/user", params=payload)
             user_info = response.json()["result"]
             if operation_type == "enable":
                 subject = "User enabled"
@@ -188,9 +191,9 @@ class UserAccount:
             projects = result["result"]
             project_codes = [i.code for i in projects]
             page += 1
-            self.bulk_create_folder_usernamespace(username, project_codes)
+            await self.bulk_create_folder_usernamespace(username, project_codes)
 
-    def bulk_create_folder_usernamespace(self, username: str, project_codes: list):
+    async def bulk_create_folder_usernamespace(self, username: str, project_codes: list):
         try:
             zone_list = ["greenroom", "core"]
             folders = []
@@ -209,7 +212,9 @@ class UserAccount:
                     })
 
             payload = {"items": folders, "skip_duplicates": True}
-            res = requests.post(ConfigClass.METADATA_SERVICE + 'items/batch/', json=payload)
+            res = await upstream_clients.get('metadata').post(
+                ConfigClass.METADATA_SERVICE + 'items/batch/', json=payload
+            )
             if res.status_code != 200:
                 raise APIException(status_code=EAPIResponseCode.internal_error.value, error_msg=res.json())
 
@@ -18,6 +18,7 @@ from fastapi_utils import cbv
 
 from models.api_response import APIResponse, EAPIResponseCode
 from models.contact_us import ContactUsForm
+from resources.request_body import get_request_json
 from services.contact_us_services.contact_us_manager import SrvContactUsManager
 
 router = APIRouter(tags=["Contact Us"])
@@ -30,14 +31,14 @@ class ContactUsRestful:
         '/contact',
         summary="Sends a contact us message",
     )
-    def post(self, request: Request):
+    async def post(self, request: Request):
         _logger = LoggerFactory('api_contact_us').get_logger()
         my_res = APIResponse()
-        post_json = request.json()
+        post_json = await get_request_json(request)
         _logger.info("Start Creating Contact Us Email: {}".format(post_json))
         contact_form = ContactUsForm(post_json)
         contact_mgr = SrvContactUsManager()
-        contact_mgr.send_contact_us_email(contact_form)
+        await contact_mgr.send_contact_us_email(contact_form)
         my_res.set_result('[SUCCEED] Contact us Email Sent')
         _logger.info('Contact Us Email Sent')
         my_res.set_code(EAPIResponseCode.success)
@@ -12,14 +12,15 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-import jwt as pyjwt
-import requests
 from common import ProjectClient, LoggerFactory
 from fastapi import APIRouter, Request
 from fastapi.responses import JSONResponse
 from fastapi_utils import cbv
 
+from app.auth import decode_token, invalidate_identity
 from config import ConfigClass
+from resources.request_body import get_request_json
+from resources.upstream import upstream_clients
 
 router = APIRouter(tags=["User Activate"])
 
@@ -41,14 +42,14 @@ class ADUserUpdate:
             # User is currently pending so jwt_required can't be used
             token = request.headers.get('Authorization')
             token = token.split()[-1]
-            decoded = pyjwt.decode(token, verify=False)
+            decoded = await decode_token(token)
             current_username = decoded["preferred_username"]
         except Exception as e:
             return {'result': "JWT user status error " + str(e)}, 500
 
         try:
             # validate payload request body
-            post_data = await request.json()
+            post_data = await get_request_json(request)
             logger.info('Calling API for updating AD user: {}'.format(post_data))
 
             email = post_data.get('email', None)
@@ -68,7 +69,9 @@ class ADUserUpdate:
             has_invite = True
             email = email.lower()
             filters = {"email": email, "status": "pending"}
-            response = requests.post(ConfigClass.AUTH_SERVICE + "invitation-list", json={"filters": filters})
+            response = await upstream_clients.get('auth').post(
+                ConfigClass.AUTH_SERVICE + "invitation-list", json={"filters": filters}
+            )
             if not response.json()["result"]:
                 # Test account requests won't have an invite, they're already linked to the test projectt
                 has_invite = False
@@ -79,56 +82,57 @@ class ADUserUpdate:
                 # The design has some implication here, if project == 'None' then
                 # role means platform_role, else role means the project_role
                 if invite_detail["platform_role"] == "admin":
-                    self.assign_user_role_ad("platform-admin", email=email)
+                    await self.assign_user_role_ad("platform-admin", email=email)
                     await self.bulk_create_name_folder_admin(username)
                 else:
                     if invite_detail["project_code"]:
                         project_client = ProjectClient(ConfigClass.PROJECT_SERVICE, ConfigClass.REDIS_URL)
                         project = await project_client.get(code=invite_detail["project_code"])
-                        self.assign_user_role_ad(project.code + '-' + invite_detail["project_role"], email=email)
-                        self.bulk_create_folder(folder_name=username, project_code_list=[project.code])
+                        await self.assign_user_role_ad(project.code + '-' + invite_detail["project_role"], email=email)
+                        await self.bulk_create_folder(folder_name=username, project_code_list=[project.code])
 
                 invite_id = invite_detail["id"]
-                response = requests.put(
+                response = await upstream_clients.get('auth').put(
                     ConfigClass.AUTH_SERVICE + f"invitation/{invite_id}",
                     json={"status": "complete"}
                 )
                 invite_detail = response.json()
 
             # update status/login
-            return self.update_user_status(email)
+            return await self.update_user_status(email)
         except Exception as error:
             logger.error(f"Error when updating user data : {error}")
 
             return {"result": {}, "error_msg": str(error)}
 
-    def update_user_status(self, email):
+    async def update_user_status(self, email):
         payload = {
             "operation_type": "enable",
             "user_email": email,
         }
-        response = requests.put(ConfigClass.AUTH_SERVICE + "user/account", json=payload)
+        response = await upstream_clients.get('auth').put(ConfigClass.AUTH_SERVICE + "user/account", json=payload)
         logger.info('Update user in auth results: %s', response.json())
         if response.status_code != 200:
             logger.info('Done with updating user node')
             raise (Exception('Internal error when updating user data'))
+        await invalidate_identity(email=email)
         return JSONResponse(content=response.json(), status_code=200)
 
-    def assign_user_role_ad(self, role: str, email):
+    async def assign_user_role_ad(self, role: str, email):
         url = ConfigClass.AUTH_SERVICE + "user/project-role"
         request_payload = {
             "email": email,
             "realm": ConfigClass.KEYCLOAK_REALM,
             "project_role": role
         }
-        response_assign = requests.post(
+        response_assign = await upstream_clients.get('auth').post(
             url, json=request_payload)
         if response_assign.status_code != 200:
             raise Exception('[Fatal]Assigned project_role Failed: {}: {}: {}'.format(email,
                                                                                      role,
                                                                                      response_assign.text))
 
-    def bulk_create_folder(self, folder_name: str, project_code_list: list):
+    async def bulk_create_folder(self, folder_name: str, project_code_list: list):
         try:
             logger.info(f"bulk creating namespace folder in greenroom \
                     and core for user : {folder_name} under {project_code_list}")
@@ -153,7 +157,9 @@ class ADUserUpdate:
                 "items": folders,
                 "skip_duplicates": True
             }
-            response = requests.post(ConfigClass.METADATA_SERVICE + "items/batch/", json=payload)
+            response = await upstream_clients.get('metadata').post(
+                ConfigClass.METADATA_SERVICE + "items/batch/", json=payload
+            )
             if response.status_code == 200:
                 logger.info(f"In namespace: {zone}, folders bulk created successfully for user: {folder_name} \
                         under {project_code_list}")
@@ -176,7 +182,7 @@ class ADUserUpdate:
             projects = project_result["result"]
             for project in projects:
                 project_code_list.append(project.code)
-            self.bulk_create_folder(folder_name=username, project_code_list=project_code_list)
+            await self.bulk_create_folder(folder_name=username, project_code_list=project_code_list)
             return False
         except Exception as error:
             logger.error(f"Error while querying Container details : {error}")
@@ -12,7 +12,6 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-import requests
 from common import LoggerFactory, ProjectClient
 from fastapi import APIRouter, Depends, Request
 from fastapi.responses import JSONResponse
@@ -23,6 +22,8 @@ from config import ConfigClass
 from models.api_response import EAPIResponseCode
 from models.user_type import map_role_to_frontend
 from resources.error_handler import APIException
+from resources.request_body import get_request_json
+from resources.upstream import upstream_clients
 from resources.utils import (add_user_to_ad_group,
                              remove_user_from_project_group)
 from services.notifier_services.email_service import SrvEmail
@@ -49,7 +50,7 @@ class ContainerUser:
         logger.info('Call API for adding user {} to project {}'.format(username, str(project_id)))
 
         # Check if permission is provided
-        data = await request.json()
+        data = await get_request_json(request)
         role = data.get("role", None)
         if role is None:
             logger.error('Error: user\'s role is required.')
@@ -59,13 +60,13 @@ class ContainerUser:
         project = await project_client.get(id=project_id)
 
         # validate user and relationship
-        user = validate_user(username)
+        user = await validate_user(username)
         user_email = user["email"]
 
         # add user to ad group
         if user["role"] != "admin":
             try:
-                add_user_to_ad_group(user_email, project.code, logger)
+                await add_user_to_ad_group(user_email, project.code, logger)
             except Exception as error:
                 error = f'Error adding user to group {ConfigClass.AD_PROJECT_GROUP_PREFIX}{project.code}: ' + str(
                     error)
@@ -73,7 +74,7 @@ class ContainerUser:
                 return JSONResponse(content={'result': error}, status_code=500)
 
         # keycloak user role update
-        is_updated, response, code = keycloak_user_role_update(
+        is_updated, response, code = await keycloak_user_role_update(
             "add",
             user_email,
             f"{project.code}-{role}",
@@ -102,7 +103,7 @@ class ContainerUser:
 
         logger.info(f'Call API for changing user {username} role in project {project_id}')
 
-        data = await request.json()
+        data = await get_request_json(request)
         old_role = data.get("old_role", None)
         new_role = data.get("new_role", None)
         is_valid, res_valid, code = validate_payload(
@@ -118,11 +119,11 @@ class ContainerUser:
         project = await project_client.get(id=project_id)
 
         # validate user
-        user = validate_user(username)
+        user = await validate_user(username)
         user_email = user["email"]
 
         # keycloak user role update
-        is_updated, response, code = keycloak_user_role_update(
+        is_updated, response, code = await keycloak_user_role_update(
             "change",
             user_email,
             f"{project.code}-{new_role}",
@@ -149,12 +150,14 @@ class ContainerUser:
         """
         logger.info(f'Call API for removing user {username} from project {project_id}')
 
-        user = validate_user(username)
+        user = await validate_user(username)
         user_email = user["email"]
 
         project_client = ProjectClient(ConfigClass.PROJECT_SERVICE, ConfigClass.REDIS_URL)
         project = await project_client.get(id=project_id)
-        response = requests.get(ConfigClass.AUTH_SERVICE + "admin/users/realm-roles", params={"username": username})
+        response = await upstream_clients.get('auth').get(
+            ConfigClass.AUTH_SERVICE + "admin/users/realm-roles", params={"username": username}
+        )
         if response.status_code != 200:
             raise Exception(str(response.__dict__))
 
@@ -169,9 +172,9 @@ class ContainerUser:
             raise Exception("Cannot find user permission in project")
 
         # remove from ad group
-        remove_user_from_project_group(project.code, user_email, logger)
+        await remove_user_from_project_group(project.code, user_email, logger)
         # keycloak user role delete
-        keycloak_user_role_delete(
+        await keycloak_user_role_delete(
             user_email,
             f"{project.code}-{project_role}",
             project.code,
@@ -192,7 +195,7 @@ def validate_payload(old_role, new_role, username, current_identity):
     return True, {}, 200
 
 
-def keycloak_user_role_delete(user_email: str, role: str, project_code: str, operator: str):
+async def keycloak_user_role_delete(user_email: str, role: str, project_code: str, operator: str):
     payload = {
         "realm": ConfigClass.KEYCLOAK_REALM,
         "email": user_email,
@@ -200,13 +203,15 @@ def keycloak_user_role_delete(user_email: str, role: str, project_code: str, ope
         "project_code": project_code,
         "operator": operator,
     }
-    response = requests.delete(ConfigClass.AUTH_SERVICE + "user/project-role", json=payload)
+    response = await upstream_clients.get('auth').request(
+        "DELETE", ConfigClass.AUTH_SERVICE + "user/project-role", json=payload
+    )
     if response.status_code != 200:
         raise Exception("Error assigning project role" + str(response.__dict__))
     return response
 
 
-def keycloak_user_role_update(operation: str, user_email: str, role: str, project_code: str, operator: str):
+async def keycloak_user_role_update(operation: str, user_email: str, role: str, project_code: str, operator: str):
     payload = {
         "realm": ConfigClass.KEYCLOAK_REALM,
         "email": user_email,
@@ -216,9 +221,9 @@ def keycloak_user_role_update(operation: str, user_email: str, role: str, projec
     }
     if operation == "add":
         payload["invite_event"] = True
-        response = requests.post(ConfigClass.AUTH_SERVICE + "user/project-role", json=payload)
+        response = await upstream_clients.get('auth').post(ConfigClass.AUTH_SERVICE + "user/project-role", json=payload)
     else:
-        response = requests.put(ConfigClass.AUTH_SERVICE + "user/project-role", json=payload)
+        response = await upstream_clients.get('auth').put(ConfigClass.AUTH_SERVICE + "user/project-role", json=payload)
     if response.status_code != 200:
         return False, {'result': "Error assigning project role" + str(response.text)}, response.status_code
     return True, None, 200
@@ -248,9 +253,9 @@ def send_email_user(user, dataset_name, username, role, title, template, current
         logger.error('email service: {}'.format(str(e)))
 
 
-def validate_user(username: str) -> dict:
+async def validate_user(username: str) -> dict:
     payload = {"username": username}
-    response = requests.get(ConfigClass.AUTH_SERVICE + "admin/user", params=payload)
+    response = await upstream_clients.get('auth').get(ConfigClass.AUTH_SERVICE + "admin/user", params=payload)
     if not response.json()["result"]:
         raise APIException(status_code=EAPIResponseCode.not_found.value, error_msg="User not found")
     return response.json()["result"]
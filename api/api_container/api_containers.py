@@ -19,6 +19,7 @@ from fastapi_utils import cbv
 from app.auth import jwt_required
 from config import ConfigClass
 from models.api_response import APIResponse
+from resources.request_body import get_request_json
 
 logger = LoggerFactory('api_containers').get_logger()
 
@@ -95,7 +96,7 @@ class Container:
         '''
         logger.info("Calling Container put")
         api_response = APIResponse()
-        update_data = await request.json()
+        update_data = await get_request_json(request)
         project_client = ProjectClient(ConfigClass.PROJECT_SERVICE, ConfigClass.REDIS_URL)
         project = await project_client.get(id=project_id)
 
@@ -13,7 +13,6 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """Folder creation API."""
-import httpx
 from common import LoggerFactory
 from fastapi import APIRouter, Depends, Request
 from fastapi.responses import JSONResponse
@@ -22,6 +21,8 @@ from fastapi_utils import cbv
 from app.auth import jwt_required
 from config import ConfigClass
 from models.api_response import APIResponse, EAPIResponseCode
+from resources.request_body import get_request_json
+from resources.upstream import upstream_clients
 from services.meta import search_entities
 from services.permissions_service.decorators import PermissionsCheck
 
@@ -42,7 +43,7 @@ class FolderCreation:
     )
     async def post(self, project_id: str, request: Request):
         api_response = APIResponse()
-        data = await request.json()
+        data = await get_request_json(request)
         folder_name = data.get("folder_name")
         project_code = data.get("project_code")
         zone = data.get("zone")
@@ -58,7 +59,7 @@ class FolderCreation:
             # ensure parent_path exists
             search_parent_path = ".".join(parent_path.split(".")[:-1])
             name = "".join(parent_path.split(".")[-1])
-            parent_entity = search_entities(project_code, search_parent_path, zone, name=name)
+            parent_entity = await search_entities(project_code, search_parent_path, zone, name=name)
             parent_entity = parent_entity[0]
 
         if len(folder_name) < 1 or len(folder_name) > 20:
@@ -85,6 +86,6 @@ class FolderCreation:
                 # name folder
                 payload["parent_path"] = parent_entity["name"]
 
-        with httpx.Client() as client:
-            response = client.post(ConfigClass.METADATA_SERVICE + "item/", json=payload)
+        client = upstream_clients.get('metadata')
+        response = await client.post(ConfigClass.METADATA_SERVICE + "item/", json=payload)
         return JSONResponse(content=response.json(), status_code=response.status_code)
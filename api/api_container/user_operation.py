@@ -15,7 +15,6 @@
 import math
 from datetime import datetime
 
-import requests
 from common import LoggerFactory, ProjectClient
 from fastapi import APIRouter, Depends, Request
 from fastapi.responses import JSONResponse
@@ -24,6 +23,8 @@ from fastapi_utils import cbv
 from app.auth import jwt_required
 from config import ConfigClass
 from models.api_response import APIResponse, EAPIResponseCode
+from resources.request_body import get_request_json
+from resources.upstream import upstream_clients
 from services.permissions_service.decorators import PermissionsCheck
 
 # init logger
@@ -60,7 +61,7 @@ class Users:
             }
             # remove empty values
             data = {k: v for k, v in data.items() if v}
-            response = requests.get(ConfigClass.AUTH_SERVICE + "users", params=data)
+            response = await upstream_clients.get('auth').get(ConfigClass.AUTH_SERVICE + "users", params=data)
         except Exception as e:
             api_response.set_error_msg(f"Error get users from auth service: {str(e)}")
             api_response.set_code(EAPIResponseCode.internal_error)
@@ -89,7 +90,7 @@ class ContainerAdmins:
             "role_names": [f"{project.code}-admin"],
             "status": "active",
         }
-        response = requests.post(ConfigClass.AUTH_SERVICE + "admin/roles/users", json=payload)
+        response = await upstream_clients.get('auth').post(ConfigClass.AUTH_SERVICE + "admin/roles/users", json=payload)
         return JSONResponse(content=response.json(), status_code=response.status_code)
 
 
@@ -122,7 +123,7 @@ class ContainerUsers:
             "order_by": data.get("order_by", "time_created"),
             "order_type": data.get("order_type", "desc"),
         }
-        response = requests.post(ConfigClass.AUTH_SERVICE + "admin/roles/users", json=payload)
+        response = await upstream_clients.get('auth').post(ConfigClass.AUTH_SERVICE + "admin/roles/users", json=payload)
         return JSONResponse(content=response.json(), status_code=response.status_code)
 
 
@@ -139,7 +140,7 @@ class UserContainerQuery:
         This method allow user to get the user's permission towards all containers (except default).
         '''
         _logger.info('Call API for fetching user {} role towards all projects'.format(username))
-        data = await request.json()
+        data = await get_request_json(request)
 
         name = None
         if data.get("name"):
@@ -167,12 +168,14 @@ class UserContainerQuery:
             "username": username,
             "exact": True,
         }
-        response = requests.get(ConfigClass.AUTH_SERVICE + "admin/user", params=query)
+        response = await upstream_clients.get('auth').get(ConfigClass.AUTH_SERVICE + "admin/user", params=query)
         if response.status_code != 200:
             raise Exception(f"Error getting user {username} from auth service: " + str(response.json()))
         user_node = response.json()["result"]
 
-        response = requests.get(ConfigClass.AUTH_SERVICE + "admin/users/realm-roles", params=query)
+        response = await upstream_clients.get('auth').get(
+            ConfigClass.AUTH_SERVICE + "admin/users/realm-roles", params=query
+        )
         if response.status_code != 200:
             raise Exception(f"Error getting realm roles for {username} from auth service: " + str(response.json()))
         realm_roles = {}
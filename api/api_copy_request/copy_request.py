@@ -12,7 +12,6 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-import requests
 from fastapi import APIRouter, Depends, Request
 from fastapi.responses import JSONResponse
 from fastapi_utils import cbv
@@ -20,6 +19,8 @@ from fastapi_utils import cbv
 from app.auth import jwt_required
 from config import ConfigClass
 from models.api_response import APIResponse, EAPIResponseCode
+from resources.request_body import get_request_json
+from resources.upstream import forward_headers, upstream_clients
 from services.permissions_service.decorators import PermissionsCheck
 from services.permissions_service.utils import get_project_role
 
@@ -42,7 +43,9 @@ class CopyRequest:
             data["submitted_by"] = self.current_identity["username"]
 
         try:
-            response = requests.get(ConfigClass.APPROVAL_SERVICE + f"request/copy/{project_code}", params=data)
+            response = await upstream_clients.get('approval').get(
+                ConfigClass.APPROVAL_SERVICE + f"request/copy/{project_code}", params=data
+            )
         except Exception as e:
             api_response.set_error_msg(f"Error calling request copy API: {str(e)}")
             return api_response.json_response()
@@ -55,7 +58,7 @@ class CopyRequest:
     )
     async def post(self, project_code: str, request: Request):
         api_response = APIResponse()
-        data = await request.json()
+        data = await get_request_json(request)
 
         if self.current_identity["role"] == "admin":
             # Platform admin can't create request
@@ -66,7 +69,9 @@ class CopyRequest:
         data["submitted_by"] = self.current_identity["username"]
         data["project_code"] = project_code
         try:
-            response = requests.post(ConfigClass.APPROVAL_SERVICE + f"request/copy/{project_code}", json=data)
+            response = await upstream_clients.get('approval').post(
+                ConfigClass.APPROVAL_SERVICE + f"request/copy/{project_code}", json=data
+            )
         except Exception as e:
             api_response.set_error_msg(f"Error calling request copy API: {str(e)}")
             return api_response.json_response()
@@ -79,12 +84,14 @@ class CopyRequest:
     )
     async def put(self, project_code: str, request: Request):
         api_response = APIResponse()
-        data = await request.json()
+        data = await get_request_json(request)
         put_data = data.copy()
         put_data["username"] = self.current_identity["username"]
 
         try:
-            response = requests.put(ConfigClass.APPROVAL_SERVICE + f"request/copy/{project_code}", json=put_data)
+            response = await upstream_clients.get('approval').put(
+                ConfigClass.APPROVAL_SERVICE + f"request/copy/{project_code}", json=put_data
+            )
         except Exception as e:
             api_response.set_error_msg(f"Error calling request copy API: {str(e)}")
             return api_response.json_response()
@@ -105,7 +112,9 @@ class CopyRequestFiles:
         data = request.query_params
 
         try:
-            response = requests.get(ConfigClass.APPROVAL_SERVICE + f"request/copy/{project_code}/files", params=data)
+            response = await upstream_clients.get('approval').get(
+                ConfigClass.APPROVAL_SERVICE + f"request/copy/{project_code}/files", params=data
+            )
         except Exception as e:
             api_response.set_error_msg(f"Error calling request copy API: {str(e)}")
             return api_response.json_response()
@@ -118,15 +127,15 @@ class CopyRequestFiles:
     )
     async def put(self, project_code: str, request: Request):
         api_response = APIResponse()
-        data = await request.json()
+        data = await get_request_json(request)
         post_data = data.copy()
         post_data["username"] = self.current_identity["username"]
 
         try:
-            response = requests.put(
+            response = await upstream_clients.get('approval').put(
                 ConfigClass.APPROVAL_SERVICE + f"request/copy/{project_code}/files",
                 json=post_data,
-                headers=request.headers
+                headers=forward_headers(request)
             )
         except Exception as e:
             api_response.set_error_msg(f"Error calling request copy API: {str(e)}")
@@ -140,15 +149,15 @@ class CopyRequestFiles:
     )
     async def patch(self, project_code: str, request: Request):
         api_response = APIResponse()
-        data = await request.json()
+        data = await get_request_json(request)
         post_data = data.copy()
         post_data["username"] = self.current_identity["username"]
 
         try:
-            response = requests.patch(
+            response = await upstream_clients.get('approval').patch(
                 ConfigClass.APPROVAL_SERVICE + f"request/copy/{project_code}/files",
                 json=post_data,
-                headers=request.headers
+                headers=forward_headers(request)
             )
         except Exception as e:
             api_response.set_error_msg(f"Error calling request copy API: {str(e)}")
@@ -165,12 +174,12 @@ class CopyRequestPending:
         summary="Get pending files remaining in a copy request",
         dependencies=[Depends(PermissionsCheck("copyrequest", "*", "update"))]
     )
-    def get(self, project_code: str, request: Request):
+    async def get(self, project_code: str, request: Request):
         api_response = APIResponse()
         try:
-            response = requests.get(
+            response = await upstream_clients.get('approval').get(
                 ConfigClass.APPROVAL_SERVICE + f"request/copy/{project_code}/pending-files",
-                params=request.args,
+                params=request.query_params,
             )
         except Exception as e:
             api_response.set_error_msg(f"Error calling request copy API: {str(e)}")
@@ -12,21 +12,34 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-import requests
 from common import LoggerFactory
 from fastapi import APIRouter, Depends, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi_utils import cbv
 
 from app.auth import jwt_required
 from config import ConfigClass
 from models.api_response import APIResponse, EAPIResponseCode
+from resources import json_utils
+from resources.json_utils import NDJSON_MEDIA_TYPE
 from resources.error_handler import APIException
+from resources.request_body import get_request_json
+from resources.upstream import upstream_clients
+from services.meta import get_entities_by_ids
 from services.meta import get_entity_by_id
+from services.meta import get_template
+from services.meta import invalidate_entities
+from services.meta import invalidate_templates
+from services.meta import list_project_templates
 from services.permissions_service.decorators import PermissionsCheck
-from services.permissions_service.utils import get_project_role, has_permission
+from services.permissions_service.utils import get_project_role, has_permission, has_permissions_batch
 
+from .utils import attach_attributes
+from .utils import get_entity_attributes
 from .utils import has_permissions
+from .utils import has_template_permissions
+from .utils import is_template_attached
+from .utils import load_entity_templates
 
 router = APIRouter(tags=["Attribute Templates"])
 
@@ -45,7 +58,13 @@ class RestfulManifests:
     async def get(self, request: Request):
         """List attribute templates by project_code."""
         try:
-            response = requests.get(ConfigClass.METADATA_SERVICE + 'template/', params=request.query_params)
+            if set(request.query_params.keys()) == {'project_code'}:
+                templates = await list_project_templates(request.query_params['project_code'])
+                return JSONResponse(content=templates, status_code=EAPIResponseCode.success.value)
+
+            response = await upstream_clients.get('metadata').get(
+                ConfigClass.METADATA_SERVICE + 'template/', params=request.query_params
+            )
             return JSONResponse(content=response.json(), status_code=response.status_code)
         except Exception as e:
             _logger.error(
@@ -63,8 +82,10 @@ class RestfulManifests:
     async def post(self, request: Request):
         """Create a new attribute template."""
         try:
-            response = requests.post(
-                ConfigClass.METADATA_SERVICE + 'template/', json=await request.json())
+            data = await get_request_json(request)
+            response = await upstream_clients.get('metadata').post(
+                ConfigClass.METADATA_SERVICE + 'template/', json=data)
+            await invalidate_templates(project_codes=[data.get('project_code')])
             return JSONResponse(content=response.json(), status_code=response.status_code)
         except Exception as e:
             _logger.error(
@@ -87,17 +108,16 @@ class RestfulManifest:
         """Get an attribute template by id."""
         my_res = APIResponse()
         try:
-            response = requests.get(
-                ConfigClass.METADATA_SERVICE + f'template/{manifest_id}/')
-            res = response.json()
-            if not res['result']:
+            template = await get_template(manifest_id)
+            if not template:
                 my_res.set_code(EAPIResponseCode.not_found)
                 my_res.set_error_msg('Attribute template not found')
                 return my_res.json_response()
 
-            for attr in res['result']['attributes']:
-                attr['manifest_id'] = res['result']['id']
-            return JSONResponse(content=res, status_code=response.status_code)
+            for attr in template['attributes']:
+                attr['manifest_id'] = template['id']
+            my_res.set_result(template)
+            return my_res.json_response()
         except Exception as e:
             _logger.error(
                 f'Error when calling metadata service: {str(e)}')
@@ -113,18 +133,16 @@ class RestfulManifest:
     async def put(self, manifest_id: str, request: Request):
         """Update attributes or name of template by id."""
         my_res = APIResponse()
-        data = await request.json()
+        data = await get_request_json(request)
         project_code = data.get('project_code')
         # Permissions check
-        if not has_permission(project_code, 'file_attribute_template', '*', 'update', self.current_identity):
+        if not await has_permission(project_code, 'file_attribute_template', '*', 'update', self.current_identity):
             my_res.set_code(EAPIResponseCode.forbidden)
             my_res.set_result('Permission Denied')
             return my_res.json_response()
 
         try:
-            response = requests.get(
-                ConfigClass.METADATA_SERVICE + f'template/{manifest_id}/')
-            template = response.json()['result']
+            template = await get_template(manifest_id)
             if not template:
                 my_res.set_code(EAPIResponseCode.not_found)
                 my_res.set_error_msg('Attribute template not found')
@@ -139,8 +157,9 @@ class RestfulManifest:
                 data['attributes'] = data['attributes'] + existing_attr
 
             params = {'id': manifest_id}
-            response = requests.put(
+            response = await upstream_clients.get('metadata').put(
                 ConfigClass.METADATA_SERVICE + 'template/', params=params, json=data)
+            await invalidate_templates([manifest_id], {template['project_code'], project_code})
             res = response.json()
             res['result'] = result
             return JSONResponse(content=res, status_code=response.status_code)
@@ -159,9 +178,7 @@ class RestfulManifest:
     async def delete(self, manifest_id: str):
         """Delete an attribute template."""
         my_res = APIResponse()
-        response = requests.get(
-            ConfigClass.METADATA_SERVICE + f'template/{manifest_id}/')
-        res = response.json()['result']
+        res = await get_template(manifest_id)
         if not res:
             my_res.set_code(EAPIResponseCode.not_found)
             my_res.set_error_msg('Attribute template not found')
@@ -169,32 +186,29 @@ class RestfulManifest:
 
         project_code = res['project_code']
         # Permissions check
-        if not has_permission(project_code, 'file_attribute_template', '*', 'delete', self.current_identity):
+        if not await has_permission(project_code, 'file_attribute_template', '*', 'delete', self.current_identity):
             my_res.set_code(EAPIResponseCode.forbidden)
             my_res.set_result('Permission Denied')
             return my_res.json_response()
 
         try:
             # check if template attached to items
-            for zone in [0, 1]:
-                for archived in [True, False]:
-                    params = {'container_code': project_code, 'zone': zone, 'recursive': True, 'archived': archived,
-                              'type': 'file'}
-                    response = requests.get(ConfigClass.METADATA_SERVICE + 'items/search/', params=params)
-                    if response.status_code != 200:
-                        my_res.set_code(EAPIResponseCode.internal_error)
-                        my_res.set_error_msg('Failed to search for items')
-                        return my_res.json_response()
-                    else:
-                        items = response.json()['result']
-                        for item in items:
-                            if manifest_id in item['extended']['extra']['attributes']:
-                                my_res.set_code(EAPIResponseCode.forbidden)
-                                my_res.set_result('Cant delete manifest attached to files')
-                                return my_res.json_response()
+            try:
+                if await is_template_attached(project_code, manifest_id):
+                    my_res.set_code(EAPIResponseCode.forbidden)
+                    my_res.set_result('Cant delete manifest attached to files')
+                    return my_res.json_response()
+            except APIException as e:
+                _logger.error(e.content['error_msg'])
+                my_res.set_code(EAPIResponseCode.internal_error)
+                my_res.set_error_msg('Failed to search for items')
+                return my_res.json_response()
 
             params = {'id': manifest_id}
-            response = requests.delete(ConfigClass.METADATA_SERVICE + 'template/', params=params)
+            response = await upstream_clients.get('metadata').delete(
+                ConfigClass.METADATA_SERVICE + 'template/', params=params
+            )
+            await invalidate_templates([manifest_id], [project_code])
             if response.status_code != 200:
                 my_res.set_code(EAPIResponseCode.internal_error)
                 my_res.set_error_msg('Failed to delete attribute template not found')
@@ -223,7 +237,7 @@ class FileAttributes:
     )
     async def put(self, file_id: str, request: Request):
         api_response = APIResponse()
-        entity = get_entity_by_id(file_id)
+        entity = await get_entity_by_id(file_id)
         if entity['extended']['extra'].get('attributes'):
             template_id = list(entity['extended']['extra']['attributes'].keys())[0]
         else:
@@ -233,7 +247,7 @@ class FileAttributes:
             )
         # Permissions check
         if self.current_identity['role'] != 'admin':
-            if not has_permissions(template_id, entity, self.current_identity):
+            if not await has_permissions(template_id, entity, self.current_identity):
                 api_response.set_code(EAPIResponseCode.forbidden)
                 api_response.set_result('Permission Denied')
                 return api_response.json_response()
@@ -242,14 +256,14 @@ class FileAttributes:
             zone = 'greenroom'
         else:
             zone = 'core'
-        if not has_permission(entity['container_code'], 'file_attribute', zone, 'update', self.current_identity):
+        if not await has_permission(entity['container_code'], 'file_attribute', zone, 'update', self.current_identity):
             api_response.set_code(EAPIResponseCode.forbidden)
             api_response.set_result('Permission Denied')
             return api_response.json_response()
 
         try:
             params = {'id': entity['id']}
-            attributes_update = await request.json()
+            attributes_update = await get_request_json(request)
             payload = {
                 'parent': entity['parent'],
                 'parent_path': entity['parent_path'],
@@ -260,8 +274,9 @@ class FileAttributes:
                 'attributes': attributes_update
 
             }
-            response = requests.put(
+            response = await upstream_clients.get('metadata').put(
                 ConfigClass.METADATA_SERVICE + 'item/', params=params, json=payload)
+            await invalidate_entities([entity['id']])
             res = response.json()
             res['result']['zone'] = zone
             res['result'].pop('extended')
@@ -290,7 +305,7 @@ class ImportManifest:
         dependencies=[Depends(PermissionsCheck("file_attribute_template", "*", "import"))]
     )
     async def post(self, request: Request):
-        data = await request.json()
+        data = await get_request_json(request)
         try:
 
             payload = {
@@ -298,8 +313,9 @@ class ImportManifest:
                 'project_code': data['project_code'],
                 'attributes': data['attributes']
             }
-            response = requests.post(
+            response = await upstream_clients.get('metadata').post(
                 ConfigClass.METADATA_SERVICE + 'template/', json=payload)
+            await invalidate_templates(project_codes=[payload['project_code']])
             res = response.json()
             res['result'] = 'Success'
             return JSONResponse(content=res, status_code=response.status_code)
@@ -323,7 +339,7 @@ class FileManifestQuery:
     )
     async def post(self, request: Request):
         api_response = APIResponse()
-        data = await request.json()
+        data = await get_request_json(request)
         if 'geid_list' not in data:
             api_response.set_code(EAPIResponseCode.bad_request)
             api_response.set_result('Missing required field: geid_list')
@@ -333,54 +349,43 @@ class FileManifestQuery:
         lineage_view = data.get('lineage_view')
         results = {}
         try:
+            entities, entity_templates, templates = await load_entity_templates(geid_list)
+            if not all(templates.values()):
+                api_response.set_code(EAPIResponseCode.not_found)
+                api_response.set_error_msg('Attribute template not found')
+                return api_response.json_response()
+
+            checks = {
+                geid: (entities[geid]['container_code'], 'greenroom' if entities[geid]['zone'] == 0 else 'core', 'view')
+                for geid in entity_templates
+            }
+            permissions = await has_permissions_batch(
+                'file_attribute_template', list(checks.values()), self.current_identity
+            )
+            project_roles = {}
             for geid in geid_list:
-                entity = get_entity_by_id(geid)
-                entity_attributes = entity['extended']['extra'].get('attributes')
-                if entity_attributes:
-                    template_id = list(entity['extended']['extra']['attributes'].keys())[0]
-                    if not has_permissions(template_id, entity, self.current_identity) and not lineage_view:
-                        api_response.set_code(EAPIResponseCode.forbidden)
-                        api_response.set_result('Permission denied')
-                        return api_response.json_response()
-                    if entity['zone'] == 0:
-                        zone = 'greenroom'
-                    else:
-                        zone = 'core'
-                    if not has_permission(
-                        entity['container_code'],
-                        'file_attribute_template',
-                        zone,
-                        'view',
-                        self.current_identity
-                    ):
-                        api_response.set_code(EAPIResponseCode.forbidden)
-                        api_response.set_result('Permission Denied')
-                        return api_response.json_response()
-                    response = requests.get(ConfigClass.METADATA_SERVICE + f'template/{template_id}/')
-                    if response.status_code != 200:
-                        api_response.set_code(EAPIResponseCode.not_found)
-                        api_response.set_error_msg('Attribute template not found')
-                        return api_response.json_response()
-                    else:
-                        attributes = []
-                        extended_id = entity['extended']['id']
-                        template_info = response.json()['result']
-                        template_name = template_info['name']
-                        for attr, value in entity_attributes[template_id].items():
-                            attr_info = next(item for item in template_info['attributes'] if item['name'] == attr)
-                            attribute = {
-                                'id': extended_id,
-                                'name': attr,
-                                'manifest_name': template_name,
-                                'value': value,
-                                'type': attr_info['type'],
-                                'optional': attr_info['optional'],
-                                'manifest_id': template_id,
-                            }
-                            attributes.append(attribute)
-                    results[geid] = attributes
-                else:
+                entity = entities[geid]
+                template_id = entity_templates.get(geid)
+                if not template_id:
                     results[geid] = {}
+                    continue
+
+                template_info = templates[template_id]
+                project_code = template_info['project_code']
+                if project_code not in project_roles:
+                    project_roles[project_code] = get_project_role(project_code, self.current_identity)
+                if not has_template_permissions(
+                    template_info, entity, self.current_identity, project_roles[project_code]
+                ) and not lineage_view:
+                    api_response.set_code(EAPIResponseCode.forbidden)
+                    api_response.set_result('Permission denied')
+                    return api_response.json_response()
+                if not permissions[checks[geid]]:
+                    api_response.set_code(EAPIResponseCode.forbidden)
+                    api_response.set_result('Permission Denied')
+                    return api_response.json_response()
+
+                results[geid] = get_entity_attributes(entity, template_id, template_info)
 
             api_response.set_code(EAPIResponseCode.success)
             api_response.set_result(results)
@@ -403,9 +408,7 @@ class AttachAttributes:
     async def post(self, request: Request):
         api_response = APIResponse()
         required_fields = ['manifest_id', 'item_ids', 'attributes', 'project_code']
-        data = await request.json()
-        payload = {'items': []}
-        responses = {'result': []}
+        data = await get_request_json(request)
         # Check required fields
         for field in required_fields:
             if field not in data:
@@ -414,92 +417,94 @@ class AttachAttributes:
                 return api_response.json_response()
         item_ids = data.get('item_ids')
         project_code = data.get('project_code')
-        items = []
-        updated_items = []
         try:
+            entities = await get_entities_by_ids(item_ids)
+            items = [entities[item_id] for item_id in item_ids]
             if self.current_identity['role'] != 'admin':
-                project_role = get_project_role(project_code, self.current_identity)
-                if not project_role:
-                    api_response.set_code(EAPIResponseCode.forbidden)
-                    api_response.set_result('User does not have access to this project')
-                    return api_response.json_response()
-
-                for item in item_ids:
-                    entity = get_entity_by_id(item)
-                    root_folder = entity['parent_path'].split('.')[0]
-                    zone = 'core' if entity['zone'] == 1 else 'greenroom'
-                    if project_role == 'collaborator':
-                        if zone == 'greenroom' and root_folder != self.current_identity['username']:
-                            api_response.set_code(EAPIResponseCode.forbidden)
-                            api_response.set_result('Permission denied')
-                            return api_response.json_response()
-                    elif project_role == 'contributor':
-                        if root_folder != self.current_identity['username']:
-                            api_response.set_code(EAPIResponseCode.forbidden)
-                            api_response.set_result('Permission denied')
-                            return api_response.json_response()
-                    items.append(entity)
-            else:
-                for item in item_ids:
-                    entity = get_entity_by_id(item)
-                    items.append(entity)
-            for item in items:
-                if item['type'] == 'folder':
-                    parent_path = item['parent_path']
-                    name = item['name']
-                    # get all items in folder recursively:
-                    params = {'container_code': project_code, 'zone': item['zone'], 'recursive': True,
-                              'archived': False,
-                              'type': 'file', 'owner': item['owner'], 'parent_path': f'{parent_path}.{name}'}
-                    response = requests.get(ConfigClass.METADATA_SERVICE + 'items/search/', params=params)
-                    if response.status_code != 200:
-                        api_response.set_code(EAPIResponseCode.internal_error)
-                        api_response.set_error_msg('Failed to search for items')
-                        return api_response.json_response()
-                    else:
-                        items_found = response.json()['result']
-                        for found in items_found:
-                            if data['manifest_id'] in found['extended']['extra']['attributes']:
-                                responses['result'].append({'name': found['name'], 'geid': found['id'],
-                                                            'operation_status': 'TERMINATED',
-                                                            'error_type': 'attributes_duplicate'})
-                            else:
-                                updated_items.append(found)
-                else:
-                    updated_items.append(item)
-
-            if updated_items:
-                file_ids = []
-                for updated in updated_items:
-                    update = {
-                        'parent': updated['parent'],
-                        'parent_path': updated['parent_path'],
-                        'tags': updated['extended']['extra']['tags'],
-                        'system_tags': updated['extended']['extra']['system_tags'],
-                        'type': updated['type'],
-                        'attribute_template_id': data['manifest_id'],
-                        'attributes': data['attributes']
-                    }
-                    payload['items'].append(update)
-                    file_ids.append(updated['id'])
-
-                params = {'ids': file_ids}
-                response = requests.put(
-                    ConfigClass.METADATA_SERVICE + 'items/batch/', params=params, json=payload)
-                if response.status_code != 200:
-                    _logger.error('Attaching attributes failed: {}'.format(response.text))
-                    api_response.set_code(response.status_code)
-                    api_response.set_result(response.text)
-                    return api_response.json_response()
-                for item in response.json()['result']:
-                    responses['result'].append({'name': item['name'], 'geid': item['id'],
-                                                'operation_status': 'SUCCEED'})
-
-            responses['total'] = len(responses['result'])
-            api_response.set_result(responses)
+                error_response = self.check_item_permissions(project_code, items)
+                if error_response:
+                    return error_response
+
+            results = attach_attributes(items, data['manifest_id'], data['attributes'], project_code)
+            if NDJSON_MEDIA_TYPE in request.headers.get('accept', ''):
+                return StreamingResponse(self.stream_results(results), media_type=NDJSON_MEDIA_TYPE)
+
+            return await self.collect_results(results)
+        except APIException as e:
+            _logger.error(f'Attaching attributes failed: {e.content["error_msg"]}')
+            api_response.set_code(e.status_code)
+            api_response.set_error_msg(e.content['error_msg'])
             return api_response.json_response()
         except Exception as e:
             _logger.error(f'Error when calling metadata service: {str(e)}')
             api_response.set_code(EAPIResponseCode.forbidden)
             api_response.set_result(f'Error when calling metadata service: {str(e)}')
             return api_response.json_response()
+
+    def check_item_permissions(self, project_code, items):
+        """Return error response unless the project role allows attaching attributes to every item."""
+
+        api_response = APIResponse()
+        project_role = get_project_role(project_code, self.current_identity)
+        if not project_role:
+            api_response.set_code(EAPIResponseCode.forbidden)
+            api_response.set_result('User does not have access to this project')
+            return api_response.json_response()
+
+        for entity in items:
+            root_folder = entity['parent_path'].split('.')[0]
+            zone = 'core' if entity['zone'] == 1 else 'greenroom'
+            if project_role == 'collaborator':
+                if zone == 'greenroom' and root_folder != self.current_identity['username']:
+                    api_response.set_code(EAPIResponseCode.forbidden)
+                    api_response.set_result('Permission denied')
+                    return api_response.json_response()
+            elif project_role == 'contributor':
+                if root_folder != self.current_identity['username']:
+                    api_response.set_code(EAPIResponseCode.forbidden)
+                    api_response.set_result('Permission denied')
+                    return api_response.json_response()
+        return None
+
+    @staticmethod
+    async def collect_results(results):
+        """Respond with the result of every item.
+
+        Every chunk of files is committed on its own. When a chunk fails, the files of earlier chunks keep their new
+        attributes, so the error response lists their results and sets partial.
+        """
+
+        api_response = APIResponse()
+        updated = []
+        try:
+            async for result in results:
+                updated.append(result)
+        except Exception as e:
+            _logger.error(f'Attaching attributes failed after {len(updated)} items: {e}')
+            if isinstance(e, APIException):
+                api_response.set_code(e.status_code)
+                api_response.set_error_msg(e.content['error_msg'])
+            else:
+                api_response.set_code(EAPIResponseCode.internal_error)
+                api_response.set_error_msg(str(e))
+            api_response.set_result({'result': updated, 'total': len(updated), 'partial': True})
+            return api_response.json_response()
+
+        api_response.set_result({'result': updated, 'total': len(updated)})
+        return api_response.json_response()
+
+    @staticmethod
+    async def stream_results(results):
+        """Write one JSON line per item, failures end the stream with a line holding the error."""
+
+        total = 0
+        try:
+            async for result in results:
+                total += 1
+                yield json_utils.dumps(result) + b'\n'
+        except Exception as e:
+            _logger.error(f'Attaching attributes failed: {e}')
+            error_msg = e.content['error_msg'] if isinstance(e, APIException) else str(e)
+            yield json_utils.dumps({'operation_status': 'FAILED', 'error_msg': error_msg}) + b'\n'
+            return
+        yield json_utils.dumps({'total': total}) + b'\n'
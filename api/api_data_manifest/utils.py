@@ -12,24 +12,41 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-import requests
+import asyncio
+from typing import AsyncIterator
+from typing import List
+from typing import Set
+from typing import Tuple
 
 from config import ConfigClass
+from models.api_response import EAPIResponseCode
+from resources.error_handler import APIException
+from resources.upstream import upstream_clients
+from services.meta import get_entities_by_ids
+from services.meta import get_template
+from services.meta import invalidate_entities
+from services.meta import search_entity_pages
 from services.permissions_service.utils import get_project_role
 
 
-def has_permissions(template_id, file_node, current_identity):
+async def has_permissions(template_id, file_node, current_identity):
     try:
-        response = requests.get(ConfigClass.METADATA_SERVICE + f'template/{template_id}/')
-        manifest = response.json()['result']
+        manifest = await get_template(template_id)
         if not manifest:
             return False
     except Exception as e:
         error_msg = {"result": str(e)}
         return error_msg, 500
 
+    return has_template_permissions(manifest, file_node, current_identity)
+
+
+def has_template_permissions(manifest, file_node, current_identity, role=None):
+    """Check ownership rules for template attributes of a file, role is looked up when not given."""
+
     if current_identity["role"] != "admin":
-        role = get_project_role(manifest['project_code'], current_identity)
+        if role is None:
+            role = get_project_role(manifest['project_code'], current_identity)
         if role == "contributor":
             # contrib must own the file to attach manifests
             root_folder = file_node["parent_path"].split(".")[0]
@@ -41,3 +58,186 @@ def has_permissions(template_id, file_node, current_identity):
                 if root_folder != current_identity["username"]:
                     return False
     return True
+
+
+async def load_entity_templates(geid_list: List[str]) -> Tuple[dict, dict, dict]:
+    """Fetch entities and the templates of their attributes in batches.
+
+    Returns entities by id, the template id of every entity with attributes and the templates by id, templates that do
+    not exist are None.
+    """
+
+    entities = await get_entities_by_ids(geid_list)
+    entity_templates = {
+        geid: next(iter(entity['extended']['extra']['attributes']))
+        for geid, entity in entities.items()
+        if entity['extended']['extra'].get('attributes')
+    }
+    template_ids = list(set(entity_templates.values()))
+    templates = dict(zip(template_ids, await asyncio.gather(*[get_template(id_) for id_ in template_ids])))
+    return entities, entity_templates, templates
+
+
+def get_entity_attributes(entity: dict, template_id: str, template: dict) -> List[dict]:
+    """Describe attributes of the entity with the attribute definitions of the template."""
+
+    template_attributes = {attr['name']: attr for attr in template['attributes']}
+    return [
+        {
+            'id': entity['extended']['id'],
+            'name': attr,
+            'manifest_name': template['name'],
+            'value': value,
+            'type': template_attributes[attr]['type'],
+            'optional': template_attributes[attr]['optional'],
+            'manifest_id': template_id,
+        }
+        for attr, value in entity['extended']['extra']['attributes'][template_id].items()
+    ]
+
+
+async def is_template_attached(project_code: str, template_id: str) -> bool:
+    """Return whether any file of the project has attributes of the template, stops reading at the first match."""
+
+    for zone in [0, 1]:
+        for archived in [False, True]:
+            params = {
+                'container_code': project_code,
+                'zone': zone,
+                'recursive': True,
+                'archived': archived,
+                'type': 'file',
+                # lets the metadata service narrow the search when it supports the filter, matches are checked here
+                'attribute_template_id': template_id,
+            }
+            if await has_attached_file(search_entity_pages(params), template_id):
+                return True
+    return False
+
+
+async def has_attached_file(pages: AsyncIterator[list], template_id: str) -> bool:
+    try:
+        async for items in pages:
+            if any(template_id in item['extended']['extra']['attributes'] for item in items):
+                return True
+        return False
+    finally:
+        # the remaining pages are not needed, close the search right away instead of when garbage collected
+        await pages.aclose()
+
+
+async def iter_attach_candidates(
+    items: List[dict], manifest_id: str, project_code: str
+) -> AsyncIterator[Tuple[dict, bool]]:
+    """Yield items and the files below folders page by page, with whether the file already has the template."""
+
+    for item in items:
+        if item['type'] != 'folder':
+            yield item, False
+            continue
+
+        # get all items in folder recursively, sorted so pages stay stable while files are updated
+        params = {
+            'container_code': project_code,
+            'zone': item['zone'],
+            'recursive': True,
+            'archived': False,
+            'type': 'file',
+            'owner': item['owner'],
+            'parent_path': f"{item['parent_path']}.{item['name']}",
+            'sorting': 'created_time',
+            'order': 'asc',
+        }
+        try:
+            async for found_items in search_entity_pages(params):
+                for found in found_items:
+                    yield found, manifest_id in found['extended']['extra']['attributes']
+        except APIException:
+            error_msg = 'Failed to search for items'
+            raise APIException(status_code=EAPIResponseCode.internal_error.value, error_msg=error_msg)
+
+
+async def update_attributes(items: List[dict], manifest_id: str, attributes: dict) -> List[dict]:
+    payload = {'items': []}
+    file_ids = []
+    for updated in items:
+        update = {
+            'parent': updated['parent'],
+            'parent_path': updated['parent_path'],
+            'tags': updated['extended']['extra']['tags'],
+            'system_tags': updated['extended']['extra']['system_tags'],
+            'type': updated['type'],
+            'attribute_template_id': manifest_id,
+            'attributes': attributes,
+        }
+        payload['items'].append(update)
+        file_ids.append(updated['id'])
+
+    params = {'ids': file_ids}
+    response = await upstream_clients.get('metadata').put(
+        ConfigClass.METADATA_SERVICE + 'items/batch/', params=params, json=payload
+    )
+    await invalidate_entities(file_ids)
+    if response.status_code != 200:
+        raise APIException(status_code=response.status_code, error_msg=response.text)
+    return [
+        {'name': item['name'], 'geid': item['id'], 'operation_status': 'SUCCEED'} for item in response.json()['result']
+    ]
+
+
+async def attach_attributes(
+    items: List[dict],
+    manifest_id: str,
+    attributes: dict,
+    project_code: str,
+    chunk_size: int = ConfigClass.ATTRIBUTE_ATTACH_CHUNK_SIZE,
+    concurrency: int = ConfigClass.ATTRIBUTE_ATTACH_CONCURRENCY,
+) -> AsyncIterator[dict]:
+    """Attach attributes to items and to all files below folders, yielding the result of every item.
+
+    Files are updated in chunks of chunk_size with at most concurrency chunks in flight, so memory use does not depend
+    on the size of the folders.
+    """
+
+    chunk = []
+    pending = set()
+    try:
+        async for item, duplicate in iter_attach_candidates(items, manifest_id, project_code):
+            if duplicate:
+                yield {
+                    'name': item['name'],
+                    'geid': item['id'],
+                    'operation_status': 'TERMINATED',
+                    'error_type': 'attributes_duplicate',
+                }
+                continue
+
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                pending.add(asyncio.ensure_future(update_attributes(chunk, manifest_id, attributes)))
+                chunk = []
+            async for result in finish_chunks(pending, concurrency - 1):
+                yield result
+
+        if chunk:
+            pending.add(asyncio.ensure_future(update_attributes(chunk, manifest_id, attributes)))
+        async for result in finish_chunks(pending, 0):
+            yield result
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def finish_chunks(pending: Set[asyncio.Future], keep: int) -> AsyncIterator[dict]:
+    """Wait for chunk updates until at most keep are pending and yield the results of the finished ones.
+
+    Finished updates are removed from pending. Results of successful updates are yielded before the error of a failed
+    one is raised, so callers learn about every file that was updated.
+    """
+
+    while len(pending) > keep:
+        done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        pending -= done
+        for task in sorted(done, key=lambda task: task.exception() is not None):
+            for result in task.result():
+                yield result
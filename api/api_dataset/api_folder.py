@@ -12,7 +12,6 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-import requests
 from common import LoggerFactory
 from fastapi import APIRouter, Depends, Request
 from fastapi.responses import JSONResponse
@@ -21,6 +20,8 @@ from fastapi_utils import cbv
 from app.auth import jwt_required
 from config import ConfigClass
 from models.api_response import APIResponse, EAPIResponseCode
+from resources.request_body import get_request_json
+from resources.upstream import upstream_clients
 from services.permissions_service.decorators import DatasetPermission
 
 router = APIRouter(tags=["Dataset Folder"])
@@ -40,13 +41,15 @@ class DatasetFolder:
     async def post(self, dataset_id: str, request: Request):
         _logger.info('POST dataset folder proxy')
         api_response = APIResponse()
-        data = await request.json()
+        data = await get_request_json(request)
         payload = {
             'username': self.current_identity['username'],
             **data
         }
         try:
-            response = requests.post(ConfigClass.DATASET_SERVICE + f'dataset/{dataset_id}/folder', json=payload)
+            response = await upstream_clients.get('dataset').post(
+                ConfigClass.DATASET_SERVICE + f'dataset/{dataset_id}/folder', json=payload
+            )
         except Exception as e:
             _logger.info(f'Error calling dataset service: {str(e)}')
             api_response.set_code(EAPIResponseCode.internal_error)
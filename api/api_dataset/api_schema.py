@@ -12,7 +12,6 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-import requests
 from common import LoggerFactory
 from fastapi import APIRouter, Depends, Request
 from fastapi.responses import JSONResponse
@@ -21,6 +20,8 @@ from fastapi_utils import cbv
 from app.auth import jwt_required
 from config import ConfigClass
 from models.api_response import APIResponse, EAPIResponseCode
+from resources.request_body import get_request_json
+from resources.upstream import upstream_clients
 from services.permissions_service.decorators import DatasetPermission
 
 router = APIRouter(tags=["Dataset Schema"])
@@ -40,7 +41,9 @@ class SchemaCreate:
     async def post(self, dataset_id: str, request: Request):
         api_response = APIResponse()
         try:
-            response = requests.post(ConfigClass.DATASET_SERVICE + 'schema', json=await request.json())
+            response = await upstream_clients.get('dataset').post(
+                ConfigClass.DATASET_SERVICE + 'schema', json=await get_request_json(request)
+            )
         except Exception as e:
             _logger.info(f'Error calling dataset service: {str(e)}')
             api_response.set_code(EAPIResponseCode.internal_error)
@@ -60,10 +63,12 @@ class Schema:
     )
     async def put(self, dataset_id: str, schema_id: str, request: Request):
         api_response = APIResponse()
-        payload = await request.json()
+        payload = await get_request_json(request)
         payload['username'] = self.current_identity['username']
         try:
-            response = requests.put(ConfigClass.DATASET_SERVICE + f'schema/{schema_id}', json=payload)
+            response = await upstream_clients.get('dataset').put(
+                ConfigClass.DATASET_SERVICE + f'schema/{schema_id}', json=payload
+            )
         except Exception as e:
             _logger.info(f'Error calling dataset service: {str(e)}')
             api_response.set_code(EAPIResponseCode.internal_error)
@@ -80,7 +85,7 @@ class Schema:
         api_response = APIResponse()
 
         try:
-            response = requests.get(ConfigClass.DATASET_SERVICE + f'schema/{schema_id}')
+            response = await upstream_clients.get('dataset').get(ConfigClass.DATASET_SERVICE + f'schema/{schema_id}')
         except Exception as e:
             _logger.info(f'Error calling dataset service: {str(e)}')
             api_response.set_code(EAPIResponseCode.internal_error)
@@ -95,11 +100,13 @@ class Schema:
     )
     async def delete(self, dataset_id: str, schema_id: str, request: Request):
         api_response = APIResponse()
-        payload = await request.json()
+        payload = await get_request_json(request)
         payload['username'] = self.current_identity['username']
         payload['dataset_geid'] = dataset_id
         try:
-            response = requests.delete(ConfigClass.DATASET_SERVICE + f'schema/{schema_id}', json=payload)
+            response = await upstream_clients.get('dataset').request(
+                "DELETE", ConfigClass.DATASET_SERVICE + f'schema/{schema_id}', json=payload
+            )
         except Exception as e:
             _logger.info(f'Error calling dataset service: {str(e)}')
             api_response.set_code(EAPIResponseCode.internal_error)
@@ -119,11 +126,13 @@ class SchemaList:
     )
     async def post(self, dataset_id: str, request: Request):
         api_response = APIResponse()
-        payload = await request.json()
+        payload = await get_request_json(request)
         payload['creator'] = self.current_identity['username']
         payload['dataset_geid'] = dataset_id
         try:
-            response = requests.post(ConfigClass.DATASET_SERVICE + 'schema/list', json=payload)
+            response = await upstream_clients.get('dataset').post(
+                ConfigClass.DATASET_SERVICE + 'schema/list', json=payload
+            )
         except Exception as e:
             _logger.info(f'Error calling dataset service: {str(e)}')
             api_response.set_code(EAPIResponseCode.internal_error)
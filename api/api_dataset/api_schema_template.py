@@ -12,12 +12,13 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-import requests
 from fastapi import APIRouter, Depends, Request
 from fastapi_utils import cbv
 from fastapi.responses import JSONResponse
 from app.auth import jwt_required
 from config import ConfigClass
+from resources.request_body import get_request_json
+from resources.upstream import forward_headers, upstream_clients
 from services.permissions_service.decorators import DatasetPermission
 
 router = APIRouter(tags=["Dataset Schema Template"])
@@ -34,7 +35,9 @@ class SchemaTemplate:
     )
     async def get(self, dataset_id: str, template_id: str, request: Request):
         url = ConfigClass.DATASET_SERVICE + 'dataset/{}/schemaTPL/{}'.format(dataset_id, template_id)
-        respon = requests.get(url, params=request.query_params, headers=request.headers)
+        respon = await upstream_clients.get('dataset').get(
+            url, params=request.query_params, headers=forward_headers(request)
+        )
         return JSONResponse(content=respon.json(), status_code=respon.status_code)
 
     @router.put(
@@ -44,8 +47,8 @@ class SchemaTemplate:
     )
     async def put(self, dataset_id: str, template_id: str, request: Request):
         url = ConfigClass.DATASET_SERVICE + 'dataset/{}/schemaTPL/{}'.format(dataset_id, template_id)
-        payload_json = await request.json()
-        respon = requests.put(url, json=payload_json, headers=request.headers)
+        payload_json = await get_request_json(request)
+        respon = await upstream_clients.get('dataset').put(url, json=payload_json, headers=forward_headers(request))
         return JSONResponse(content=respon.json(), status_code=respon.status_code)
 
     @router.delete(
@@ -55,8 +58,10 @@ class SchemaTemplate:
     )
     async def delete(self, dataset_id: str, template_id: str, request: Request):
         url = ConfigClass.DATASET_SERVICE + 'dataset/{}/schemaTPL/{}'.format(dataset_id, template_id)
-        payload_json = await request.json()
-        respon = requests.delete(url, json=payload_json, headers=request.headers)
+        payload_json = await get_request_json(request)
+        respon = await upstream_clients.get('dataset').request(
+            "DELETE", url, json=payload_json, headers=forward_headers(request)
+        )
         return JSONResponse(content=respon.json(), status_code=respon.status_code)
 
 
@@ -71,8 +76,8 @@ class SchemaTemplateCreate:
     )
     async def post(self, dataset_id: str, request: Request):
         url = ConfigClass.DATASET_SERVICE + 'dataset/{}/schemaTPL'.format(dataset_id)
-        payload_json = await request.json()
-        respon = requests.post(url, json=payload_json, headers=request.headers)
+        payload_json = await get_request_json(request)
+        respon = await upstream_clients.get('dataset').post(url, json=payload_json, headers=forward_headers(request))
         return JSONResponse(content=respon.json(), status_code=respon.status_code)
 
 
@@ -85,8 +90,8 @@ class SchemaTemplatePostQuery:
     )
     async def post(self, dataset_id: str, request: Request):
         url = ConfigClass.DATASET_SERVICE + 'dataset/{}/schemaTPL/list'.format(dataset_id)
-        payload_json = await request.json()
-        respon = requests.post(url, json=payload_json, headers=request.headers)
+        payload_json = await get_request_json(request)
+        respon = await upstream_clients.get('dataset').post(url, json=payload_json, headers=forward_headers(request))
         return JSONResponse(content=respon.json(), status_code=respon.status_code)
 
 ###################################################################################################
@@ -101,8 +106,8 @@ class SchemaTemplateDefaultQuery:
     )
     async def post(self, request: Request):
         url = ConfigClass.DATASET_SERVICE + 'dataset/default/schemaTPL/list'
-        payload_json = await request.json()
-        respon = requests.post(url, json=payload_json, headers=request.headers)
+        payload_json = await get_request_json(request)
+        respon = await upstream_clients.get('dataset').post(url, json=payload_json, headers=forward_headers(request))
         return JSONResponse(content=respon.json(), status_code=respon.status_code)
 
 
@@ -114,5 +119,7 @@ class SchemaTemplateDefaultGet:
     )
     async def get(self, template_id: str, request: Request):
         url = ConfigClass.DATASET_SERVICE + 'dataset/default/schemaTPL/{}'.format(template_id)
-        respon = requests.get(url, params=request.query_params, headers=request.headers)
+        respon = await upstream_clients.get('dataset').get(
+            url, params=request.query_params, headers=forward_headers(request)
+        )
         return JSONResponse(content=respon.json(), status_code=respon.status_code)
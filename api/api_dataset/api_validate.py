@@ -12,7 +12,6 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-import requests
 from common import LoggerFactory
 from fastapi import APIRouter, Depends, Request
 from fastapi_utils import cbv
@@ -20,6 +19,8 @@ from fastapi_utils import cbv
 from app.auth import jwt_required
 from config import ConfigClass
 from models.api_response import APIResponse, EAPIResponseCode
+from resources.request_body import get_request_json
+from resources.upstream import forward_headers, upstream_clients
 from services.dataset import get_dataset_by_id
 from services.permissions_service.decorators import DatasetPermission
 
@@ -39,7 +40,7 @@ class BIDSValidator:
     )
     async def post(self, request: Request):
         _res = APIResponse()
-        payload = await request.json()
+        payload = await get_request_json(request)
         dataset_id = payload.get('dataset_geid', None)
         if not dataset_id:
             _res.set_code(EAPIResponseCode.bad_request)
@@ -49,7 +50,7 @@ class BIDSValidator:
         _logger.info(f'Call API for validating dataset: {dataset_id}')
 
         try:
-            dataset_node = get_dataset_by_id(dataset_id)
+            dataset_node = await get_dataset_by_id(dataset_id)
             if dataset_node['type'] != 'BIDS':
                 _res.set_code(EAPIResponseCode.bad_request)
                 _res.set_result('Dataset is not BIDS type')
@@ -65,7 +66,7 @@ class BIDSValidator:
                 'dataset_geid': dataset_id,
                 'type': 'bids'
             }
-            response = requests.post(url, headers=request.headers, json=data)
+            response = await upstream_clients.get('dataset').post(url, headers=forward_headers(request), json=data)
             if response.status_code != 200:
                 _logger.error('Failed to verify dataset in dataset service:   ' + response.text)
                 _res.set_code(EAPIResponseCode.internal_error)
@@ -88,11 +89,11 @@ class BIDSResult:
         summary="verify a bids dataset",
         dependencies=[Depends(DatasetPermission())],
     )
-    def get(self, dataset_id: str):
+    async def get(self, dataset_id: str):
         _res = APIResponse()
         try:
             url = ConfigClass.DATASET_SERVICE + 'dataset/bids-msg/{}'.format(dataset_id)
-            response = requests.get(url)
+            response = await upstream_clients.get('dataset').get(url)
             if response.status_code != 200:
                 _logger.error('Failed to get dataset bids result in dataset service:   ' + response.text)
                 _res.set_code(EAPIResponseCode.internal_error)
@@ -12,7 +12,6 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-import requests
 from common import LoggerFactory
 from fastapi import APIRouter, Depends, Request
 from fastapi.responses import JSONResponse
@@ -21,6 +20,8 @@ from fastapi_utils import cbv
 from app.auth import jwt_required
 from config import ConfigClass
 from models.api_response import APIResponse, EAPIResponseCode
+from resources.request_body import get_request_json
+from resources.upstream import forward_headers, upstream_clients
 from services.permissions_service.decorators import DatasetPermission
 
 #api_resource = module_api.namespace('DatasetProxy', description='Versions API', path='/v1/dataset/')
@@ -41,8 +42,8 @@ class Publish:
     async def post(self, dataset_id: str, request: Request):
         api_response = APIResponse()
         try:
-            response = requests.post(
-                ConfigClass.DATASET_SERVICE + f'dataset/{dataset_id}/publish', json=await request.json()
+            response = await upstream_clients.get('dataset').post(
+                ConfigClass.DATASET_SERVICE + f'dataset/{dataset_id}/publish', json=await get_request_json(request)
             )
         except Exception as e:
             _logger.info(f'Error calling dataset service: {str(e)}')
@@ -64,7 +65,7 @@ class PublishStatus:
     async def get(self, dataset_id: str, request: Request):
         api_response = APIResponse()
         try:
-            response = requests.get(
+            response = await upstream_clients.get('dataset').get(
                 ConfigClass.DATASET_SERVICE + f'dataset/{dataset_id}/publish/status', params=request.query_params
             )
         except Exception as e:
@@ -87,10 +88,10 @@ class DownloadPre:
     async def get(self, dataset_id: str, request: Request):
         api_response = APIResponse()
         try:
-            response = requests.get(
+            response = await upstream_clients.get('dataset').get(
                 ConfigClass.DATASET_SERVICE + f'dataset/{dataset_id}/download/pre',
                 params=request.query_params,
-                headers=request.headers
+                headers=forward_headers(request)
             )
         except Exception as e:
             _logger.info(f'Error calling dataset service: {str(e)}')
@@ -112,7 +113,7 @@ class DatasetVersions:
     async def get(self, dataset_id: str, request: Request):
         api_response = APIResponse()
         try:
-            response = requests.get(
+            response = await upstream_clients.get('dataset').get(
                 ConfigClass.DATASET_SERVICE + f'dataset/{dataset_id}/versions',
                 params=request.query_params
             )
@@ -12,13 +12,14 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-import requests
 from fastapi import APIRouter, Depends, Request
 from fastapi.responses import JSONResponse
 from fastapi_utils import cbv
 
 from app.auth import jwt_required
 from config import ConfigClass
+from resources.request_body import get_request_json
+from resources.upstream import forward_headers, upstream_clients
 from services.dataset import get_dataset_by_id
 from services.permissions_service.decorators import (DatasetPermission,
                                                      DatasetPermissionByCode)
@@ -35,9 +36,9 @@ class CodeRestful:
         summary="Get dataset by code",
         dependencies=[Depends(DatasetPermissionByCode())]
     )
-    def get(self, dataset_code: str):
+    async def get(self, dataset_code: str):
         url = ConfigClass.DATASET_SERVICE + 'dataset-peek/{}'.format(dataset_code)
-        respon = requests.get(url)
+        respon = await upstream_clients.get('dataset').get(url)
         return JSONResponse(content=respon.json(), status_code=respon.status_code)
 
 
@@ -52,7 +53,7 @@ class Dataset:
     )
     async def get(self, dataset_id: str):
         url = ConfigClass.DATASET_SERVICE + 'dataset/{}'.format(dataset_id)
-        respon = requests.get(url)
+        respon = await upstream_clients.get('dataset').get(url)
         return JSONResponse(content=respon.json(), status_code=respon.status_code)
 
     @router.put(
@@ -62,8 +63,8 @@ class Dataset:
     )
     async def put(self, dataset_id: str, request: Request):
         url = ConfigClass.DATASET_SERVICE + 'dataset/{}'.format(dataset_id)
-        payload_json = await request.json()
-        respon = requests.put(url, json=payload_json, headers=request.headers)
+        payload_json = await get_request_json(request)
+        respon = await upstream_clients.get('dataset').put(url, json=payload_json, headers=forward_headers(request))
         return JSONResponse(content=respon.json(), status_code=respon.status_code)
 
 
@@ -77,7 +78,7 @@ class RestfulPost:
     )
     async def post(self, request: Request):
         url = ConfigClass.DATASET_SERVICE + 'dataset'
-        payload_json = await request.json()
+        payload_json = await get_request_json(request)
         operator_username = self.current_identity['username']
         payload_username = payload_json.get('username')
         if operator_username != payload_username:
@@ -85,7 +86,7 @@ class RestfulPost:
                 'err_msg': 'No permissions: {} cannot create dataset for {}'.format(
                     operator_username, payload_username)
             }, status_code=403)
-        respon = requests.post(url, json=payload_json, headers=request.headers)
+        respon = await upstream_clients.get('dataset').post(url, json=payload_json, headers=forward_headers(request))
         return JSONResponse(content=respon.json(), status_code=respon.status_code)
 
 
@@ -107,8 +108,8 @@ class List:
                 'err_msg': 'No permissions'
             }, status_code=403)
 
-        payload_json = await request.json()
-        respon = requests.post(url, json=payload_json, headers=request.headers)
+        payload_json = await get_request_json(request)
+        respon = await upstream_clients.get('dataset').post(url, json=payload_json, headers=forward_headers(request))
         return JSONResponse(content=respon.json(), status_code=respon.status_code)
 
 
@@ -121,9 +122,11 @@ class DatasetFiles:
         summary="List dataset files",
         dependencies=[Depends(DatasetPermission())],
     )
-    def get(self, dataset_id: str, request: Request):
+    async def get(self, dataset_id: str, request: Request):
         url = ConfigClass.DATASET_SERVICE + 'dataset/{}/files'.format(dataset_id)
-        response = requests.get(url, params=request.query_params, headers=request.headers)
+        response = await upstream_clients.get('dataset').get(
+            url, params=request.query_params, headers=forward_headers(request)
+        )
         if response.status_code != 200:
             return response.json(), response.status_code
         entities = []
@@ -141,8 +144,8 @@ class DatasetFiles:
     )
     async def post(self, dataset_id: str, request: Request):
         url = ConfigClass.DATASET_SERVICE + 'dataset/{}/files'.format(dataset_id)
-        payload_json = await request.json()
-        respon = requests.post(url, json=payload_json, headers=request.headers)
+        payload_json = await get_request_json(request)
+        respon = await upstream_clients.get('dataset').post(url, json=payload_json, headers=forward_headers(request))
         return JSONResponse(content=respon.json(), status_code=respon.status_code)
 
     @router.put(
@@ -152,8 +155,8 @@ class DatasetFiles:
     )
     async def put(self, dataset_id: str, request: Request):
         url = ConfigClass.DATASET_SERVICE + 'dataset/{}/files'.format(dataset_id)
-        payload_json = await request.json()
-        respon = requests.put(url, json=payload_json, headers=request.headers)
+        payload_json = await get_request_json(request)
+        respon = await upstream_clients.get('dataset').put(url, json=payload_json, headers=forward_headers(request))
         return JSONResponse(content=respon.json(), status_code=respon.status_code)
 
     @router.delete(
@@ -163,8 +166,10 @@ class DatasetFiles:
     )
     async def delete(self, dataset_id: str, request: Request):
         url = ConfigClass.DATASET_SERVICE + 'dataset/{}/files'.format(dataset_id)
-        payload_json = await request.json()
-        respon = requests.delete(url, json=payload_json, headers=request.headers)
+        payload_json = await get_request_json(request)
+        respon = await upstream_clients.get('dataset').request(
+            "DELETE", url, json=payload_json, headers=forward_headers(request)
+        )
         return JSONResponse(content=respon.json(), status_code=respon.status_code)
 
 
@@ -179,8 +184,8 @@ class DatasetFileUpdate:
     )
     async def post(self, dataset_id: str, file_id: str, request: Request):
         url = ConfigClass.DATASET_SERVICE + 'dataset/{}/files/{}'.format(dataset_id, file_id)
-        payload_json = await request.json()
-        respon = requests.post(url, json=payload_json, headers=request.headers)
+        payload_json = await get_request_json(request)
+        respon = await upstream_clients.get('dataset').post(url, json=payload_json, headers=forward_headers(request))
         return JSONResponse(content=respon.json(), status_code=respon.status_code)
 
 
@@ -200,11 +205,11 @@ class DatsetTasks:
             'label': 'Dataset'
         }
 
-        dataset = get_dataset_by_id(dataset_id)
+        dataset = await get_dataset_by_id(dataset_id)
         new_params['code'] = dataset['code']
 
         url = ConfigClass.DATAOPS_SERVICE + 'tasks'
-        response = requests.get(url, params=new_params)
+        response = await upstream_clients.get('dataops').get(url, params=new_params)
         return JSONResponse(content=response.json(), status_code=response.status_code)
 
     @router.delete(
@@ -213,12 +218,12 @@ class DatsetTasks:
         dependencies=[Depends(DatasetPermission())],
     )
     async def delete(self, dataset_id: str, request: Request):
-        request_body = await request.json()
+        request_body = await get_request_json(request)
         request_body.update({'label': 'Dataset'})
 
-        dataset = get_dataset_by_id(dataset_id)
+        dataset = await get_dataset_by_id(dataset_id)
         request_body['code'] = dataset['code']
 
         url = ConfigClass.DATAOPS_SERVICE + 'tasks'
-        response = requests.delete(url, json=request_body)
+        response = await upstream_clients.get('dataops').request("DELETE", url, json=request_body)
         return JSONResponse(content=response.json(), status_code=response.status_code)
@@ -12,7 +12,8 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-import requests
+from typing import Optional
+
 from common import LoggerFactory
 from fastapi import APIRouter, Depends, Request
 from fastapi.responses import JSONResponse
@@ -21,9 +22,11 @@ from fastapi_utils import cbv
 from app.auth import jwt_required
 from config import ConfigClass
 from models.api_response import APIResponse, EAPIResponseCode
+from resources.request_body import get_request_json
+from resources.upstream import forward_headers, upstream_clients
 from services.dataset import get_dataset_by_code
-from services.meta import get_entity_by_id
-from services.permissions_service.utils import get_project_role, has_permission
+from services.meta import ZONE_NAMES, get_entities_by_ids
+from services.permissions_service.utils import get_project_role, has_permissions_batch
 
 _logger = LoggerFactory('api_download').get_logger()
 
@@ -40,50 +43,35 @@ class Download:
     )
     async def post(self, request: Request):
         api_response = APIResponse()
-        payload = await request.json()
-        zone = "core"
+        payload = await get_request_json(request)
+        entity_nodes = await get_entities_by_ids([file["id"] for file in payload.get("files")])
         if payload.get("container_type") == "dataset":
-            dataset_node = get_dataset_by_code(payload.get("container_code"))
-
-            # Get file or folder node
-            for file in payload.get("files"):
-                entity_node = get_entity_by_id(file["id"])
-
-            # file must belong to dataset
-            if dataset_node["code"] != entity_node["container_code"]:
-                _logger.error(f"File doesn't belong to dataset file: {dataset_node['code']}, "
-                              f"dataset: {entity_node['dataset_code']}")
-                api_response.set_code(EAPIResponseCode.forbidden)
-                api_response.set_result("File doesn't belong to dataset, Permission Denied")
+            zone = "core"
+            error_response = await self.check_dataset_download(payload.get("container_code"), entity_nodes)
+        else:
+            zones = {ZONE_NAMES.get(entity_node["zone"], "core") for entity_node in entity_nodes.values()}
+            if len(zones) > 1:
+                # every download is prepared by the download service of a single zone
+                api_response.set_code(EAPIResponseCode.bad_request)
+                api_response.set_error_msg("Files from greenroom and core can't be downloaded together")
                 return api_response.json_response()
+            zone = zones.pop() if zones else "core"
+            error_response = await self.check_file_download(entity_nodes)
+        if error_response:
+            return error_response
 
-            # user must own dataset
-            if dataset_node["creator"] != self.current_identity["username"]:
-                api_response.set_code(EAPIResponseCode.forbidden)
-                api_response.set_result("Permission Denied")
-                return api_response.json_response()
-        else:
-            for file in payload.get("files"):
-                entity_node = get_entity_by_id(file["id"])
-                zone = "greenroom" if entity_node["zone"] == 0 else "core"
-
-                if not has_permission(entity_node["container_code"], "file", zone, "download", self.current_identity):
-                    api_response.set_code(EAPIResponseCode.forbidden)
-                    api_response.set_error_msg("Permission Denied")
-                    return api_response.json_response()
-
-                if not self.has_file_permissions(entity_node["container_code"], entity_node):
-                    api_response.set_code(EAPIResponseCode.forbidden)
-                    api_response.set_error_msg("Permission Denied")
-                    return api_response.json_response()
         try:
             if zone == "core":
-                response = requests.post(
-                    ConfigClass.DOWNLOAD_SERVICE_CORE_V2 + 'download/pre/', json=payload, headers=request.headers
+                response = await upstream_clients.get('download_core').post(
+                    ConfigClass.DOWNLOAD_SERVICE_CORE_V2 + 'download/pre/',
+                    json=payload,
+                    headers=forward_headers(request),
                 )
             else:
-                response = requests.post(
-                    ConfigClass.DOWNLOAD_SERVICE_GR_V2 + 'download/pre/', json=payload, headers=request.headers
+                response = await upstream_clients.get('download_greenroom').post(
+                    ConfigClass.DOWNLOAD_SERVICE_GR_V2 + 'download/pre/',
+                    json=payload,
+                    headers=forward_headers(request),
                 )
             return JSONResponse(content=response.json(), status_code=response.status_code)
         except Exception as e:
@@ -92,10 +80,54 @@ class Download:
             api_response.set_error_msg("Error calling download service")
             return api_response.json_response()
 
-    def has_file_permissions(self, project_code, file_node):
-        zone = "greenroom" if file_node["zone"] == 0 else "core"
+    async def check_dataset_download(self, dataset_code: str, entity_nodes: dict) -> Optional[JSONResponse]:
+        """Return error response unless all files belong to the dataset and the user owns it."""
+
+        api_response = APIResponse()
+        dataset_node = await get_dataset_by_code(dataset_code)
+
+        # files must belong to dataset
+        for entity_node in entity_nodes.values():
+            if dataset_node["code"] != entity_node["container_code"]:
+                _logger.error(f"File doesn't belong to dataset file: {entity_node['container_code']}, "
+                              f"dataset: {dataset_node['code']}")
+                api_response.set_code(EAPIResponseCode.forbidden)
+                api_response.set_result("File doesn't belong to dataset, Permission Denied")
+                return api_response.json_response()
+
+        # user must own dataset
+        if dataset_node["creator"] != self.current_identity["username"]:
+            api_response.set_code(EAPIResponseCode.forbidden)
+            api_response.set_result("Permission Denied")
+            return api_response.json_response()
+        return None
+
+    async def check_file_download(self, entity_nodes: dict) -> Optional[JSONResponse]:
+        """Return error response unless the user may download every project file."""
+
+        checks = {
+            entity_id: (entity_node["container_code"], ZONE_NAMES.get(entity_node["zone"], "core"), "download")
+            for entity_id, entity_node in entity_nodes.items()
+        }
+        permissions = await has_permissions_batch("file", list(checks.values()), self.current_identity)
+        project_roles = {}
+        for entity_id, entity_node in entity_nodes.items():
+            project_code = entity_node["container_code"]
+            if project_code not in project_roles:
+                project_roles[project_code] = get_project_role(project_code, self.current_identity)
+
+            if not permissions[checks[entity_id]] or not self.has_file_permissions(
+                project_roles[project_code], entity_node
+            ):
+                api_response = APIResponse()
+                api_response.set_code(EAPIResponseCode.forbidden)
+                api_response.set_error_msg("Permission Denied")
+                return api_response.json_response()
+        return None
+
+    def has_file_permissions(self, role, file_node):
+        zone = ZONE_NAMES.get(file_node["zone"], "core")
         if self.current_identity["role"] != "admin":
-            role = get_project_role(project_code, self.current_identity)
             if role not in ["admin", "platform_admin"]:
                 root_folder = file_node["parent_path"].split(".")[0]
                 if role == "contributor":
@@ -119,7 +151,7 @@ class DatasetDownload:
     )
     async def post(self, request: Request):
         api_response = APIResponse()
-        payload = await request.json()
+        payload = await get_request_json(request)
         if "dataset_code" not in payload:
             _logger.error("Missing required field dataset_code")
             api_response.set_code(EAPIResponseCode.bad_request)
@@ -128,7 +160,7 @@ class DatasetDownload:
 
         _logger.error("test here for the proxy")
 
-        dataset_node = get_dataset_by_code(payload.get("dataset_code"))
+        dataset_node = await get_dataset_by_code(payload.get("dataset_code"))
         if dataset_node["creator"] != self.current_identity["username"]:
             api_response.set_code(EAPIResponseCode.forbidden)
             api_response.set_result("Permission Denied")
@@ -136,8 +168,10 @@ class DatasetDownload:
 
         _logger.error("test here for the proxy")
         try:
-            response = requests.post(
-                ConfigClass.DOWNLOAD_SERVICE_CORE_V2 + 'dataset/download/pre', json=payload, headers=request.headers
+            response = await upstream_clients.get('download_core').post(
+                ConfigClass.DOWNLOAD_SERVICE_CORE_V2 + 'dataset/download/pre',
+                json=payload,
+                headers=forward_headers(request),
             )
             return JSONResponse(content=response.json(), status_code=response.status_code)
         except Exception as e:
@@ -14,7 +14,6 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import re
 
-import requests
 from common import LoggerFactory
 from fastapi import APIRouter, Depends, Request
 from fastapi_utils import cbv
@@ -22,6 +21,8 @@ from fastapi_utils import cbv
 from app.auth import jwt_required
 from config import ConfigClass
 from models.api_response import APIResponse, EAPIResponseCode
+from resources.request_body import get_request_json
+from resources.upstream import upstream_clients
 from services.notifier_services.email_service import SrvEmail
 from services.permissions_service.decorators import PermissionsCheck
 
@@ -45,7 +46,7 @@ class EmailRestful:
         _logger = LoggerFactory('api_notification').get_logger()
         response = APIResponse()
 
-        data = await request.json()
+        data = await get_request_json(request)
         _logger.info("Start Notification Email: {}".format(data))
         send_to_all_active = data.get("send_to_all_active")
         emails = data.get("emails")
@@ -80,7 +81,7 @@ class EmailRestful:
 
         if send_to_all_active:
             payload = {"status": "active"}
-            res = requests.get(ConfigClass.AUTH_SERVICE + "users", params=payload)
+            res = await upstream_clients.get('auth').get(ConfigClass.AUTH_SERVICE + "users", params=payload)
             users = res.json()["result"]
             emails = [i["email"] for i in users if i.get("email")]
         else:
@@ -92,7 +93,7 @@ class EmailRestful:
                 return response.json_response()
 
         email_service = SrvEmail()
-        email_service.send(
+        await email_service.async_send(
             subject,
             emails,
             content=message_body,
@@ -12,7 +12,6 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-import requests
 from common import LoggerFactory
 from fastapi import APIRouter, Depends, Request
 from fastapi.responses import JSONResponse
@@ -22,6 +21,8 @@ from app.auth import jwt_required
 from config import ConfigClass
 from models.api_response import EAPIResponseCode
 from resources.error_handler import APIException
+from resources.request_body import get_request_json
+from resources.upstream import forward_headers, upstream_clients
 from services.meta import get_entity_by_id
 from services.permissions_service.decorators import PermissionsCheck
 from services.permissions_service.utils import get_project_role, has_permission
@@ -48,7 +49,7 @@ class FileActionTasks:
         # here update the project_code to code
         request_params.update({"code": request_params.get("project_code")})
         url = ConfigClass.DATAOPS_SERVICE + "tasks"
-        response = requests.get(url, params=request_params)
+        response = await upstream_clients.get('dataops').get(url, params=request_params)
         return JSONResponse(content=response.json(), status_code=response.status_code)
 
     @router.delete(
@@ -57,9 +58,9 @@ class FileActionTasks:
         dependencies=[Depends(PermissionsCheck("tasks", "*", "delete"))]
     )
     async def delete(self, request: Request):
-        request_body = await request.json()
+        request_body = await get_request_json(request)
         url = ConfigClass.DATAOPS_SERVICE+ "tasks"
-        response = requests.delete(url, json=request_body)
+        response = await upstream_clients.get('dataops').request("DELETE", url, json=request_body)
         return JSONResponse(content=response.json(), status_code=response.status_code)
 
 
@@ -74,7 +75,7 @@ class FileActions:
     async def post(self, request: Request):
         data_actions_utility_url = ConfigClass.DATAOPS_SERVICE + "files/actions/"
         headers = request.headers
-        request_body = await request.json()
+        request_body = await get_request_json(request)
         validate_request_params(request_body)
         operation = request_body.get("operation", None)
         project_code = request_body.get("project_code", None)
@@ -84,16 +85,18 @@ class FileActions:
         if not session_id:
             raise APIException(error_msg="Header Session-ID required", code=EAPIResponseCode.forbidden.value)
 
-        if not has_permission(project_code, 'file', '*', operation.lower(), self.current_identity):
+        if not await has_permission(project_code, 'file', '*', operation.lower(), self.current_identity):
             raise APIException(error_msg="Permission denied", code=EAPIResponseCode.forbidden.value)
 
         if operation == 'delete':
-            validate_delete_permissions(targets, project_code, self.current_identity)
+            await validate_delete_permissions(targets, project_code, self.current_identity)
 
         # request action utility API
         payload = request_body
         payload['session_id'] = session_id
-        response = requests.post(data_actions_utility_url, json=payload, headers=request.headers)
+        response = await upstream_clients.get('dataops').post(
+            data_actions_utility_url, json=payload, headers=forward_headers(request)
+        )
         return JSONResponse(content=response.json(), status_code=response.status_code)
 
 
@@ -113,7 +116,7 @@ def validate_request_params(request_body: dict):
         raise APIException(error_msg="project_code required", status_code=EAPIResponseCode.bad_request.value)
 
 
-def validate_delete_permissions(targets: list, project_code, current_identity):
+async def validate_delete_permissions(targets: list, project_code, current_identity):
     '''
         Project admin can delete files
         Project collaborator can only delete the file belong to them
@@ -123,7 +126,7 @@ def validate_delete_permissions(targets: list, project_code, current_identity):
     user_project_role = get_project_role(project_code, current_identity)
     if user_project_role not in ["admin", "platform-admin"]:
         for target in targets:
-            source = get_entity_by_id(target['id'])
+            source = await get_entity_by_id(target['id'])
             zone = "greenroom" if source["zone"] == 0 else "core"
 
             if user_project_role == 'contributor':
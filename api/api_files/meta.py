@@ -12,7 +12,6 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-import requests
 from common import LoggerFactory
 from fastapi import APIRouter, Depends, Request
 from fastapi.responses import JSONResponse
@@ -21,8 +20,13 @@ from fastapi_utils import cbv
 from app.auth import jwt_required
 from config import ConfigClass
 from models.api_response import APIResponse, EAPIResponseCode
-from resources.error_handler import APIException
-from services.permissions_service.utils import get_project_role, has_permission
+from resources.json_utils import FastJSONResponse
+from resources.request_body import get_request_json
+from resources.upstream import upstream_clients
+from services.meta import decode_entities
+from services.permissions_service.utils import get_project_role, has_permission, has_permissions_batch
+
+from .utils import get_requested_fields, list_meta_items, project_items, upstream_fields
 
 _logger = LoggerFactory('api_meta').get_logger()
 
@@ -39,28 +43,27 @@ class FileDetailBulk:
     )
     async def post(self, request: Request):
         api_response = APIResponse()
-        data = await request.json()
+        data = await get_request_json(request)
+        fields = get_requested_fields(request)
         payload = {
             "ids": data.get("ids", [])
         }
-        response = requests.get(ConfigClass.METADATA_SERVICE + "items/batch", params=payload)
+        if fields:
+            payload["fields"] = upstream_fields(fields, ["container_code", "zone"])
+        response = await upstream_clients.get('metadata').get(
+            ConfigClass.METADATA_SERVICE + "items/batch", params=payload
+        )
         if response.status_code != 200:
             return JSONResponse(content=response.json(), status_code=response.status_code)
-        file_node = response.json()["result"]
-
-        for file_node in response.json()["result"]:
-            if file_node["zone"] == 0:
-                zone = "greenroom"
-            else:
-                zone = "core"
-            if not has_permission(file_node["container_code"], "file", zone, "view", self.current_identity):
-                api_response.set_code(EAPIResponseCode.forbidden)
-                api_response.set_error_msg("Permission Denied")
-                return api_response.json_response()
-        result = response.json()
-        for entity in result["result"]:
-            entity["zone"] = "greenroom" if entity["zone"] == 0 else "core"
-        return JSONResponse(content=result, status_code=response.status_code)
+        result = decode_entities(response)
+        checks = [(file_node["container_code"], file_node["zone"], "view") for file_node in result["result"]]
+        permissions = await has_permissions_batch("file", checks, self.current_identity)
+        if not all(permissions.values()):
+            api_response.set_code(EAPIResponseCode.forbidden)
+            api_response.set_error_msg("Permission Denied")
+            return api_response.json_response()
+        result["result"] = project_items(result["result"], fields)
+        return FastJSONResponse(content=result, status_code=response.status_code)
 
 
 @cbv.cbv(router)
@@ -73,7 +76,9 @@ class FileMeta:
     )
     async def get(self, request: Request):
         """
-            Proxy for entity info file META API, handles permission checks
+            Proxy for entity info file META API, handles permission checks.
+            Pass pagination=cursor, then the returned next_cursor as cursor, to page by keyset instead of offset.
+            Pass fields=name,size,... to return only these attributes of the items.
         """
         api_response = APIResponse()
         _logger.info('Call API for fetching file info')
@@ -89,6 +94,7 @@ class FileMeta:
         name = request.query_params.get('name', '')
         owner = request.query_params.get('owner', '')
         archived = request.query_params.get('archived', False)
+        fields = get_requested_fields(request)
 
         if source_type not in ["trash", "project", "folder", "collection"]:
             _logger.error('Invalid zone')
@@ -123,6 +129,8 @@ class FileMeta:
         if owner:
             payload["owner"] = owner.replace("%", "\%") + "%",
         payload["archived"] = archived
+        if fields:
+            payload["fields"] = upstream_fields(fields, ["zone", order_by])
 
         project_role = get_project_role(project_code, self.current_identity)
 
@@ -151,7 +159,7 @@ class FileMeta:
 
         if zone == "all":
             zone = "*"
-        if not has_permission(project_code, "file", zone.lower(), "view", self.current_identity):
+        if not await has_permission(project_code, "file", zone.lower(), "view", self.current_identity):
             username = self.current_identity["username"]
             _logger.info(f"Permissions denied for user {username} in meta listing")
             api_response.set_code(EAPIResponseCode.forbidden)
@@ -162,11 +170,5 @@ class FileMeta:
             url = ConfigClass.METADATA_SERVICE + 'collection/items'
         else:
             url = ConfigClass.METADATA_SERVICE + 'items/search'
-        response = requests.get(url, params=payload)
-        if response.status_code != 200:
-            error_msg = f'Error calling Meta service get_node_by_id: {response.json()}'
-            raise APIException(error_msg=error_msg, status_code=EAPIResponseCode.internal_error.value)
-        result = response.json()
-        for entity in result["result"]:
-            entity["zone"] = "greenroom" if entity["zone"] == 0 else "core"
-        return JSONResponse(content=result, status_code=response.status_code)
+        result = await list_meta_items(request, url, payload, fields)
+        return FastJSONResponse(content=result, status_code=200)
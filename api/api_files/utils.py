@@ -12,19 +12,197 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-import requests
+import re
 
 from config import ConfigClass
 from models.api_response import EAPIResponseCode
+from resources import json_utils
 from resources.error_handler import APIException
+from resources.pagination import InvalidCursor
+from resources.pagination import decode_cursor
+from resources.pagination import encode_cursor
+from resources.pagination import is_after
+from resources.pagination import item_key
+from resources.pagination import next_cursor
+from resources.pagination import sort_key
+from resources.upstream import upstream_clients
+from services.meta import relabel_zones
 
+FIELD_PATTERN = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)*$')
 
-def get_collection_by_id(collection_geid):
+
+def get_requested_fields(request):
+    """Return fields listed in the fields query parameter, or None when the whole items are requested.
+
+    Fields are comma separated and can be repeated, nested attributes are addressed with dots, e.g. extended.extra.tags.
+    """
+
+    fields = []
+    for value in request.query_params.getlist('fields'):
+        fields += [field.strip() for field in value.split(',') if field.strip()]
+    if not fields:
+        return None
+
+    for field in fields:
+        if not FIELD_PATTERN.match(field):
+            raise APIException(status_code=EAPIResponseCode.bad_request.value, error_msg=f'Invalid field "{field}"')
+    # item id is always kept, it identifies the rows of a listing
+    return list(dict.fromkeys(['id'] + fields))
+
+
+def project_item(item, fields):
+    """Return copy of item holding only the listed fields, missing fields are left out."""
+
+    projected = {}
+    for field in fields:
+        *parents, name = field.split('.')
+        if any('.'.join(parents[:i]) in fields for i in range(1, len(parents) + 1)):
+            # the enclosing attribute is already copied whole
+            continue
+        source = item
+        for parent in parents:
+            source = source.get(parent) if isinstance(source, dict) else None
+        if not isinstance(source, dict) or name not in source:
+            continue
+        target = projected
+        for parent in parents:
+            target = target.setdefault(parent, {})
+        target[name] = source[name]
+    return projected
+
+
+def project_items(items, fields):
+    if fields is None:
+        return items
+    return [project_item(item, fields) for item in items]
+
+
+def upstream_fields(fields, required=()):
+    """Return value of the fields parameter for the metadata service, including the fields the BFF itself reads."""
+
+    return ','.join(dict.fromkeys(list(fields) + list(required)))
+
+
+async def get_collection_by_id(collection_geid):
     url = f'{ConfigClass.METADATA_SERVICE}collection/{collection_geid}/'
-    response = requests.get(url)
+    response = await upstream_clients.get('metadata').get(url)
     res = response.json()['result']
     if res:
         return res
     else:
         raise APIException(status_code=EAPIResponseCode.not_found.value,
                            error_msg=f'Collection {collection_geid} does not exist')
+
+
+async def fetch_listing_page(url, params):
+    response = await upstream_clients.get('metadata').get(url, params=params)
+    if response.status_code != 200:
+        error_msg = f'Error calling Meta service get_node_by_id: {response.json()}'
+        raise APIException(error_msg=error_msg, status_code=EAPIResponseCode.internal_error.value)
+    return json_utils.loads(response.content)
+
+
+def use_upstream_cursor(result, sorting, order):
+    """Wrap the cursor of a metadata service paginating with cursors itself into a listing cursor."""
+
+    upstream = result.get('next_cursor')
+    result['next_cursor'] = None
+    if result['result'] and upstream is not None:
+        following = next_cursor(result['result'][-1], sorting, order, 0)
+        following['upstream'] = upstream
+        result['next_cursor'] = encode_cursor(following)
+    return result
+
+
+def is_page_complete(candidates, last_row, page_size, sorting, descending):
+    """Return whether the first page_size candidates are known.
+
+    Upstream rows come sorted by the sort value, so that is the case once a row sorting after the sort value of the
+    page_size-th candidate was read, every item with a smaller or equal value has been seen by then.
+    """
+
+    if len(candidates) < page_size:
+        return False
+    values = sorted((sort_key(item.get(sorting)) for _, item in candidates), reverse=descending)
+    value = sort_key(last_row.get(sorting))
+    return value < values[page_size - 1] if descending else value > values[page_size - 1]
+
+
+async def scan_items_after(url, payload, page, rows, cursor):
+    """Return up to page_size items after cursor in the listing order, reading offset pages from page on.
+
+    Rows holds the items of page which was already read. Returns the items, the upstream offset of the first row sharing
+    the sort value of the last item and whether more items follow.
+    """
+
+    page_size = payload['page_size']
+    sorting = payload['sorting']
+    descending = payload['order'] != 'asc'
+    candidates = []
+    while True:
+        candidates += [
+            (index, row) for index, row in enumerate(rows, page * page_size) if not cursor or is_after(row, cursor)
+        ]
+        exhausted = len(rows) < page_size
+        if exhausted or is_page_complete(candidates, rows[-1], page_size, sorting, descending):
+            break
+        page += 1
+        rows = (await fetch_listing_page(url, dict(payload, page=page)))['result']
+
+    candidates.sort(key=lambda candidate: item_key(candidate[1], sorting), reverse=descending)
+    items = [item for _, item in candidates[:page_size]]
+    if not items:
+        return items, 0, False
+
+    last_value = items[-1].get(sorting)
+    offset = min(index for index, item in candidates if item.get(sorting) == last_value)
+    return items, offset, len(candidates) > page_size or not exhausted
+
+
+async def list_items_after(url, payload, page_size, cursor=None):
+    """Return the listing page that follows cursor and the cursor for the page after it.
+
+    When the metadata service paginates with cursors itself, its cursor is passed through. Otherwise the keyset is
+    emulated on top of offset pages, with items ordered by sort value and then by id. Reading starts one page before
+    the last returned item, as items deleted before it move everything back, and anything up to the last returned item
+    is skipped. Files added or deleted while browsing are neither repeated nor skipped.
+    """
+
+    sorting = payload['sorting']
+    order = payload['order']
+    payload = dict(payload, page_size=page_size)
+    payload.pop('page', None)
+    if cursor and cursor.get('upstream'):
+        result = await fetch_listing_page(url, dict(payload, cursor=cursor['upstream']))
+        return use_upstream_cursor(result, sorting, order)
+
+    page = max(cursor['offset'] // page_size - 1, 0) if cursor else 0
+    result = await fetch_listing_page(url, dict(payload, page=page))
+    if result.get('next_cursor') is not None:
+        # metadata service keeps the position itself
+        return use_upstream_cursor(result, sorting, order)
+
+    items, offset, has_more = await scan_items_after(url, payload, page, result['result'], cursor)
+    result['result'] = items
+    result['next_cursor'] = encode_cursor(next_cursor(items[-1], sorting, order, offset)) if has_more else None
+    return result
+
+
+async def list_meta_items(request, url, payload, fields):
+    """Return one page of a file listing with zone labels and the requested fields.
+
+    The listing is paged by keyset when the request passes a cursor or pagination=cursor, and by offset otherwise.
+    """
+
+    token = request.query_params.get('cursor', '')
+    if token or request.query_params.get('pagination') == 'cursor':
+        try:
+            cursor = decode_cursor(token, payload['sorting'], payload['order']) if token else None
+        except InvalidCursor as e:
+            raise APIException(status_code=EAPIResponseCode.bad_request.value, error_msg=str(e))
+        result = await list_items_after(url, payload, payload['page_size'], cursor)
+    else:
+        result = await fetch_listing_page(url, payload)
+    relabel_zones(result['result'])
+    result['result'] = project_items(result['result'], fields)
+    return result
@@ -14,7 +14,6 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import json
 
-import requests
 from common import LoggerFactory
 from fastapi import APIRouter, Depends, Request
 from fastapi.responses import JSONResponse
@@ -23,9 +22,11 @@ from fastapi_utils import cbv
 from app.auth import jwt_required
 from config import ConfigClass
 from models.api_response import APIResponse, EAPIResponseCode
+from resources.request_body import get_request_json
+from resources.upstream import upstream_clients
 from services.permissions_service.decorators import PermissionsCheck
 
-from .utils import get_collection_by_id
+from .utils import get_collection_by_id, get_requested_fields, project_items, upstream_fields
 
 _logger = LoggerFactory('api_files_ops_v1').get_logger()
 
@@ -48,17 +49,17 @@ class VirtualFolderFiles:
 
         try:
             # Get collection
-            vfolder = get_collection_by_id(collection_id)
+            vfolder = await get_collection_by_id(collection_id)
             if self.current_identity["role"] != "admin":
                 if vfolder["owner"] != self.current_identity["username"]:
                     _res.set_code(EAPIResponseCode.bad_request)
                     _res.set_result("no permission for this project")
                     return _res.json_response()
 
-            data = await request.json()
+            data = await get_request_json(request)
             data['id'] = collection_id
             url = f'{ConfigClass.METADATA_SERVICE}collection/items/'
-            response = requests.post(url, json=data)
+            response = await upstream_clients.get('metadata').post(url, json=data)
             if response.status_code != 200:
                 _logger.error('Failed to add items to collection:   ' + response.text)
                 _res.set_code(EAPIResponseCode.internal_error)
@@ -87,17 +88,17 @@ class VirtualFolderFiles:
 
         try:
             # Get collection
-            vfolder = get_collection_by_id(collection_id)
+            vfolder = await get_collection_by_id(collection_id)
             if self.current_identity["role"] != "admin":
                 if vfolder["owner"] != self.current_identity["username"]:
                     _res.set_code(EAPIResponseCode.bad_request)
                     _res.set_result("no permission for this project")
                     return _res.json_response()
 
-            data = await request.json()
+            data = await get_request_json(request)
             data['id'] = collection_id
             url = f'{ConfigClass.METADATA_SERVICE}collection/items/'
-            response = requests.delete(url, json=data)
+            response = await upstream_clients.get('metadata').request("DELETE", url, json=data)
             if response.status_code != 200:
                 _logger.error('Failed to remove items from collection:   ' + response.text)
                 _res.set_code(EAPIResponseCode.internal_error)
@@ -124,10 +125,11 @@ class VirtualFolderFiles:
         Get items from vfolder
         """
         _res = APIResponse()
+        fields = get_requested_fields(request)
 
         try:
             # Get collection
-            vfolder = get_collection_by_id(collection_id)
+            vfolder = await get_collection_by_id(collection_id)
             if self.current_identity["role"] != "admin":
                 if vfolder["owner"] != self.current_identity["username"]:
                     _res.set_code(EAPIResponseCode.bad_request)
@@ -136,15 +138,20 @@ class VirtualFolderFiles:
 
             url = f'{ConfigClass.METADATA_SERVICE}collection/items/'
             params = {'id': collection_id}
-            response = requests.get(url, params=params)
+            if fields:
+                params['fields'] = upstream_fields(fields)
+            response = await upstream_clients.get('metadata').get(url, params=params)
             if response.status_code != 200:
                 _logger.error('Failed to get items from collection:   ' + response.text)
                 _res.set_code(EAPIResponseCode.internal_error)
                 _res.set_result("Failed to get items from collection")
                 return _res.json_response()
             else:
-                _logger.info('Successfully retrieved items from collection: {}'.format(json.dumps(response.json())))
-                return response.json()
+                result = response.json()
+                _logger.info('Successfully retrieved items from collection: {}'.format(json.dumps(result)))
+                if fields:
+                    result['result'] = project_items(result['result'], fields)
+                return result
 
         except Exception as e:
             _logger.error("errors in retrieve items to collection: {}".format(str(e)))
@@ -167,7 +174,9 @@ class VirtualFolder:
             "owner": self.current_identity['username'],
             'container_code': request.query_params.get('project_code')
         }
-        response = requests.get(f'{ConfigClass.METADATA_SERVICE}collection/search/', params=payload)
+        response = await upstream_clients.get('metadata').get(
+            f'{ConfigClass.METADATA_SERVICE}collection/search/', params=payload
+        )
         return JSONResponse(content=response.json(), status_code=response.status_code)
 
     @router.post(
@@ -176,14 +185,16 @@ class VirtualFolder:
         dependencies=[Depends(PermissionsCheck('collections', 'core', 'create'))]
     )
     async def post(self, request: Request):
-        data = await request.json()
+        data = await get_request_json(request)
         payload = {
             "owner": self.current_identity['username'],
             **data,
             'container_code': request.query_params.get('project_code'),
         }
         payload['container_code'] = payload.pop('project_code')
-        response = requests.post(f'{ConfigClass.METADATA_SERVICE}collection/', json=payload)
+        response = await upstream_clients.get('metadata').post(
+            f'{ConfigClass.METADATA_SERVICE}collection/', json=payload
+        )
         return JSONResponse(content=response.json(), status_code=response.status_code)
 
 
@@ -195,12 +206,12 @@ class VirtualFolderInfo:
         '/collections/{collection_id}',
         summary="delete collection",
     )
-    def delete(self, collection_id: str, request: Request):
+    async def delete(self, collection_id: str, request: Request):
         _res = APIResponse()
 
         try:
             # Get collection
-            vfolder = get_collection_by_id(collection_id)
+            vfolder = await get_collection_by_id(collection_id)
 
             if self.current_identity["role"] != "admin":
                 if vfolder["owner"] != self.current_identity["username"]:
@@ -210,7 +221,7 @@ class VirtualFolderInfo:
 
             url = f'{ConfigClass.METADATA_SERVICE}collection/'
             params = {'id': collection_id}
-            response = requests.delete(url, params=params)
+            response = await upstream_clients.get('metadata').delete(url, params=params)
             if response.status_code != 200:
                 _logger.error('Failed to delete collection:   ' + response.text)
                 _res.set_code(EAPIResponseCode.internal_error)
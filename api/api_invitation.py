@@ -12,7 +12,6 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-import requests
 from common import LoggerFactory, ProjectClient
 from fastapi import APIRouter, Depends, Request
 from fastapi.responses import JSONResponse
@@ -22,6 +21,8 @@ from app.auth import jwt_required
 from config import ConfigClass
 from models.api_response import APIResponse, EAPIResponseCode
 from resources.error_handler import APIException
+from resources.request_body import get_request_json
+from resources.upstream import upstream_clients
 from resources.utils import check_invite_permissions
 from services.permissions_service.utils import has_permission
 
@@ -40,7 +41,7 @@ class InvitationsRestful:
         """This method allow to create invitation in platform."""
         _logger = LoggerFactory('api_invitation').get_logger()
         my_res = APIResponse()
-        post_json = await request.json()
+        post_json = await get_request_json(request)
         relation_data = post_json.get('relationship', {})
 
         _logger.info(f'Start Creating Invitation: {post_json}')
@@ -49,14 +50,14 @@ class InvitationsRestful:
             project_client = ProjectClient(ConfigClass.PROJECT_SERVICE, ConfigClass.REDIS_URL)
             project = await project_client.get(id=relation_data.get('project_geid'))
 
-            if not check_invite_permissions(await project.json(), self.current_identity):
+            if not await check_invite_permissions(await project.json(), self.current_identity):
                 my_res.set_result('Permission denied')
                 my_res.set_code(EAPIResponseCode.forbidden)
                 return my_res.json_response()
 
         try:
             post_json['invited_by'] = self.current_identity['username']
-            response = requests.post(ConfigClass.AUTH_SERVICE + 'invitations', json=post_json)
+            response = await upstream_clients.get('auth').post(ConfigClass.AUTH_SERVICE + 'invitations', json=post_json)
         except Exception as e:
             error_msg = f'Error calling Auth service for invite create: {e}'
             _logger.error(error_msg)
@@ -87,13 +88,15 @@ class CheckUserPlatformRole:
             project_client = ProjectClient(ConfigClass.PROJECT_SERVICE, ConfigClass.REDIS_URL)
             project = await project_client.get(id=project_id)
 
-            if not has_permission(project.code, 'invite', '*', 'create', self.current_identity):
+            if not await has_permission(project.code, 'invite', '*', 'create', self.current_identity):
                 my_res.set_result('Permission denied')
                 my_res.set_code(EAPIResponseCode.unauthorized)
                 return my_res.json_response()
             params["project_code"] = project.code
         try:
-            response = requests.get(ConfigClass.AUTH_SERVICE + f'invitation/check/{email}', params=params)
+            response = await upstream_clients.get('auth').get(
+                ConfigClass.AUTH_SERVICE + f'invitation/check/{email}', params=params
+            )
         except Exception as e:
             error_msg = f'Error calling Auth service for invite check: {e}'
             _logger.error(error_msg)
@@ -114,7 +117,7 @@ class PendingUserRestful:
         _logger = LoggerFactory('api_pending_users').get_logger()
         _logger.info('fetching pending user api triggered')
         my_res = APIResponse()
-        post_json = await request.json()
+        post_json = await get_request_json(request)
 
         filters = post_json.get('filters', None)
         project_id = filters.get('project_id', None)
@@ -122,12 +125,14 @@ class PendingUserRestful:
         if self.current_identity['role'] != 'admin':
             project_client = ProjectClient(ConfigClass.PROJECT_SERVICE, ConfigClass.REDIS_URL)
             project = await project_client.get(id=project_id)
-            if not has_permission(project.code, 'invite', '*', 'view', self.current_identity):
+            if not await has_permission(project.code, 'invite', '*', 'view', self.current_identity):
                 my_res.set_code(EAPIResponseCode.forbidden)
                 my_res.set_error_msg('Permission denied')
                 return my_res.json_response()
         try:
-            response = requests.post(ConfigClass.AUTH_SERVICE + 'invitation-list/', json=post_json)
+            response = await upstream_clients.get('auth').post(
+                ConfigClass.AUTH_SERVICE + 'invitation-list/', json=post_json
+            )
         except Exception as e:
             error_msg = f'Error calling Auth service for invite list: {e}'
             _logger.error(error_msg)
@@ -12,12 +12,13 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-import requests
 from fastapi import APIRouter, Depends, Request
 from fastapi_utils import cbv
 
 from app.auth import jwt_required
 from config import ConfigClass
+from resources.request_body import get_request_json
+from resources.upstream import forward_headers, upstream_clients
 
 router = APIRouter(tags=["Knowledge Graph"])
 
@@ -33,6 +34,6 @@ class KGResource:
     )
     async def post(self, request: Request):
         url = ConfigClass.KG_SERVICE + "resources"
-        payload_json = await request.json()
-        respon = requests.post(url, json=payload_json, headers=request.headers)
+        payload_json = await get_request_json(request)
+        respon = await upstream_clients.get('kg').post(url, json=payload_json, headers=forward_headers(request))
         return respon.json(), respon.status_code
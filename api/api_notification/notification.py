@@ -12,13 +12,14 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-import requests
 from fastapi import APIRouter, Depends, Request
 from fastapi_utils import cbv
 
 from app.auth import jwt_required
 from config import ConfigClass
 from models.api_response import APIResponse, EAPIResponseCode
+from resources.request_body import get_request_json
+from resources.upstream import upstream_clients
 
 router = APIRouter(tags=["Notifications"])
 
@@ -34,7 +35,7 @@ class NotificationRestful:
     async def get(self, request: Request):
         api_response = APIResponse()
         params = request.query_params
-        response = requests.get(ConfigClass.NOTIFY_SERVICE + 'notification', params=params)
+        response = await upstream_clients.get('notify').get(ConfigClass.NOTIFY_SERVICE + 'notification', params=params)
         if response.status_code != 200:
             api_response.set_error_msg(response.json())
             return api_response.json_response()
@@ -51,8 +52,8 @@ class NotificationRestful:
             api_response.set_error_msg("Permission denied")
             api_response.set_code(EAPIResponseCode.forbidden)
             return api_response.json_response()
-        body = await request.json()
-        response = requests.post(ConfigClass.NOTIFY_SERVICE + 'notification', json=body)
+        body = await get_request_json(request)
+        response = await upstream_clients.get('notify').post(ConfigClass.NOTIFY_SERVICE + 'notification', json=body)
         if response.status_code != 200:
             api_response.set_error_msg(response.json())
             return api_response.json_response()
@@ -70,8 +71,10 @@ class NotificationRestful:
             api_response.set_code(EAPIResponseCode.forbidden)
             return api_response.json_response()
         params = request.query_params
-        body = await request.json()
-        response = requests.put(ConfigClass.NOTIFY_SERVICE + 'notification', params=params, json=body)
+        body = await get_request_json(request)
+        response = await upstream_clients.get('notify').put(
+            ConfigClass.NOTIFY_SERVICE + 'notification', params=params, json=body
+        )
         if response.status_code != 200:
             api_response.set_error_msg(response.json())
             return api_response.json_response()
@@ -89,7 +92,9 @@ class NotificationRestful:
             api_response.set_code(EAPIResponseCode.forbidden)
             return api_response.json_response()
         params = request.query_params
-        response = requests.delete(ConfigClass.NOTIFY_SERVICE + 'notification', params=params)
+        response = await upstream_clients.get('notify').delete(
+            ConfigClass.NOTIFY_SERVICE + 'notification', params=params
+        )
         if response.status_code != 200:
             api_response.set_error_msg(response.json())
             return api_response.json_response()
@@ -108,7 +113,7 @@ class NotificationsRestful:
     async def get(self, request: Request):
         api_response = APIResponse()
         params = request.query_params
-        response = requests.get(ConfigClass.NOTIFY_SERVICE + 'notifications', params=params)
+        response = await upstream_clients.get('notify').get(ConfigClass.NOTIFY_SERVICE + 'notifications', params=params)
         if response.status_code != 200:
             api_response.set_error_msg(response.json())
             return api_response.json_response()
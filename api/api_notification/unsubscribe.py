@@ -12,13 +12,14 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-import requests
 from fastapi import APIRouter, Depends, Request
 from fastapi_utils import cbv
 
 from app.auth import jwt_required
 from config import ConfigClass
 from models.api_response import APIResponse
+from resources.request_body import get_request_json
+from resources.upstream import upstream_clients
 from services.permissions_service.decorators import PermissionsCheck
 
 router = APIRouter(tags=["Unsubscribe"])
@@ -34,8 +35,8 @@ class UnsubscribeRestful:
     )
     async def post(self, request: Request):
         api_response = APIResponse()
-        body = await request.json()
-        response = requests.post(ConfigClass.NOTIFY_SERVICE + 'unsubscribe', json=body)
+        body = await get_request_json(request)
+        response = await upstream_clients.get('notify').post(ConfigClass.NOTIFY_SERVICE + 'unsubscribe', json=body)
         if response.status_code != 200:
             api_response.set_error_msg(response.json())
             return api_response.json_response()
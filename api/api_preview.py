@@ -12,15 +12,15 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-import requests
 from common import LoggerFactory
-from fastapi import APIRouter, Depends, Request, Response
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi_utils import cbv
 
 from app.auth import jwt_required
 from config import ConfigClass
 from models.api_response import APIResponse, EAPIResponseCode
+from resources.upstream import forward_headers, stream_upstream_response, upstream_clients
 from services.dataset import get_dataset_by_id
 from services.meta import get_entity_by_id
 
@@ -28,6 +28,17 @@ _logger = LoggerFactory('api_preview').get_logger()
 
 router = APIRouter(tags=["Preview"])
 
+# forwarded request headers include range and conditional headers, so the dataset service can answer with 206 or 304
+PREVIEW_RESPONSE_HEADERS = {
+    "accept-ranges",
+    "cache-control",
+    "content-encoding",
+    "content-length",
+    "content-range",
+    "etag",
+    "last-modified",
+}
+
 
 @cbv.cbv(router)
 class Preview:
@@ -43,8 +54,8 @@ class Preview:
 
         data = request.query_params
         dataset_id = data.get("dataset_geid")
-        dataset_node = get_dataset_by_id(dataset_id)
-        file_node = get_entity_by_id(file_id)
+        dataset_node = await get_dataset_by_id(dataset_id)
+        file_node = await get_entity_by_id(file_id)
 
         if dataset_node["code"] != file_node["container_code"]:
             api_response.set_code(EAPIResponseCode.forbidden)
@@ -57,17 +68,17 @@ class Preview:
             return api_response.json_response()
 
         try:
-            response = requests.get(
+            response = await upstream_clients.get('dataset').get(
                 ConfigClass.DATASET_SERVICE + f"{file_id}/preview",
                 params=data,
-                headers=request.headers
+                headers=forward_headers(request)
             )
         except Exception as e:
             _logger.info(f"Error calling dataops gr: {str(e)}")
             api_response.set_code(EAPIResponseCode.internal_error)
             api_response.set_result(f"Error calling dataops gr: {str(e)}")
             return api_response.json_response()
-        return JSONResponse(content=response.json(), code=response.status_code)
+        return JSONResponse(content=response.json(), status_code=response.status_code)
 
 
 @cbv.cbv(router)
@@ -84,8 +95,8 @@ class StreamPreview:
 
         data = request.query_params
         dataset_id = data.get("dataset_geid")
-        dataset_node = get_dataset_by_id(dataset_id)
-        file_node = get_entity_by_id(file_id)
+        dataset_node = await get_dataset_by_id(dataset_id)
+        file_node = await get_entity_by_id(file_id)
 
         if dataset_node["code"] != file_node["container_code"]:
             _logger.error(f"File doesn't belong to dataset file: {file_id}, dataset: {dataset_id}")
@@ -99,14 +110,19 @@ class StreamPreview:
             return api_response.json_response()
 
         try:
-            response = requests.get(
+            client = upstream_clients.get('dataset')
+            upstream_request = client.build_request(
+                "GET",
                 ConfigClass.DATASET_SERVICE + f"{file_id}/preview/stream",
                 params=data,
-                stream=True
+                headers=forward_headers(request),
             )
-            return Response(
-                content=response.iter_content(chunk_size=10 * 1025),
-                media_type=response.headers.get("Content-Type", "text/plain")
+            response = await client.send(upstream_request, stream=True)
+            return StreamingResponse(
+                stream_upstream_response(response, ConfigClass.PREVIEW_STREAM_CHUNK_SIZE),
+                status_code=response.status_code,
+                headers={key: value for key, value in response.headers.items() if key in PREVIEW_RESPONSE_HEADERS},
+                media_type=response.headers.get("Content-Type", "text/plain"),
             )
         except Exception as e:
             _logger.info(f"Error calling dataset service: {str(e)}")
@@ -12,7 +12,6 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-import requests
 from common import LoggerFactory, ProjectClient
 from fastapi import APIRouter, Depends, Request
 from fastapi_utils import cbv
@@ -20,6 +19,8 @@ from fastapi_utils import cbv
 from app.auth import jwt_required
 from config import ConfigClass
 from models.api_response import APIResponse
+from resources.request_body import get_request_json
+from resources.upstream import upstream_clients
 from services.permissions_service.decorators import PermissionsCheck
 
 _logger = LoggerFactory('api_project').get_logger()
@@ -72,7 +73,7 @@ class VirtualFolder:
     )
     async def put(self, project_id: str, request: Request):
         url = ConfigClass.METADATA_SERVICE + "collection/"
-        payload = await request.json()
+        payload = await get_request_json(request)
         payload["owner"] = self.current_identity["username"]
-        response = requests.put(url, json=payload)
+        response = await upstream_clients.get('metadata').put(url, json=payload)
         return response.json()
@@ -13,8 +13,17 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import asyncio
+import csv
+import io
 from typing import Any
+from typing import AsyncIterator
+from typing import Awaitable
+from typing import Callable
 from typing import Dict
+from typing import List
+from typing import Optional
+from urllib.parse import urlencode
 
 from common import LoggerFactory
 from common import ProjectClient
@@ -22,20 +31,38 @@ from common.project.project_client import ProjectObject
 from fastapi import APIRouter
 from fastapi import Depends
 from fastapi import Request
+from fastapi.responses import StreamingResponse
 from starlette.datastructures import MultiDict
 
+from api.api_files.utils import get_requested_fields
+from api.api_files.utils import project_item
 from app.auth import jwt_required
 from config import ConfigClass
 from models.api_response import APIResponse
 from models.api_response import EAPIResponseCode
+from resources import json_utils
+from resources.error_handler import APIException
+from resources.json_utils import NDJSON_MEDIA_TYPE
+from resources.swr_cache import StaleWhileRevalidateCache
+from resources.upstream import upstream_clients
 from services.permissions_service.utils import get_project_role
+from services.permissions_service.utils import has_permission
 from services.search.client import SearchServiceClient
 from services.search.client import get_search_service_client
 
 _logger = LoggerFactory('api_project_files').get_logger()
 
+CSV_MEDIA_TYPE = 'text/csv'
+
 router = APIRouter(prefix='/project-files', tags=['Project Files'], dependencies=[Depends(jwt_required)])
 
+project_stats_cache = StaleWhileRevalidateCache(
+    'project_stats',
+    ConfigClass.PROJECT_STATS_CACHE_SIZE,
+    ConfigClass.PROJECT_STATS_CACHE_FRESH_TTL,
+    ConfigClass.PROJECT_STATS_CACHE_STALE_TTL,
+)
+
 
 def get_zone_label(zone: int) -> str:
     """Get zone label for zone number."""
@@ -81,6 +108,40 @@ def _replace_zone_labels_in_statistics_response(response: Dict[str, Any]) -> Dic
     return response
 
 
+def get_stats_cache_key(kind: str, project_code: str, params: MultiDict) -> str:
+    """Get cache key for a project statistic and its query parameters."""
+
+    return f'{kind}:{project_code}:{urlencode(sorted(params.multi_items()))}'
+
+
+async def get_project_size(
+    project_code: str, params: MultiDict, search_service_client: SearchServiceClient
+) -> Dict[str, Any]:
+    return await project_stats_cache.get(
+        get_stats_cache_key('size', project_code, params),
+        lambda: search_service_client.get_project_size(project_code, params),
+    )
+
+
+async def get_project_statistics(
+    project_code: str, params: MultiDict, search_service_client: SearchServiceClient
+) -> Dict[str, Any]:
+    result = await project_stats_cache.get(
+        get_stats_cache_key('statistics', project_code, params),
+        lambda: search_service_client.get_project_statistics(project_code, params),
+    )
+    return _replace_zone_labels_in_statistics_response(result)
+
+
+async def get_project_activity(
+    project_code: str, params: MultiDict, search_service_client: SearchServiceClient
+) -> Dict[str, Any]:
+    return await project_stats_cache.get(
+        get_stats_cache_key('activity', project_code, params),
+        lambda: search_service_client.get_project_activity(project_code, params),
+    )
+
+
 async def get_project(project_code: str) -> ProjectObject:
     """Get project by code as a dependency."""
 
@@ -88,6 +149,126 @@ async def get_project(project_code: str) -> ProjectObject:
     return await project_client.get(code=project_code)
 
 
+async def iter_search_items(
+    search_service_client: SearchServiceClient, params: MultiDict
+) -> AsyncIterator[Dict[str, Any]]:
+    """Walk all pages of the search results, one page in memory at a time, and relabel zones on the way.
+
+    The first page is fetched before returning, so an unavailable search service is reported before streaming starts.
+    """
+
+    page_size = ConfigClass.SEARCH_EXPORT_PAGE_SIZE
+    params['page_size'] = page_size
+    params['page'] = 0
+    first = await search_service_client.get_metadata_items(params)
+
+    async def items() -> AsyncIterator[Dict[str, Any]]:
+        page = first
+        while True:
+            for item in page['result']:
+                item['zone'] = get_zone_label(item['zone'])
+                yield item
+            params['page'] += 1
+            if len(page['result']) < page_size or params['page'] >= page.get('num_of_pages', params['page'] + 1):
+                return
+            page = await search_service_client.get_metadata_items(params)
+
+    return items()
+
+
+async def stream_ndjson(
+    items: AsyncIterator[Dict[str, Any]], fields: Optional[List[str]] = None
+) -> AsyncIterator[bytes]:
+    """Write one JSON line per item and a last line with the total, failures end the stream with the error.
+
+    When fields are given each line holds only those fields of the item.
+    """
+
+    total = 0
+    try:
+        async for item in items:
+            total += 1
+            yield json_utils.dumps(project_item(item, fields) if fields else item) + b'\n'
+    except Exception as e:
+        _logger.error(f'Failed to export search results: {e}')
+        yield json_utils.dumps({'operation_status': 'FAILED', 'error_msg': str(e)}) + b'\n'
+        return
+    yield json_utils.dumps({'total': total}) + b'\n'
+
+
+async def stream_csv(items: AsyncIterator[Dict[str, Any]], fields: List[str]) -> AsyncIterator[bytes]:
+    """Write header and one row per item, nested values are written as JSON.
+
+    A failure aborts the response, so an incomplete file is never mistaken for a complete one.
+    """
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    rows = 0
+    async for item in items:
+        writer.writerow(
+            [
+                json_utils.dumps(value).decode() if isinstance(value, (dict, list)) else value
+                for value in (item.get(field) for field in fields)
+            ]
+        )
+        rows += 1
+        if rows % 100 == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+async def export_search_results(
+    search_service_client: SearchServiceClient,
+    params: MultiDict,
+    fields: Optional[List[str]],
+    accept: str,
+    project_code: str,
+) -> StreamingResponse:
+    """Stream all search results as NDJSON or CSV, both limited to the requested fields when there are any."""
+
+    params.pop('fields', None)
+    items = await iter_search_items(search_service_client, params)
+    if NDJSON_MEDIA_TYPE in accept:
+        return StreamingResponse(stream_ndjson(items, fields), media_type=NDJSON_MEDIA_TYPE)
+    return StreamingResponse(
+        stream_csv(items, fields or ConfigClass.SEARCH_EXPORT_CSV_FIELDS),
+        media_type=CSV_MEDIA_TYPE,
+        headers={'Content-Disposition': f'attachment; filename="{project_code}-files.csv"'},
+    )
+
+
+async def query_search_service(
+    request: Request, project_code: str, fields: Optional[List[str]], search_service_client: SearchServiceClient
+):
+    """Return one page of search results or, when the Accept header asks for it, stream all of them."""
+
+    try:
+        params = MultiDict(request.query_params)
+        params['container_type'] = 'project'
+        params['container_code'] = project_code
+
+        if 'zone' in params:
+            params['zone'] = get_zone_int(params['zone'])
+
+        accept = request.headers.get('accept', '')
+        if NDJSON_MEDIA_TYPE in accept or CSV_MEDIA_TYPE in accept:
+            return await export_search_results(search_service_client, params, fields, accept, project_code)
+
+        result = await search_service_client.get_metadata_items(params)
+        _logger.info('Successfully fetched data from search service')
+        return _replace_zone_labels_in_search_response(result)
+    except Exception as e:
+        _logger.error(f'Failed to query data from search service: {e}')
+        response = APIResponse()
+        response.set_code(EAPIResponseCode.internal_error)
+        response.set_result('Failed to query data from search service')
+        return response.json_response()
+
+
 @router.get('/{project_code}/search', summary='Search through project files.')
 async def search(
     request: Request,
@@ -95,9 +276,14 @@ async def search(
     project: ProjectObject = Depends(get_project),
     search_service_client: SearchServiceClient = Depends(get_search_service_client),
 ):
-    """Search through project files."""
+    """Search through project files.
+
+    With an Accept header of application/x-ndjson or text/csv all matching files are streamed instead of one page.
+    """
 
     response = APIResponse()
+    # invalid fields are rejected before anything is streamed
+    fields = get_requested_fields(request)
 
     if current_identity['role'] != 'admin':
         project_role = get_project_role(project.code, current_identity)
@@ -145,22 +331,7 @@ async def search(
                 response.set_error_msg('Permission Denied')
                 return response.json_response()
 
-    try:
-        params = MultiDict(request.query_params)
-        params['container_type'] = 'project'
-        params['container_code'] = project.code
-
-        if 'zone' in params:
-            params['zone'] = get_zone_int(params['zone'])
-
-        result = await search_service_client.get_metadata_items(params)
-        _logger.info('Successfully fetched data from search service')
-        return _replace_zone_labels_in_search_response(result)
-    except Exception as e:
-        _logger.error(f'Failed to query data from search service: {e}')
-        response.set_code(EAPIResponseCode.internal_error)
-        response.set_result('Failed to query data from search service')
-        return response.json_response()
+    return await query_search_service(request, project.code, fields, search_service_client)
 
 
 @router.get('/{project_code}/size', summary='Get project storage usage.')
@@ -174,7 +345,7 @@ async def size(
 
     try:
         params = MultiDict(request.query_params)
-        result = await search_service_client.get_project_size(project.code, params)
+        result = await get_project_size(project.code, params, search_service_client)
         _logger.info('Successfully fetched data from search service')
         return result
     except Exception as e:
@@ -196,9 +367,9 @@ async def statistics(
 
     try:
         params = MultiDict(request.query_params)
-        result = await search_service_client.get_project_statistics(project.code, params)
+        result = await get_project_statistics(project.code, params, search_service_client)
         _logger.info('Successfully fetched data from search service')
-        return _replace_zone_labels_in_statistics_response(result)
+        return result
     except Exception as e:
         _logger.error(f'Failed to query data from search service: {e}')
         response = APIResponse()
@@ -218,7 +389,7 @@ async def activity(
 
     try:
         params = MultiDict(request.query_params)
-        result = await search_service_client.get_project_activity(project.code, params)
+        result = await get_project_activity(project.code, params, search_service_client)
         _logger.info('Successfully fetched data from search service')
         return result
     except Exception as e:
@@ -227,3 +398,117 @@ async def activity(
         response.set_code(EAPIResponseCode.internal_error)
         response.set_result('Failed to query data from search service')
         return response.json_response()
+
+
+def get_section_params(request: Request, section: str) -> MultiDict:
+    """Get query parameters addressed to a dashboard section, e.g. activity.page_size=10 for the activity section."""
+
+    prefix = f'{section}.'
+    return MultiDict(
+        [(key[len(prefix) :], value) for key, value in request.query_params.multi_items() if key.startswith(prefix)]
+    )
+
+
+async def check_section_permission(project_code: str, resource: str, current_identity: Dict[str, Any]) -> None:
+    if not await has_permission(project_code, resource, '*', 'view', current_identity):
+        raise APIException(error_msg='Permission Denied', status_code=EAPIResponseCode.forbidden.value)
+
+
+async def get_announcements(project: ProjectObject, params: MultiDict, current_identity: Dict[str, Any]) -> Any:
+    await check_section_permission(project.code, 'announcement', current_identity)
+    params['project_code'] = project.code
+    response = await upstream_clients.get('notify').get(ConfigClass.NOTIFY_SERVICE + 'announcements', params=params)
+    if response.status_code != 200:
+        raise APIException(error_msg=f'Error calling notify service: {response.text}', status_code=response.status_code)
+    return response.json()
+
+
+async def get_workbench_entries(project: ProjectObject, current_identity: Dict[str, Any]) -> Dict[str, Any]:
+    await check_section_permission(project.code, 'workbench', current_identity)
+    response = await upstream_clients.get('project').get(
+        ConfigClass.PROJECT_SERVICE + '/v1/workbenches', params={'project_id': project.id}
+    )
+    if response.status_code != 200:
+        error_msg = f'Error calling project service: {response.text}'
+        raise APIException(error_msg=error_msg, status_code=response.status_code)
+    entries = response.json()['result']
+
+    async def get_username(user_id: str) -> str:
+        response = await upstream_clients.get('auth').get(
+            ConfigClass.AUTH_SERVICE + 'admin/user', params={'user_id': user_id}
+        )
+        if response.status_code != 200:
+            error_msg = f'Error calling auth service: {response.text}'
+            raise APIException(error_msg=error_msg, status_code=response.status_code)
+        return response.json()['result']['username']
+
+    user_ids = list({entry['deployed_by_user_id'] for entry in entries})
+    usernames = dict(zip(user_ids, await asyncio.gather(*[get_username(user_id) for user_id in user_ids])))
+    for entry in entries:
+        entry['deploy_by_username'] = usernames[entry['deployed_by_user_id']]
+    return {entry['resource']: entry for entry in entries}
+
+
+async def get_project_details(project: ProjectObject, current_identity: Dict[str, Any]) -> Dict[str, Any]:
+    await check_section_permission(project.code, 'project', current_identity)
+    return await project.json()
+
+
+async def load_section(name: str, load: Callable[[], Awaitable[Any]]) -> Any:
+    """Load dashboard section within its timeout and return its result or the APIException describing the failure."""
+
+    timeout = ConfigClass.PROJECT_DASHBOARD_TIMEOUTS.get(name, ConfigClass.PROJECT_DASHBOARD_TIMEOUT)
+    try:
+        return await asyncio.wait_for(load(), timeout)
+    except asyncio.TimeoutError:
+        _logger.error(f'Timed out loading dashboard section {name}')
+        return APIException(error_msg='Timed out', status_code=EAPIResponseCode.gateway_timeout.value)
+    except APIException as e:
+        _logger.error(f'Failed to load dashboard section {name}: {e.content["error_msg"]}')
+        return e
+    except Exception as e:
+        _logger.error(f'Failed to load dashboard section {name}: {e}')
+        return APIException(error_msg=f'Failed to load {name}', status_code=EAPIResponseCode.internal_error.value)
+
+
+@router.get('/{project_code}/dashboard', summary='Get everything the project landing page shows in one request.')
+async def dashboard(
+    request: Request,
+    current_identity: Dict[str, Any] = Depends(jwt_required),
+    project: ProjectObject = Depends(get_project),
+    search_service_client: SearchServiceClient = Depends(get_search_service_client),
+):
+    """Get project details, storage usage, statistics, file activity, announcements and workbench entries.
+
+    Sections are loaded concurrently, each within its own timeout. Sections that fail are null in the result and the
+    reason is listed under errors, the other sections are still returned. Query parameters for a section are prefixed
+    with its name, e.g. activity.page_size=10.
+    """
+
+    sections = {
+        'project': lambda: get_project_details(project, current_identity),
+        'size': lambda: get_project_size(project.code, get_section_params(request, 'size'), search_service_client),
+        'statistics': lambda: get_project_statistics(
+            project.code, get_section_params(request, 'statistics'), search_service_client
+        ),
+        'activity': lambda: get_project_activity(
+            project.code, get_section_params(request, 'activity'), search_service_client
+        ),
+        'announcements': lambda: get_announcements(
+            project, get_section_params(request, 'announcements'), current_identity
+        ),
+        'workbench': lambda: get_workbench_entries(project, current_identity),
+    }
+    results = await asyncio.gather(*[load_section(name, load) for name, load in sections.items()])
+
+    result = {'errors': {}}
+    for name, section in zip(sections, results):
+        if isinstance(section, APIException):
+            result[name] = None
+            result['errors'][name] = {'code': section.status_code, 'error_msg': section.content['error_msg']}
+        else:
+            result[name] = section
+
+    response = APIResponse()
+    response.set_result(result)
+    return response.json_response()
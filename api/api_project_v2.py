@@ -16,7 +16,6 @@ import random
 
 import ldap
 import ldap.modlist as modlist
-import requests
 from common import (LoggerFactory, ProjectClient, ProjectNotFoundException,
                     get_boto3_admin_client, get_minio_policy_client)
 from fastapi import APIRouter, Depends, Request
@@ -28,6 +27,8 @@ from models.api_response import APIResponse, EAPIResponseCode
 from resources.error_handler import APIException
 from resources.minio import (get_admin_policy, get_collaborator_policy,
                              get_contributor_policy)
+from resources.request_body import get_request_json
+from resources.upstream import upstream_clients
 from services.permissions_service.decorators import PermissionsCheck
 
 _logger = LoggerFactory('api_project').get_logger()
@@ -49,7 +50,7 @@ class RestfulProjectsv2:
         This method allow to create a new project in platform.
         Notice that top-level container could only be created by site admin.
         """
-        post_data = await request.json()
+        post_data = await get_request_json(request)
         _res = APIResponse()
         _logger.info('Calling API for creating project: {}'.format(post_data))
 
@@ -80,13 +81,13 @@ class RestfulProjectsv2:
         ldap_create_user_group(project_code, description)
 
         # Keycloak Operation
-        keycloak_create_roles(project_code)
+        await keycloak_create_roles(project_code)
 
         # because the platform admin is inside `platform-admin` role
         # so we dont do anything
         # create username namespace folder for all platform admin
-        origin_users = get_platform_admins(project_code)
-        bulk_create_folder_usernamespace(users=origin_users, project_code=project_code)
+        origin_users = await get_platform_admins(project_code)
+        await bulk_create_folder_usernamespace(users=origin_users, project_code=project_code)
 
         return _res.json_response()
 
@@ -204,34 +205,34 @@ def ldap_create_user_group(code, description):
         _logger.error(f"Error while creating user group in ldap : {error}")
 
 
-def get_platform_admins(code):
+async def get_platform_admins(code):
     payload = {
         "role_names": ["platform-admin"],
         "status": "active",
         "page_size": 1000,  # temperally here to get all undeer platform admin
     }
-    response = requests.post(ConfigClass.AUTH_SERVICE + "admin/roles/users", json=payload)
+    response = await upstream_clients.get('auth').post(ConfigClass.AUTH_SERVICE + "admin/roles/users", json=payload)
 
     # exclude the admin user
     origin_users = response.json().get("result", [])
     return origin_users
 
 
-def keycloak_create_roles(code: str):
+async def keycloak_create_roles(code: str):
     payload = {
         "realm": ConfigClass.KEYCLOAK_REALM,
         "project_roles": ["admin", "collaborator", "contributor"],
         "project_code": code
     }
     keycloak_roles_url = ConfigClass.AUTH_SERVICE + 'admin/users/realm-roles'
-    res = requests.post(url=keycloak_roles_url, json=payload)
+    res = await upstream_clients.get('auth').post(url=keycloak_roles_url, json=payload)
     if res.status_code != 200:
         error_msg = 'create realm role: ' + str(res.__dict__)
         raise APIException(status_code=EAPIResponseCode.internal_error.value, error_msg=error_msg)
     return res
 
 
-def bulk_create_folder_usernamespace(users: list, project_code: str):
+async def bulk_create_folder_usernamespace(users: list, project_code: str):
     try:
         zone_list = ["greenroom", "core"]
         folders = []
@@ -249,7 +250,9 @@ def bulk_create_folder_usernamespace(users: list, project_code: str):
                     "version": "",
                 })
 
-        res = requests.post(ConfigClass.METADATA_SERVICE + 'items/batch/', json={"items": folders})
+        res = await upstream_clients.get('metadata').post(
+            ConfigClass.METADATA_SERVICE + 'items/batch/', json={"items": folders}
+        )
         if res.status_code != 200:
             raise APIException(status_code=EAPIResponseCode.internal_error.value, error_msg=res.json())
 
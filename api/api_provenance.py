@@ -14,7 +14,6 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import json
 
-import requests
 from common import LoggerFactory, ProjectClient
 from fastapi import APIRouter, Depends, Request
 from fastapi.responses import JSONResponse
@@ -23,6 +22,7 @@ from fastapi_utils import cbv
 from app.auth import jwt_required
 from config import ConfigClass
 from models.api_response import APIResponse, EAPIResponseCode
+from resources.upstream import upstream_clients
 from services.permissions_service.decorators import PermissionsCheck
 from services.permissions_service.utils import get_project_role
 
@@ -111,7 +111,7 @@ class AuditLog:
                 if 'operator' in query:
                     params['operator'] = query['operator']
 
-            response = requests.get(url, params=params)
+            response = await upstream_clients.get('provenance').get(url, params=params)
 
             if response.status_code != 200:
                 _logger.error(
@@ -142,5 +142,5 @@ class DataLineage:
     )
     async def get(self, request: Request):
         url = ConfigClass.PROVENANCE_SERVICE + "lineage/"
-        response = requests.get(url, params=request.query_params)
+        response = await upstream_clients.get('provenance').get(url, params=request.query_params)
         return JSONResponse(content=response.json(), status_code=response.status_code)
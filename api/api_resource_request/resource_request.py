@@ -14,7 +14,6 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import math
 
-import httpx
 from datetime import datetime
 from common import LoggerFactory, ProjectClient
 from fastapi import APIRouter, Depends, Request
@@ -26,6 +25,8 @@ from config import ConfigClass
 from models.api_response import APIResponse, EAPIResponseCode
 from models.resource_request import CreateResourceRequest
 from resources.error_handler import APIException
+from resources.request_body import get_request_json
+from resources.upstream import upstream_clients
 from services.notifier_services.email_service import SrvEmail
 from services.permissions_service.decorators import PermissionsCheck
 
@@ -55,9 +56,9 @@ class ResourceRequest:
             return api_response.json_response()
 
         try:
-            async with httpx.AsyncClient() as client:
-                url = ConfigClass.PROJECT_SERVICE + f"/v1/resource-requests/{request_id}"
-                response = await client.get(url)
+            client = upstream_clients.get('project')
+            url = ConfigClass.PROJECT_SERVICE + f"/v1/resource-requests/{request_id}"
+            response = await client.get(url)
         except Exception as e:
             _logger.error("Error calling resource request API: " + str(e))
             api_response.set_code(EAPIResponseCode.internal_error)
@@ -77,9 +78,9 @@ class ResourceRequest:
         _logger.info("ResourceRequest get called")
 
         try:
-            async with httpx.AsyncClient() as client:
-                url = ConfigClass.PROJECT_SERVICE + f"/v1/resource-requests/{request_id}"
-                response = await client.delete(url)
+            client = upstream_clients.get('project')
+            url = ConfigClass.PROJECT_SERVICE + f"/v1/resource-requests/{request_id}"
+            response = await client.delete(url)
         except Exception as e:
             _logger.error("Error calling resource request API: " + str(e))
             api_response.set_code(EAPIResponseCode.internal_error)
@@ -114,10 +115,10 @@ class ResourceRequestComplete:
             payload = {
                 "completed_at": str(datetime.utcnow())
             }
-            async with httpx.AsyncClient() as client:
-                url = ConfigClass.PROJECT_SERVICE + f"/v1/resource-requests/{request_id}"
-                response = await client.patch(url, json=payload)
-                resource_request = response.json()
+            client = upstream_clients.get('project')
+            url = ConfigClass.PROJECT_SERVICE + f"/v1/resource-requests/{request_id}"
+            response = await client.patch(url, json=payload)
+            resource_request = response.json()
         except Exception as e:
             _logger.error("Error calling resource request API: " + str(e))
             api_response.set_code(EAPIResponseCode.internal_error)
@@ -127,19 +128,19 @@ class ResourceRequestComplete:
         project_client = ProjectClient(ConfigClass.PROJECT_SERVICE, ConfigClass.REDIS_URL)
         project = await project_client.get(id=resource_request["project_id"])
 
-        async with httpx.AsyncClient() as client:
-            user_id = resource_request["user_id"]
-            data = {
-                "user_id": user_id,
-                "exact": True,
-            }
-            user_response = await client.get(ConfigClass.AUTH_SERVICE + "admin/user", params=data)
-            if user_response.status_code != 200:
-                raise APIException(
-                    error_msg=f"Error getting user {user_id} from auth service: " + str(user_response.json()),
-                    status_code=user_response.status_code
-                )
-            user = user_response.json()["result"]
+        client = upstream_clients.get('auth')
+        user_id = resource_request["user_id"]
+        data = {
+            "user_id": user_id,
+            "exact": True,
+        }
+        user_response = await client.get(ConfigClass.AUTH_SERVICE + "admin/user", params=data)
+        if user_response.status_code != 200:
+            raise APIException(
+                error_msg=f"Error getting user {user_id} from auth service: " + str(user_response.json()),
+                status_code=user_response.status_code
+            )
+        user = user_response.json()["result"]
 
         requested_for = resource_request["requested_for"]
         template_kwargs = {
@@ -183,7 +184,7 @@ class ResourceRequestsQuery:
         """
         _logger.info("ResourceRequestsQuery post called")
         api_response = APIResponse()
-        data = await request.json()
+        data = await get_request_json(request)
 
         page = int(data.get('page', 0))
         page = page
@@ -202,9 +203,9 @@ class ResourceRequestsQuery:
                 "sort_by": order_by,
                 "sort_order": order_type,
             }
-            async with httpx.AsyncClient() as client:
-                url = ConfigClass.PROJECT_SERVICE + "/v1/resource-requests/"
-                response = await client.get(url, params=payload)
+            client = upstream_clients.get('project')
+            url = ConfigClass.PROJECT_SERVICE + "/v1/resource-requests/"
+            response = await client.get(url, params=payload)
 
         except Exception as e:
             _logger.error("Error calling project service: " + str(e))
@@ -267,11 +268,11 @@ class ResourceRequests:
             "username": self.current_identity["username"],
             "requested_for": data.request_for,
         }
-        async with httpx.AsyncClient() as client:
-            url = ConfigClass.PROJECT_SERVICE + "/v1/resource-requests/"
-            response = await client.post(url, json=payload)
-            if response.status_code != 200:
-                raise APIException(error_msg=response.json(), status_code=response.status_code)
+        client = upstream_clients.get('project')
+        url = ConfigClass.PROJECT_SERVICE + "/v1/resource-requests/"
+        response = await client.post(url, json=payload)
+        if response.status_code != 200:
+            raise APIException(error_msg=response.json(), status_code=response.status_code)
         resource_request = response.json()
 
         username = self.current_identity["username"]
@@ -292,8 +293,8 @@ async def send_email(resource_request, project, user_role, username):
     }
     try:
         query = {"username": ConfigClass.RESOURCE_REQUEST_ADMIN}
-        async with httpx.AsyncClient() as client:
-            response = await client.get(ConfigClass.AUTH_SERVICE + "admin/user", params=query)
+        client = upstream_clients.get('auth')
+        response = await client.get(ConfigClass.AUTH_SERVICE + "admin/user", params=query)
         admin_email = response.json()["result"]["email"]
     except Exception as e:
         error_msg = "Error getting admin email: " + str(e)
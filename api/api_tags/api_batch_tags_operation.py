@@ -12,18 +12,27 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-import requests
+import aioredis
 from common import LoggerFactory
 from fastapi import APIRouter, Depends, Request
 from fastapi.responses import JSONResponse
 from fastapi_utils import cbv
+from starlette.background import BackgroundTask
 
 from app.auth import jwt_required
 from config import ConfigClass
 from models.api_response import APIResponse, EAPIResponseCode
-from services.meta import get_entities_batch, search_entities
+from resources.request_body import get_request_json
+from resources.upstream import upstream_clients
+from services.meta import get_entities_batch, invalidate_entities, search_entities
 
-from .utils import check_tag_permissions, get_new_tags
+from .utils import check_tag_permissions
+from .utils import check_tag_permissions_cached
+from .utils import collapse_subtrees
+from .utils import get_folder_path
+from .utils import get_new_tags
+from .utils import run_tags_job
+from .utils import tag_jobs
 
 _logger = LoggerFactory('batch_api_tags').get_logger()
 
@@ -40,56 +49,33 @@ class BatchTagsAPIV2:
     )
     async def post(self, request: Request):
         api_response = APIResponse()
-        data = await request.json()
+        data = await get_request_json(request)
         only_files = data.get("only_files", False)
         inherit = data.get("inherit", False)
         entity_ids = data.get("entity", [])
         tags = data.get("tags")
         operation = data.get("operation")
-        entities = get_entities_batch(entity_ids)
+        entities = await get_entities_batch(entity_ids)
+        if data.get("background"):
+            return await self.start_job(entities, operation, tags, only_files, inherit)
+
+        targets = await self.get_targets(entities, only_files, inherit)
         update_payload = {
-            "items": [],
+            "items": [{"tags": get_new_tags(operation, entity, tags)} for entity in targets],
         }
-        params = {"ids": []}
-        for entity in entities:
-            check_tag_permissions(entity, self.current_identity)
-
-            if inherit:
-                if entity["type"] == "folder":
-                    child_entities = search_entities(
-                        entity["container_code"],
-                        entity["parent_path"] + "." + entity["name"],
-                        entity["zone"],
-                        recursive=True
-                    )
-                    for child_entity in child_entities:
-                        check_tag_permissions(child_entity, self.current_identity)
-
-                        if only_files and child_entity["type"] == "folder":
-                            continue
-
-                        update_payload["items"].append({
-                            "tags": get_new_tags(operation, child_entity, tags),
-                        })
-                        params["ids"].append(child_entity["id"])
-            if only_files and entity["type"] == "folder":
-                continue
-
-            update_payload["items"].append({
-                "tags": get_new_tags(operation, entity, tags),
-            })
-            params["ids"].append(entity["id"])
+        params = {"ids": [entity["id"] for entity in targets]}
 
         if not update_payload["items"]:
             api_response.set_result("None updated")
             return api_response.json_response()
 
         try:
-            response = requests.put(
+            response = await upstream_clients.get('metadata').put(
                 ConfigClass.METADATA_SERVICE + 'items/batch',
                 json=update_payload,
                 params=params
             )
+            await invalidate_entities(params["ids"])
             _logger.info(f"Batch operation result: {response}")
             return JSONResponse(content=response.json(), status_code=response.status_code)
         except Exception as error:
@@ -97,3 +83,89 @@ class BatchTagsAPIV2:
             api_response.set_code(EAPIResponseCode.internal_error)
             api_response.set_result("Error while performing batch operation for tags " + str(error))
             return api_response.json_response()
+
+    async def get_targets(self, entities: list, only_files: bool, inherit: bool) -> list:
+        """Return entities to update, including everything below folders when inherit is set.
+
+        Permissions of all of them are checked before anything is updated.
+        """
+
+        allowed = {}
+        for entity in entities:
+            await check_tag_permissions_cached(entity, self.current_identity, allowed)
+        if inherit:
+            entities = collapse_subtrees(entities)
+
+        targets = []
+        for entity in entities:
+            if inherit and entity["type"] == "folder":
+                child_entities = await search_entities(
+                    entity["container_code"], get_folder_path(entity), entity["zone"], recursive=True
+                )
+                for child_entity in child_entities:
+                    await check_tag_permissions_cached(child_entity, self.current_identity, allowed)
+                    targets.append(child_entity)
+            targets.append(entity)
+        return [target for target in targets if not (only_files and target["type"] == "folder")]
+
+    async def start_job(self, entities: list, operation: str, tags: list, only_files: bool, inherit: bool):
+        """Check permissions of the selected entities and apply the tags in a background job."""
+
+        api_response = APIResponse()
+        for entity in entities:
+            await check_tag_permissions(entity, self.current_identity)
+        if inherit:
+            entities = collapse_subtrees(entities)
+
+        try:
+            job = await tag_jobs.create(
+                operation=operation,
+                created_by=self.current_identity["username"],
+                selected=len(entities),
+                processed=0,
+                updated=0,
+            )
+        except (aioredis.exceptions.ConnectionError, aioredis.exceptions.TimeoutError) as error:
+            _logger.error(f"Unable to create tags job: {error}")
+            api_response.set_code(EAPIResponseCode.internal_error)
+            api_response.set_error_msg("Unable to create tags job")
+            return api_response.json_response()
+
+        api_response.set_code(EAPIResponseCode.accepted)
+        api_response.set_result(job)
+        response = api_response.json_response()
+        response.background = BackgroundTask(
+            run_tags_job, job, entities, operation, tags, only_files, inherit, self.current_identity
+        )
+        return response
+
+
+@cbv.cbv(router)
+class BatchTagsJobAPIV2:
+    current_identity: dict = Depends(jwt_required)
+
+    @router.get(
+        '/entity/tags/jobs/{job_id}',
+        summary="Get progress of a background tags job",
+    )
+    async def get(self, job_id: str):
+        api_response = APIResponse()
+        try:
+            job = await tag_jobs.get(job_id)
+        except (aioredis.exceptions.ConnectionError, aioredis.exceptions.TimeoutError) as error:
+            _logger.error(f"Unable to get tags job: {error}")
+            api_response.set_code(EAPIResponseCode.internal_error)
+            api_response.set_error_msg("Unable to get tags job")
+            return api_response.json_response()
+        if not job:
+            api_response.set_code(EAPIResponseCode.not_found)
+            api_response.set_error_msg("Job not found")
+            return api_response.json_response()
+
+        if self.current_identity["role"] != "admin" and job["created_by"] != self.current_identity["username"]:
+            api_response.set_code(EAPIResponseCode.forbidden)
+            api_response.set_error_msg("Permission Denied")
+            return api_response.json_response()
+
+        api_response.set_result(job)
+        return api_response.json_response()
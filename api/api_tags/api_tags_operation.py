@@ -14,7 +14,6 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import json
 
-import requests
 from common import LoggerFactory
 from fastapi import APIRouter, Depends, Request
 from fastapi.responses import JSONResponse
@@ -23,7 +22,9 @@ from fastapi_utils import cbv
 from app.auth import jwt_required
 from config import ConfigClass
 from models.api_response import APIResponse, EAPIResponseCode
-from services.meta import get_entity_by_id
+from resources.request_body import get_request_json
+from resources.upstream import upstream_clients
+from services.meta import get_entity_by_id, invalidate_entities
 from services.permissions_service.utils import get_project_role
 
 from .utils import check_tag_permissions
@@ -43,7 +44,7 @@ class TagsAPIV2:
     )
     async def post(self, entity_id: str, request: Request):
         api_response = APIResponse()
-        data = await request.json()
+        data = await get_request_json(request)
         tags = data.get("tags", [])
 
         if not isinstance(tags, list):
@@ -52,8 +53,8 @@ class TagsAPIV2:
             api_response.set_error_msg('tags, project_code are required.')
             return api_response.json_response()
 
-        entity = get_entity_by_id(entity_id)
-        check_tag_permissions(entity, self.current_identity)
+        entity = await get_entity_by_id(entity_id)
+        await check_tag_permissions(entity, self.current_identity)
 
         project_role = get_project_role(entity["container_code"], self.current_identity)
 
@@ -63,7 +64,10 @@ class TagsAPIV2:
             return api_response.json_response()
 
         try:
-            response = requests.put(ConfigClass.METADATA_SERVICE + "item", json=data, params={"id": entity_id})
+            response = await upstream_clients.get('metadata').put(
+                ConfigClass.METADATA_SERVICE + "item", json=data, params={"id": entity_id}
+            )
+            await invalidate_entities([entity_id])
             _logger.info('Successfully attach tags to entity: {}'.format(json.dumps(response.json())))
             return JSONResponse(content=response.json(), status_code=response.status_code)
         except Exception as error:
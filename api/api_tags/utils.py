@@ -12,12 +12,31 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from contextlib import suppress
+from typing import AsyncIterator
+from typing import Dict
+from typing import List
+
+import aioredis
+from common import LoggerFactory
+
+from config import ConfigClass
 from models.api_response import EAPIResponseCode
 from resources.error_handler import APIException
+from resources.jobs import JobStore
+from resources.upstream import upstream_clients
+from services.meta import invalidate_entities, search_entity_pages
 from services.permissions_service.utils import get_project_role, has_permission
 
+_logger = LoggerFactory('tags_jobs').get_logger()
+
+tag_jobs = JobStore('tags', ConfigClass.TAG_JOB_TTL, ConfigClass.TAG_JOB_STALE_AFTER)
 
-def check_tag_permissions(entity: dict, current_identity: dict):
+
+async def check_tag_permissions(entity: dict, current_identity: dict):
     name_folder = entity["parent_path"].split(".")[0]
 
     if entity["zone"] == 0:
@@ -25,7 +44,7 @@ def check_tag_permissions(entity: dict, current_identity: dict):
     else:
         zone = 'core'
 
-    if not has_permission(entity["container_code"], 'tags', zone, 'create', current_identity):
+    if not await has_permission(entity["container_code"], 'tags', zone, 'create', current_identity):
         raise APIException(error_msg="Permission Denied", status_code=EAPIResponseCode.forbidden.value)
 
     role = get_project_role(entity["container_code"], current_identity)
@@ -41,3 +60,159 @@ def get_new_tags(operation: str, entity: dict, new_tags: list):
     else:
         new_tags = [i for i in entity["extended"]["extra"]["tags"] if i not in new_tags]
     return list(set(new_tags))
+
+
+def get_folder_path(entity: dict) -> str:
+    return f"{entity['parent_path']}.{entity['name']}" if entity['parent_path'] else entity['name']
+
+
+def collapse_subtrees(entities: List[dict]) -> List[dict]:
+    """Drop entities which are below another selected folder, they are updated with that folder's descendants."""
+
+    folders = {
+        (entity['container_code'], entity['zone'], get_folder_path(entity))
+        for entity in entities
+        if entity['type'] == 'folder'
+    }
+
+    def is_covered(entity: dict) -> bool:
+        path = entity['parent_path'] or ''
+        segments = path.split('.')
+        for depth in range(1, len(segments) + 1):
+            if (entity['container_code'], entity['zone'], '.'.join(segments[:depth])) in folders:
+                return True
+        return False
+
+    return [entity for entity in entities if not is_covered(entity)]
+
+
+async def update_tags(entities: List[dict], operation: str, tags: list) -> None:
+    ids = [entity['id'] for entity in entities]
+    payload = {'items': [{'tags': get_new_tags(operation, entity, tags)} for entity in entities]}
+    response = await upstream_clients.get('metadata').put(
+        ConfigClass.METADATA_SERVICE + 'items/batch', json=payload, params={'ids': ids}
+    )
+    await invalidate_entities(ids)
+    if response.status_code != 200:
+        raise APIException(status_code=response.status_code, error_msg=f'Failed to update tags: {response.text}')
+
+
+async def check_tag_permissions_cached(entity: dict, current_identity: dict, allowed: Dict[tuple, bool]) -> None:
+    """Check tag permissions, remembering results by project, zone and name folder which they only depend on."""
+
+    key = (entity['container_code'], entity['zone'], (entity['parent_path'] or '').split('.')[0])
+    if key not in allowed:
+        try:
+            await check_tag_permissions(entity, current_identity)
+            allowed[key] = True
+        except APIException:
+            allowed[key] = False
+    if not allowed[key]:
+        raise APIException(error_msg='Permission Denied', status_code=EAPIResponseCode.forbidden.value)
+
+
+async def iter_tag_targets(entities: List[dict], inherit: bool) -> AsyncIterator[dict]:
+    """Yield entities and, when inherit is set, everything below the folders page by page."""
+
+    for entity in entities:
+        if inherit and entity['type'] == 'folder':
+            params = {
+                'container_code': entity['container_code'],
+                'parent_path': get_folder_path(entity),
+                'zone': entity['zone'],
+                'recursive': True,
+                # sorted so pages stay stable while tags are updated
+                'sorting': 'created_time',
+                'order': 'asc',
+            }
+            async for children in search_entity_pages(params):
+                for child in children:
+                    yield child
+        yield entity
+
+
+async def apply_tags_in_chunks(
+    job: dict, targets: AsyncIterator[dict], operation: str, tags: list, only_files: bool
+) -> None:
+    """Update tags of targets in chunks of TAG_JOB_CHUNK_SIZE, saving progress after every chunk."""
+
+    chunk = []
+    async for entity in targets:
+        job['processed'] += 1
+        if only_files and entity['type'] == 'folder':
+            continue
+        chunk.append(entity)
+        if len(chunk) >= ConfigClass.TAG_JOB_CHUNK_SIZE:
+            await update_tags(chunk, operation, tags)
+            job['updated'] += len(chunk)
+            chunk = []
+            await save_job(job)
+
+    if chunk:
+        await update_tags(chunk, operation, tags)
+        job['updated'] += len(chunk)
+
+
+async def run_tags_job(
+    job: dict,
+    entities: List[dict],
+    operation: str,
+    tags: list,
+    only_files: bool,
+    inherit: bool,
+    current_identity: dict,
+) -> None:
+    """Apply tags to entities, and to everything below folders when inherit is set, recording progress in the job.
+
+    Permissions of every entity are checked before the first update, so a denied entity deep inside a folder fails the
+    job without changing anything. Entities below folders are read twice for that, once to check and once to update.
+    """
+
+    allowed: Dict[tuple, bool] = {}
+
+    async def checked_targets() -> AsyncIterator[dict]:
+        async for entity in iter_tag_targets(entities, inherit):
+            await check_tag_permissions_cached(entity, current_identity, allowed)
+            yield entity
+
+    job['status'] = 'running'
+    await save_job(job)
+    async with job_heartbeat(job):
+        try:
+            job['total'] = 0
+            async for _ in checked_targets():
+                job['total'] += 1
+            await apply_tags_in_chunks(job, checked_targets(), operation, tags, only_files)
+            job['status'] = 'succeeded'
+        except Exception as e:
+            _logger.error(f'Tags job {job["job_id"]} failed: {e}')
+            job['status'] = 'failed'
+            job['error'] = e.content['error_msg'] if isinstance(e, APIException) else str(e)
+    job['finished_at'] = int(time.time())
+    await save_job(job)
+
+
+@asynccontextmanager
+async def job_heartbeat(job: dict) -> AsyncIterator[None]:
+    """Save job every TAG_JOB_HEARTBEAT_INTERVAL seconds while the block runs, so it is not reported as stale."""
+
+    async def beat() -> None:
+        while True:
+            await asyncio.sleep(ConfigClass.TAG_JOB_HEARTBEAT_INTERVAL)
+            await save_job(job)
+
+    task = asyncio.ensure_future(beat())
+    try:
+        yield
+    finally:
+        # stopped before the final save, so an older heartbeat cannot overwrite the result
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+
+
+async def save_job(job: dict) -> None:
+    try:
+        await tag_jobs.save(job)
+    except (aioredis.exceptions.ConnectionError, aioredis.exceptions.TimeoutError) as e:
+        _logger.error(f'Unable to save status of tags job {job["job_id"]}: {e}')
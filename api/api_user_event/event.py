@@ -12,7 +12,6 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-import httpx
 from common import ProjectClient
 from fastapi import APIRouter, Depends, Request
 from fastapi.responses import JSONResponse
@@ -20,6 +19,7 @@ from fastapi_utils import cbv
 
 from app.auth import jwt_required
 from config import ConfigClass
+from resources.upstream import upstream_clients
 
 router = APIRouter(tags=["User Event"])
 
@@ -34,7 +34,9 @@ class Event:
     )
     async def get(self, request: Request):
         """ List user events """
-        event_response = httpx.get(ConfigClass.AUTH_SERVICE + "events", params=request.query_params)
+        event_response = await upstream_clients.get('auth').get(
+            ConfigClass.AUTH_SERVICE + "events", params=request.query_params
+        )
         event_response_json = event_response.json()
         events = event_response.json()["result"]
         project_codes = [i["detail"]["project_code"] for i in events if "project_code" in i["detail"]]
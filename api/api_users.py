@@ -14,15 +14,16 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 from datetime import datetime
 
-import requests
 from fastapi import APIRouter, Depends, Request
 from fastapi.responses import JSONResponse
 from fastapi_utils import cbv
 
-from app.auth import jwt_required
+from app.auth import invalidate_identity, jwt_required
 from config import ConfigClass
 from models.api_response import APIResponse, EAPIResponseCode
 from resources.error_handler import APIException
+from resources.request_body import get_request_json
+from resources.upstream import upstream_clients
 from services.permissions_service.utils import get_project_role
 
 router = APIRouter(tags=["Users"])
@@ -50,7 +51,7 @@ class UserRestful:
                 api_response.set_code(EAPIResponseCode.forbidden)
                 return api_response.json_response()
 
-            if not is_user_in_project(username, project_code):
+            if not await is_user_in_project(username, project_code):
                 api_response.set_error_msg("Permission Deneid")
                 api_response.set_code(EAPIResponseCode.forbidden)
                 return api_response.json_response()
@@ -58,7 +59,7 @@ class UserRestful:
         data = {
             "username": username,
         }
-        response = requests.get(ConfigClass.AUTH_SERVICE + "admin/user", params=data)
+        response = await upstream_clients.get('auth').get(ConfigClass.AUTH_SERVICE + "admin/user", params=data)
         if not response.json():
             api_response.set_error_msg("User not found")
             api_response.set_code(EAPIResponseCode.not_found)
@@ -83,7 +84,7 @@ class UserRestful:
     )
     async def put(self, username: str, request: Request):
         api_response = APIResponse()
-        data = await request.json()
+        data = await get_request_json(request)
         if self.current_identity["username"] != username:
             api_response.set_error_msg("Username doesn't match current user")
             api_response.set_code(EAPIResponseCode.forbidden)
@@ -103,12 +104,14 @@ class UserRestful:
                 "announcement_pk": value,
                 "username": username,
             }
-        response = requests.put(ConfigClass.AUTH_SERVICE + "admin/user", json=payload)
+        response = await upstream_clients.get('auth').put(ConfigClass.AUTH_SERVICE + "admin/user", json=payload)
+        if response.status_code == 200:
+            await invalidate_identity(username=username)
         return JSONResponse(content=response.json(), status_code=response.status_code)
 
 
-def is_user_in_project(username: str, project_code: str) -> bool:
-    response = requests.get(
+async def is_user_in_project(username: str, project_code: str) -> bool:
+    response = await upstream_clients.get('auth').get(
         ConfigClass.AUTH_SERVICE + "admin/users/realm-roles",
         params={"username": username},
     )
@@ -12,7 +12,6 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-import requests
 from fastapi import APIRouter, Depends, Request
 from fastapi.responses import JSONResponse
 from fastapi_utils import cbv
@@ -20,6 +19,8 @@ from fastapi_utils import cbv
 from app.auth import jwt_required
 from config import ConfigClass
 from models.api_response import APIResponse, EAPIResponseCode
+from resources.request_body import get_request_json
+from resources.upstream import upstream_clients
 from services.permissions_service.decorators import PermissionsCheck
 
 router = APIRouter(tags=["Workbench"])
@@ -40,7 +41,9 @@ class WorkbenchRestful:
             "project_id": project_id,
         }
         try:
-            response = requests.get(ConfigClass.PROJECT_SERVICE + "/v1/workbenches", params=payload)
+            response = await upstream_clients.get('project').get(
+                ConfigClass.PROJECT_SERVICE + "/v1/workbenches", params=payload
+            )
         except Exception as e:
             api_response.set_error_msg("Error calling project: " + str(e))
             api_response.set_code(EAPIResponseCode.internal_error)
@@ -51,7 +54,7 @@ class WorkbenchRestful:
             data = {
                 "user_id": resource["deployed_by_user_id"],
             }
-            response = requests.get(ConfigClass.AUTH_SERVICE + "admin/user", params=data)
+            response = await upstream_clients.get('auth').get(ConfigClass.AUTH_SERVICE + "admin/user", params=data)
             if response.status_code != 200:
                 return JSONResponse(content=response.json(), status_code=response.status_code)
             resource["deploy_by_username"] = response.json()["result"]["username"]
@@ -69,14 +72,16 @@ class WorkbenchRestful:
     )
     async def post(self, project_id: str, request: Request):
         api_response = APIResponse()
-        data = await request.json()
+        data = await get_request_json(request)
         payload = {
             "project_id": project_id,
             "resource": data.get("workbench_resource"),
             "deployed_by_user_id": self.current_identity["user_id"],
         }
         try:
-            response = requests.post(ConfigClass.PROJECT_SERVICE + "/v1/workbenches", json=payload)
+            response = await upstream_clients.get('project').post(
+                ConfigClass.PROJECT_SERVICE + "/v1/workbenches", json=payload
+            )
         except Exception as e:
             api_response.set_error_msg("Error calling project service: " + str(e))
             api_response.set_code(EAPIResponseCode.internal_error)
@@ -16,6 +16,7 @@
 from fastapi import FastAPI
 
 from api import api_workbench
+from api.api_admin import cache, event_loop, permissions
 from api import api_invitation
 from api import api_archive
 from api.api_announcement import announcement
@@ -46,6 +47,9 @@ from api import api_project_files
 
 def api_registry(app: FastAPI):
     app.include_router(api_activity_logs.router, prefix="/v1")
+    app.include_router(cache.router, prefix="/v1")
+    app.include_router(event_loop.router, prefix="/v1")
+    app.include_router(permissions.router, prefix="/v1")
     app.include_router(announcement.router, prefix="/v1")
     app.include_router(api_archive.router, prefix="/v1")
     app.include_router(api_auth.router, prefix="/v1")
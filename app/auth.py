@@ -1,9 +1,11 @@
+import time
+from typing import Optional
+
 from fastapi import Request
 
 import jwt
 from config import ConfigClass, SRV_NAMESPACE
 from common import LoggerFactory
-import httpx
 from opentelemetry import trace
 from opentelemetry.exporter.jaeger.thrift import JaegerExporter
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
@@ -12,18 +14,53 @@ from opentelemetry.sdk.resources import SERVICE_NAME
 from opentelemetry.sdk.resources import Resource
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor
+from app.jwks import JWKSClient, JWKSException
+from models.api_response import EAPIResponseCode
+from resources.cache import TTLCache
+from resources.error_handler import APIException
+from resources.shared_version import SharedVersions
+from resources.single_flight import SingleFlight
+from resources.upstream import upstream_clients
 
 
 logger = LoggerFactory('jwt_identify').get_logger()
 
+# identities are keyed by (username, token expiry) so a new token always gets a fresh lookup
+identity_cache = TTLCache('identity', ConfigClass.IDENTITY_CACHE_SIZE, ConfigClass.IDENTITY_CACHE_TTL)
+# account status of users authenticated by verified tokens, keyed by username
+user_status_cache = TTLCache('user_status', ConfigClass.IDENTITY_CACHE_SIZE, ConfigClass.IDENTITY_CACHE_TTL)
+# bumped per user on invalidation, identities cached under an older version are resolved again by all workers
+identity_versions = SharedVersions(
+    'identity',
+    ConfigClass.IDENTITY_INVALIDATION_CHECK_INTERVAL,
+    ConfigClass.IDENTITY_CACHE_SIZE,
+    ConfigClass.IDENTITY_CACHE_TTL,
+)
+# concurrent requests of the same user share one auth service lookup
+identity_lookups = SingleFlight()
+jwks_client = JWKSClient(ConfigClass.KEYCLOAK_JWKS_URL, ConfigClass.JWKS_FILE, ConfigClass.JWKS_REFRESH_INTERVAL)
+
 
 async def jwt_required(request: Request):
-    current_identity = get_current_identity(request)
+    current_identity = await get_request_identity(request)
     if not current_identity:
         raise Exception("couldn't get user from jwt")
     return current_identity
 
 
+async def get_request_identity(request: Request):
+    """Resolve the identity at most once per request.
+
+    The result is kept in the request state which is shared by every dependency and handler of the same request.
+    """
+
+    try:
+        return request.state.current_identity
+    except AttributeError:
+        request.state.current_identity = await get_current_identity(request)
+    return request.state.current_identity
+
+
 def get_token(request: Request):
     token = request.headers.get('Authorization')
     if not token:
@@ -31,24 +68,40 @@ def get_token(request: Request):
     return token.split()[-1]
 
 
-def get_current_identity(request: Request):
+async def decode_token(token: str) -> dict:
+    if not ConfigClass.JWT_VERIFY_SIGNATURE:
+        return jwt.decode(token, verify=False)
+
+    try:
+        return await jwks_client.decode(token)
+    except JWKSException as e:
+        raise APIException(error_msg=str(e), status_code=EAPIResponseCode.unauthorized.value)
+
+
+async def get_current_identity(request: Request):
     token = get_token(request)
-    payload = jwt.decode(token, verify=False)
+    payload = await decode_token(token)
     username: str = payload.get("preferred_username")
 
     if not username:
         return None
 
-    # check if user is existed in neo4j
-    data = {
-        "username": username,
-        "exact": True,
-    }
-    response = httpx.get(ConfigClass.AUTH_SERVICE + "admin/user", params=data)
-    if response.status_code != 200:
-        raise Exception(f"Error getting user {username} from auth service: " + response.json())
+    if ConfigClass.JWT_VERIFY_SIGNATURE:
+        # claims of a verified token can be trusted, but disabled users must be denied while their token is still valid
+        if not await is_user_active(username):
+            return None
+        return get_identity_from_claims(payload)
+
+    version = await identity_versions.current(username)
+    cache_key = (username, payload.get("exp"))
+    entry = identity_cache.get(cache_key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    return await identity_lookups.do(cache_key, lambda: resolve_identity(username, payload, version))
 
-    user = response.json()["result"]
+
+async def resolve_identity(username: str, payload: dict, version: int = 0) -> Optional[dict]:
+    user = await get_user_from_auth_service(username)
     if not user:
         return None
 
@@ -68,7 +121,7 @@ def get_current_identity(request: Request):
     except Exception as e:
         logger.error("Couldn't get realm roles" + str(e))
         realm_roles = []
-    return {
+    identity = {
         "user_id": user_id,
         "username": username,
         "role": role,
@@ -77,6 +130,105 @@ def get_current_identity(request: Request):
         "last_name": last_name,
         "realm_roles": realm_roles,
     }
+    identity_cache.set((username, payload.get("exp")), (version, identity), ttl=get_identity_ttl(payload))
+    return identity
+
+
+async def is_user_active(username: str) -> bool:
+    version = await identity_versions.current(username)
+    entry = user_status_cache.get(username)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    return await identity_lookups.do(('status', username), lambda: resolve_user_status(username, version))
+
+
+async def resolve_user_status(username: str, version: int) -> bool:
+    user = await get_user_from_auth_service(username)
+    active = bool(user) and user["attributes"].get("status") == "active"
+    user_status_cache.set(username, (version, active))
+    return active
+
+
+def get_identity_from_claims(payload: dict) -> dict:
+    realm_roles = payload.get("realm_access", {}).get("roles", [])
+    return {
+        "user_id": payload.get("sub"),
+        "username": payload["preferred_username"],
+        "role": "admin" if "platform-admin" in realm_roles else "member",
+        "email": payload.get("email"),
+        "first_name": payload.get("given_name"),
+        "last_name": payload.get("family_name"),
+        "realm_roles": realm_roles,
+    }
+
+
+async def get_user_from_auth_service(username: str) -> Optional[dict]:
+    # check if user is existed in neo4j
+    data = {
+        "username": username,
+        "exact": True,
+    }
+    response = await upstream_clients.get('auth').get(ConfigClass.AUTH_SERVICE + "admin/user", params=data)
+    if response.status_code != 200:
+        raise Exception(f"Error getting user {username} from auth service: " + str(response.json()))
+    return response.json()["result"]
+
+
+def get_identity_ttl(payload: dict) -> float:
+    """Never keep an identity cached for longer than the token it was resolved from is valid."""
+
+    ttl = ConfigClass.IDENTITY_CACHE_TTL
+    expires_at = payload.get("exp")
+    if expires_at:
+        ttl = min(ttl, expires_at - time.time())
+    return ttl
+
+
+async def invalidate_identity(username: str = None, email: str = None, user_id: str = None) -> int:
+    """Drop cached identities of a user after their account was changed through the BFF.
+
+    Matching identities are removed from this worker right away and the number removed is returned. The caches of other
+    workers cannot be searched from here, so the shared version of the user is bumped and they resolve the identity and
+    account status of this user again within IDENTITY_INVALIDATION_CHECK_INTERVAL seconds.
+    """
+
+    usernames = {username} if username else set()
+
+    def matches(key, entry):
+        identity = entry[1]
+        matched = (
+            (username is not None and identity["username"] == username)
+            or (email is not None and identity["email"] and identity["email"].lower() == email.lower())
+            or (user_id is not None and identity["user_id"] == user_id)
+        )
+        if matched:
+            usernames.add(identity["username"])
+        return matched
+
+    removed = identity_cache.invalidate(matches)
+    if not usernames and (email or user_id):
+        usernames.add(await find_username(email=email, user_id=user_id))
+    for name in usernames - {None}:
+        user_status_cache.pop(name)
+        await identity_versions.bump(name)
+    logger.info(f"Invalidated {removed} cached identities for user {username or email or user_id}")
+    return removed
+
+
+async def find_username(email: str = None, user_id: str = None) -> Optional[str]:
+    """Look up username of the account with email or user_id, failures are logged and give None."""
+
+    params = {"email": email} if email else {"user_id": user_id}
+    try:
+        response = await upstream_clients.get('auth').get(ConfigClass.AUTH_SERVICE + "admin/user", params=params)
+        user = response.json()["result"] if response.status_code == 200 else None
+    except Exception as e:
+        logger.error(f"Couldn't get user {email or user_id} from auth service: {e}")
+        user = None
+    if not user:
+        logger.error(f"Couldn't find user {email or user_id}, other workers keep its cached identity until it expires")
+        return None
+    return user["username"]
 
 
 def instrument_app(app) -> None:
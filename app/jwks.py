@@ -0,0 +1,146 @@
+# Copyright (C) 2022 Indoc Research
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+import json
+import time
+from typing import Any
+from typing import Dict
+from typing import Optional
+
+import httpx
+import jwt
+from common import LoggerFactory
+from jwt.algorithms import has_crypto
+
+from resources.single_flight import SingleFlight
+from resources.upstream import upstream_clients
+
+logger = LoggerFactory('jwks').get_logger()
+
+# an unknown key id triggers an immediate refresh, but not more often than this
+MIN_REFRESH_INTERVAL = 30
+FETCH_TIMEOUT = 10
+
+
+class JWKSException(Exception):
+    """Raised when signing keys cannot be loaded or a token cannot be verified."""
+
+
+class JWKSClient:
+    """Keep the realm signing keys in memory and verify token signatures locally.
+
+    Keys are fetched from the Keycloak JWKS endpoint and refreshed periodically in the background. When the endpoint is
+    unreachable the keys are loaded from an offline JWKS file instead.
+    """
+
+    def __init__(self, url: str, fallback_file: str = '', refresh_interval: int = 300) -> None:
+        self.url = url
+        self.fallback_file = fallback_file
+        self.refresh_interval = refresh_interval
+        self.keys: Dict[str, Any] = {}
+        self.refreshed_at = 0.0
+        self._refreshes = SingleFlight()
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def parse_keys(jwks: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert JWKS document into public keys by key id."""
+
+        if not has_crypto:
+            raise JWKSException('The "cryptography" package is required to verify token signatures')
+
+        keys = {}
+        for jwk in jwks.get('keys', []):
+            if jwk.get('kty') != 'RSA' or jwk.get('use', 'sig') != 'sig':
+                continue
+            keys[jwk['kid']] = jwt.algorithms.RSAAlgorithm.from_jwk(json.dumps(jwk))
+        return keys
+
+    def load_fallback_file(self) -> bool:
+        if not self.fallback_file:
+            return False
+
+        try:
+            with open(self.fallback_file) as f:
+                keys = self.parse_keys(json.load(f))
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f'Unable to load JWKS from file "{self.fallback_file}": {e}')
+            return False
+
+        self.keys = keys
+        logger.info(f'Loaded {len(keys)} signing keys from file "{self.fallback_file}"')
+        return True
+
+    async def _fetch(self) -> bool:
+        try:
+            response = await upstream_clients.get('keycloak').get(self.url, timeout=FETCH_TIMEOUT)
+            response.raise_for_status()
+            keys = self.parse_keys(response.json())
+        except (httpx.HTTPError, ValueError, KeyError) as e:
+            logger.error(f'Unable to fetch JWKS from "{self.url}": {e}')
+            if not self.keys:
+                return self.load_fallback_file()
+            return False
+
+        self.keys = keys
+        self.refreshed_at = time.monotonic()
+        logger.info(f'Loaded {len(keys)} signing keys from "{self.url}"')
+        return True
+
+    async def refresh(self) -> bool:
+        """Reload signing keys, concurrent callers share the same fetch."""
+
+        return await self._refreshes.do('jwks', self._fetch)
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                # keep the refresh loop alive, the current keys stay in use until the next attempt
+                logger.error(f'Unable to refresh JWKS from "{self.url}": {e}')
+
+    async def start(self) -> None:
+        await self.refresh()
+        if not self.keys:
+            raise JWKSException(f'No signing keys available from "{self.url}" or "{self.fallback_file}"')
+        self._task = asyncio.ensure_future(self._refresh_periodically())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def get_key(self, kid: str) -> Any:
+        key = self.keys.get(kid)
+        if key is None and time.monotonic() - self.refreshed_at > MIN_REFRESH_INTERVAL:
+            # signing keys might have been rotated since the last refresh
+            await self.refresh()
+            key = self.keys.get(kid)
+        if key is None:
+            raise JWKSException(f'Unknown signing key "{kid}"')
+        return key
+
+    async def decode(self, token: str) -> Dict[str, Any]:
+        """Verify token signature and expiry and return its claims."""
+
+        try:
+            header = jwt.get_unverified_header(token)
+            key = await self.get_key(header.get('kid'))
+            return jwt.decode(token, key=key, algorithms=['RS256'], options={'verify_aud': False})
+        except jwt.InvalidTokenError as e:
+            raise JWKSException(f'Invalid token: {e}')
@@ -0,0 +1,217 @@
+# Copyright (C) 2022 Indoc Research
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+import sys
+import threading
+import time
+import traceback
+import weakref
+from pathlib import Path
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+
+from common import LoggerFactory
+from starlette.types import ASGIApp
+from starlette.types import Receive
+from starlette.types import Scope
+from starlette.types import Send
+
+from config import ConfigClass
+
+logger = LoggerFactory('loop_watchdog').get_logger()
+
+PROJECT_ROOT = str(Path(__file__).parents[1])
+UNKNOWN_ROUTE = 'unknown'
+
+
+class LoopWatchdog:
+    """Detect stalls of the event loop and report the code and route that blocked it.
+
+    A daemon thread schedules a callback on the loop every interval seconds. When the callback has not run after
+    threshold seconds the loop is blocked, so the stack of the loop thread is captured and the stall is attributed to
+    the route of the task that is running at that moment. Stalls are aggregated per route.
+    """
+
+    def __init__(self, interval: float, threshold: float, stack_depth: int = 20) -> None:
+        self.interval = interval
+        self.threshold = threshold
+        self.stack_depth = stack_depth
+        self.samples = 0
+        self.max_lag = 0.0
+        self.routes: Dict[str, Dict[str, Any]] = {}
+        self._tasks: 'weakref.WeakKeyDictionary[asyncio.Task, Scope]' = weakref.WeakKeyDictionary()
+        self._route_paths: Dict[Any, str] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, routes: List[Any]) -> None:
+        """Start watching the running loop, routes are used to resolve endpoints back to their path."""
+
+        self._route_paths = {
+            route.endpoint: f'{",".join(sorted(route.methods))} {route.path}'
+            for route in routes
+            if getattr(route, 'endpoint', None) and getattr(route, 'methods', None)
+        }
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+        self._thread.start()
+        logger.info(f'Event loop watchdog started with {self.threshold}s threshold')
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread:
+            self._thread.join(timeout=self.threshold + self.interval)
+            self._thread = None
+
+    def track(self, task: asyncio.Task, scope: Scope) -> None:
+        self._tasks[task] = scope
+
+    def untrack(self, task: asyncio.Task) -> None:
+        self._tasks.pop(task, None)
+
+    def get_current_route(self) -> str:
+        task = asyncio.current_task(self._loop)
+        scope = self._tasks.get(task) if task else None
+        if scope is None:
+            return UNKNOWN_ROUTE
+        return self._route_paths.get(scope.get('endpoint'), f'{scope["method"]} {scope["path"]}')
+
+    def capture_stack(self) -> List[str]:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return []
+        return [
+            f'{entry.filename}:{entry.lineno} in {entry.name}'
+            for entry in traceback.extract_stack(frame, limit=self.stack_depth)
+        ]
+
+    @staticmethod
+    def find_blocking_frame(stack: List[str]) -> str:
+        """Return the innermost frame of application code, falling back to the innermost frame."""
+
+        for entry in reversed(stack):
+            if entry.startswith(PROJECT_ROOT) and '/site-packages/' not in entry:
+                return entry[len(PROJECT_ROOT) + 1 :]
+        return stack[-1] if stack else ''
+
+    def record(self, route: str, lag: float, stack: List[str]) -> None:
+        with self._lock:
+            stats = self.routes.setdefault(
+                route, {'stalls': 0, 'total_blocked': 0.0, 'max_blocked': 0.0, 'blocking_frame': '', 'stack': []}
+            )
+            stats['stalls'] += 1
+            stats['total_blocked'] += lag
+            if lag >= stats['max_blocked']:
+                stats['max_blocked'] = lag
+                stats['blocking_frame'] = self.find_blocking_frame(stack)
+                stats['stack'] = stack
+
+    def _watch(self) -> None:
+        while not self._stopped.is_set():
+            scheduled_at = time.monotonic()
+            callback_ran = threading.Event()
+            try:
+                self._loop.call_soon_threadsafe(callback_ran.set)
+            except RuntimeError:
+                # loop is closed
+                return
+
+            if not callback_ran.wait(self.threshold):
+                route = self.get_current_route()
+                stack = self.capture_stack()
+                while not callback_ran.wait(self.interval):
+                    if self._stopped.is_set():
+                        return
+                lag = time.monotonic() - scheduled_at
+                self.record(route, lag, stack)
+                logger.warning(f'Event loop blocked for {lag:.3f}s by {route} at {self.find_blocking_frame(stack)}')
+            else:
+                lag = time.monotonic() - scheduled_at
+
+            self.samples += 1
+            self.max_lag = max(self.max_lag, lag)
+            self._stopped.wait(self.interval)
+
+    def top_offenders(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Return routes ordered by the total time they kept the loop blocked."""
+
+        with self._lock:
+            offenders = [
+                {
+                    'route': route,
+                    'stalls': stats['stalls'],
+                    'total_blocked': round(stats['total_blocked'], 3),
+                    'max_blocked': round(stats['max_blocked'], 3),
+                    'blocking_frame': stats['blocking_frame'],
+                    'stack': list(stats['stack']),
+                }
+                for route, stats in self.routes.items()
+            ]
+        offenders.sort(key=lambda offender: offender['total_blocked'], reverse=True)
+        return offenders[:limit]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'is_running': self.is_running,
+            'threshold': self.threshold,
+            'samples': self.samples,
+            'max_lag': round(self.max_lag, 3),
+            'stalls': sum(stats['stalls'] for stats in self.routes.values()),
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.routes.clear()
+        self.samples = 0
+        self.max_lag = 0.0
+
+
+class LoopWatchdogMiddleware:
+    """Associate the task serving each request with its scope so stalls can be attributed to routes."""
+
+    def __init__(self, app: ASGIApp, watchdog: LoopWatchdog) -> None:
+        self.app = app
+        self.watchdog = watchdog
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        task = asyncio.current_task()
+        self.watchdog.track(task, scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.watchdog.untrack(task)
+
+
+loop_watchdog = LoopWatchdog(
+    ConfigClass.LOOP_WATCHDOG_INTERVAL,
+    ConfigClass.LOOP_WATCHDOG_THRESHOLD,
+    ConfigClass.LOOP_WATCHDOG_STACK_DEPTH,
+)
@@ -21,7 +21,12 @@ from resources.error_handler import APIException
 from config import ConfigClass
 from common import ProjectException
 from app.api_registry import api_registry
-from app.auth import jwt_required
+from app.auth import jwks_client
+from app.loop_watchdog import LoopWatchdogMiddleware
+from app.loop_watchdog import loop_watchdog
+from resources.tiered_cache import CacheBypassMiddleware
+from resources.upstream import upstream_clients
+from services.permissions_service.matrix import permission_matrix
 
 
 def create_app():
@@ -41,6 +46,7 @@ def create_app():
         allow_headers=['*'],
     )
 
+    add_request_middlewares(app)
 
     @app.exception_handler(APIException)
     async def http_exception_handler(request: Request, exc: APIException):
@@ -56,6 +62,46 @@ def create_app():
             content=exc.content,
         )
 
+    add_lifecycle_hooks(app)
     api_registry(app)
 
     return app
+
+
+def add_request_middlewares(app: FastAPI) -> None:
+    """Add middlewares for cache bypass and event loop stall detection."""
+
+    app.add_middleware(CacheBypassMiddleware)
+
+    if ConfigClass.LOOP_WATCHDOG_ENABLED:
+        app.add_middleware(LoopWatchdogMiddleware, watchdog=loop_watchdog)
+
+
+def add_lifecycle_hooks(app: FastAPI) -> None:
+    """Open shared clients and background tasks on startup and release them on shutdown."""
+
+    @app.on_event('startup')
+    async def open_upstream_clients():
+        upstream_clients.open()
+
+    @app.on_event('startup')
+    async def load_signing_keys():
+        if ConfigClass.JWT_VERIFY_SIGNATURE:
+            await jwks_client.start()
+
+    @app.on_event('startup')
+    async def load_permission_matrix():
+        if ConfigClass.PERMISSION_MATRIX_ENABLED:
+            permission_matrix.start()
+
+    @app.on_event('startup')
+    async def start_loop_watchdog():
+        if ConfigClass.LOOP_WATCHDOG_ENABLED:
+            loop_watchdog.start(app.routes)
+
+    @app.on_event('shutdown')
+    async def close_upstream_clients():
+        loop_watchdog.stop()
+        await permission_matrix.stop()
+        await jwks_client.stop()
+        await upstream_clients.aclose()
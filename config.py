@@ -17,6 +17,7 @@ import os
 from functools import lru_cache
 from typing import Any
 from typing import Dict
+from typing import List
 
 from common import VaultClient
 from dotenv import load_dotenv
@@ -55,6 +56,13 @@ class Settings(BaseSettings):
     GREENROOM_ZONE_LABEL: str
 
     KEYCLOAK_REALM: str
+    KEYCLOAK_URL: str = ''
+
+    # Verify token signatures locally against the realm JWKS and take the identity from the token claims. The auth
+    # service is still asked whether the account is active, answers are cached like identities.
+    JWT_VERIFY_SIGNATURE: bool = False
+    JWKS_REFRESH_INTERVAL: int = 300
+    JWKS_FILE: str = ''
 
     AD_PROJECT_GROUP_PREFIX: str
 
@@ -102,7 +110,89 @@ class Settings(BaseSettings):
     # Resource request
     RESOURCE_REQUEST_ADMIN: str
 
+    # Shared connection pools for upstream services, UPSTREAM_TIMEOUTS maps upstream name to timeout in seconds
+    UPSTREAM_TIMEOUT: float = 30
+    UPSTREAM_TIMEOUTS: Dict[str, float] = {}
+    UPSTREAM_MAX_CONNECTIONS: int = 100
+    UPSTREAM_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    UPSTREAM_KEEPALIVE_EXPIRY: float = 30
+    # UPSTREAM_LIMITS maps upstream name to max_connections, max_keepalive_connections and/or keepalive_expiry
+    UPSTREAM_LIMITS: Dict[str, Dict[str, float]] = {}
+
     ICON_SIZE_LIMIT: int = 500 * 1000
+    MAX_REQUEST_BODY_SIZE: int = 10 * 1024 * 1024
+
+    # Permission matrix loaded from the auth service, checks fall back to the authorize API when it is stale
+    PERMISSION_MATRIX_ENABLED: bool = False
+    PERMISSION_MATRIX_REFRESH_INTERVAL: int = 300
+    PERMISSION_MATRIX_MAX_AGE: int = 900
+    # seconds until a refresh requested through the admin API reaches every worker
+    PERMISSION_MATRIX_VERSION_CHECK_INTERVAL: float = 5
+
+    # Identity cache
+    IDENTITY_CACHE_SIZE: int = 10000
+    IDENTITY_CACHE_TTL: int = 60
+    # seconds other workers may keep using identities after they were invalidated
+    IDENTITY_INVALIDATION_CHECK_INTERVAL: float = 1
+
+    # Entity cache, entries are kept ENTITY_CACHE_TTL seconds in process and ENTITY_CACHE_SHARED_TTL seconds in redis
+    ENTITY_CACHE_SIZE: int = 10000
+    ENTITY_CACHE_TTL: float = 5
+    ENTITY_CACHE_SHARED_TTL: int = 30
+    # ids are sent in the query string, keep batches small enough for the url length limits
+    ENTITY_BATCH_SIZE: int = 100
+    # page size used when the BFF itself pages through items/search results
+    METADATA_SEARCH_PAGE_SIZE: int = 1000
+
+    # Attaching attributes to folders updates descendants in chunks, ids of a chunk are sent in the query string
+    ATTRIBUTE_ATTACH_CHUNK_SIZE: int = 100
+    ATTRIBUTE_ATTACH_CONCURRENCY: int = 4
+
+    # Project size, statistics and activity responses are served as they are for PROJECT_STATS_CACHE_FRESH_TTL seconds
+    # and, while refreshed in the background, up to PROJECT_STATS_CACHE_STALE_TTL seconds
+    PROJECT_STATS_CACHE_SIZE: int = 1000
+    PROJECT_STATS_CACHE_FRESH_TTL: float = 30
+    PROJECT_STATS_CACHE_STALE_TTL: int = 10 * 60
+
+    # Size of the chunks read from the dataset service when streaming file previews
+    PREVIEW_STREAM_CHUNK_SIZE: int = 64 * 1024
+
+    # Page size used to walk search results for streamed exports of project files
+    SEARCH_EXPORT_PAGE_SIZE: int = 1000
+    SEARCH_EXPORT_CSV_FIELDS: List[str] = [
+        'id',
+        'name',
+        'type',
+        'zone',
+        'parent_path',
+        'owner',
+        'size',
+        'created_time',
+        'last_updated_time',
+    ]
+
+    # Project dashboard sections are given PROJECT_DASHBOARD_TIMEOUT seconds, PROJECT_DASHBOARD_TIMEOUTS maps section
+    # name to timeout in seconds
+    PROJECT_DASHBOARD_TIMEOUT: float = 5
+    PROJECT_DASHBOARD_TIMEOUTS: Dict[str, float] = {}
+
+    # Background tagging jobs, status is kept in redis for TAG_JOB_TTL seconds
+    TAG_JOB_CHUNK_SIZE: int = 100
+    TAG_JOB_TTL: int = 24 * 60 * 60
+    # running jobs save their status this often, jobs not saved for TAG_JOB_STALE_AFTER seconds are reported as failed
+    TAG_JOB_HEARTBEAT_INTERVAL: int = 30
+    TAG_JOB_STALE_AFTER: int = 120
+
+    # Attribute template cache, bounds staleness of templates changed by other writers
+    TEMPLATE_CACHE_SIZE: int = 1000
+    TEMPLATE_CACHE_TTL: float = 5
+    TEMPLATE_CACHE_SHARED_TTL: int = 300
+
+    # Event loop watchdog, reports stalls longer than threshold seconds per route
+    LOOP_WATCHDOG_ENABLED: bool = False
+    LOOP_WATCHDOG_INTERVAL: float = 0.5
+    LOOP_WATCHDOG_THRESHOLD: float = 0.1
+    LOOP_WATCHDOG_STACK_DEPTH: int = 20
 
     # MinIO
     MINIO_HOST: str
@@ -128,6 +218,9 @@ class Settings(BaseSettings):
         settings.DOWNLOAD_SERVICE_CORE_V2 = settings.DOWNLOAD_SERVICE_CORE + '/v2/'
         settings.DOWNLOAD_SERVICE_GR_V2 = settings.DOWNLOAD_SERVICE_GR + '/v2/'
         settings.KG_SERVICE = settings.KG_SERVICE + '/v1/'
+        settings.KEYCLOAK_JWKS_URL = (
+            f'{settings.KEYCLOAK_URL}/realms/{settings.KEYCLOAK_REALM}/protocol/openid-connect/certs'
+        )
         settings.REDIS_URL = f'redis://:{settings.REDIS_PASSWORD}@{settings.REDIS_HOST}:{settings.REDIS_PORT}'
         settings.ZONE_LABEL_MAPPING = {
             0: settings.GREENROOM_ZONE_LABEL,
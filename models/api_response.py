@@ -17,12 +17,15 @@ from fastapi.responses import JSONResponse
 
 class EAPIResponseCode(Enum):
     success = 200
+    accepted = 202
     internal_error = 500
     bad_request = 400
     not_found = 404
     forbidden = 403
     unauthorized = 401
     conflict = 409
+    payload_too_large = 413
+    gateway_timeout = 504
 
 
 class APIResponse:
@@ -0,0 +1,65 @@
+# Copyright (C) 2022 Indoc Research
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+from typing import Any
+from typing import Dict
+from typing import Optional
+from uuid import uuid4
+
+import aioredis
+
+from config import ConfigClass
+from resources import json_utils
+
+
+class JobStore:
+    """Keep the status of background jobs in Redis, so any worker can report the progress of a job.
+
+    A job is a JSON document identified by job_id, it expires ttl seconds after its last update. Pending and running
+    jobs that were not updated for stale_after seconds are reported as failed, their worker is assumed to be gone.
+    """
+
+    def __init__(self, name: str, ttl: int, stale_after: int) -> None:
+        self.prefix = f'bff-web-{name}-job-'
+        self.ttl = ttl
+        self.stale_after = stale_after
+        self._redis: Optional[aioredis.Redis] = None
+
+    @property
+    def redis(self) -> aioredis.Redis:
+        if self._redis is None:
+            self._redis = aioredis.from_url(ConfigClass.REDIS_URL)
+        return self._redis
+
+    async def create(self, **fields: Any) -> Dict[str, Any]:
+        job = {'job_id': str(uuid4()), 'status': 'pending', 'created_at': int(time.time()), **fields}
+        await self.save(job)
+        return job
+
+    async def save(self, job: Dict[str, Any]) -> None:
+        job['updated_at'] = int(time.time())
+        await self.redis.setex(self.prefix + job['job_id'], self.ttl, json_utils.dumps(job))
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        data = await self.redis.get(self.prefix + job_id)
+        if data is None:
+            return None
+
+        job = json_utils.loads(data)
+        if job['status'] in ('pending', 'running') and time.time() - job['updated_at'] > self.stale_after:
+            job['status'] = 'failed'
+            job['error'] = 'Job stopped without finishing'
+        return job
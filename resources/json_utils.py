@@ -0,0 +1,41 @@
+# Copyright (C) 2022 Indoc Research
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""JSON encoding helpers backed by orjson."""
+
+from typing import Any
+from typing import Union
+
+import orjson
+from fastapi.responses import JSONResponse
+
+JSONDecodeError = ValueError
+
+# newline delimited JSON, used by endpoints streaming one result per line
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    return orjson.loads(data)
+
+
+def dumps(obj: Any) -> bytes:
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response encoded with dumps() above instead of the standard library encoder."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
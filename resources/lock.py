@@ -12,25 +12,24 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-import httpx
-
 from config import ConfigClass
+from resources.upstream import upstream_clients
 
 
-def data_ops_request(resource_key: str, operation: str, method: str) -> dict:
+async def data_ops_request(resource_key: str, operation: str, method: str) -> dict:
     url = ConfigClass.DATAOPS_SERVICE_v2 + 'resource/lock/'
     post_json = {'resource_key': resource_key, 'operation': operation}
-    with httpx.Client() as client:
-        response = client.request(url=url, method=method, json=post_json)
+    client = upstream_clients.get('dataops')
+    response = await client.request(url=url, method=method, json=post_json)
     if response.status_code != 200:
         raise Exception('resource %s already in used' % resource_key)
 
     return response.json()
 
 
-def lock_resource(resource_key: str, operation: str) -> dict:
-    return data_ops_request(resource_key, operation, 'POST')
+async def lock_resource(resource_key: str, operation: str) -> dict:
+    return await data_ops_request(resource_key, operation, 'POST')
 
 
-def unlock_resource(resource_key: str, operation: str) -> dict:
-    return data_ops_request(resource_key, operation, 'DELETE')
+async def unlock_resource(resource_key: str, operation: str) -> dict:
+    return await data_ops_request(resource_key, operation, 'DELETE')
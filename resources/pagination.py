@@ -0,0 +1,82 @@
+# Copyright (C) 2022 Indoc Research
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Opaque cursors for keyset pagination of upstream listings."""
+
+import base64
+from typing import Any
+from typing import Dict
+from typing import Tuple
+
+from resources import json_utils
+
+
+class InvalidCursor(Exception):
+    """Raised when a cursor cannot be decoded or does not match the listing it is used with."""
+
+
+def encode_cursor(cursor: Dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(json_utils.dumps(cursor)).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token: str, sorting: str, order: str) -> Dict[str, Any]:
+    """Decode cursor token and check that it was issued for the same sort key and order."""
+
+    try:
+        cursor = json_utils.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except ValueError as e:
+        raise InvalidCursor(f'Invalid cursor: {e}')
+
+    if not isinstance(cursor, dict) or not {'value', 'id', 'offset'} <= cursor.keys():
+        raise InvalidCursor('Invalid cursor: missing position')
+    if cursor.get('sorting') != sorting or cursor.get('order') != order:
+        raise InvalidCursor('Invalid cursor: sorting does not match the listing')
+    return cursor
+
+
+def sort_key(value: Any) -> Tuple[bool, Any]:
+    # nulls sort last in ascending order, as they do in the metadata database
+    return value is None, value
+
+
+def item_key(item: Dict[str, Any], sorting: str) -> Tuple[Tuple[bool, Any], str]:
+    """Return position of item in the listing, items with the same sort value are ordered by id."""
+
+    return sort_key(item.get(sorting)), item['id']
+
+
+def is_after(item: Dict[str, Any], cursor: Dict[str, Any]) -> bool:
+    """Return whether item comes after the last item returned with cursor in the listing order."""
+
+    key = item_key(item, cursor['sorting'])
+    last_key = (sort_key(cursor['value']), cursor['id'])
+    if cursor['order'] == 'asc':
+        return key > last_key
+    return key < last_key
+
+
+def next_cursor(last_item: Dict[str, Any], sorting: str, order: str, offset: int) -> Dict[str, Any]:
+    """Build cursor that continues the listing after last_item.
+
+    Offset is the upstream position of the first item sharing the sort value of last_item, the next request resumes
+    reading close to it.
+    """
+
+    return {
+        'sorting': sorting,
+        'order': order,
+        'value': last_item.get(sorting),
+        'id': last_item['id'],
+        'offset': offset,
+    }
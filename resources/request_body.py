@@ -0,0 +1,59 @@
+# Copyright (C) 2022 Indoc Research
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from typing import Any
+
+from fastapi import Request
+
+from config import ConfigClass
+from models.api_response import EAPIResponseCode
+from resources import json_utils
+from resources.error_handler import APIException
+
+
+async def get_request_json(request: Request) -> Any:
+    """Decode the JSON body of a request at most once.
+
+    The parsed body is kept in the request state so permission dependencies and the route handler share it. Bodies
+    larger than MAX_REQUEST_BODY_SIZE are rejected before they are read into memory.
+    """
+
+    try:
+        return request.state.json_body
+    except AttributeError:
+        pass
+
+    content_length = request.headers.get('content-length')
+    if content_length and content_length.isdigit() and int(content_length) > ConfigClass.MAX_REQUEST_BODY_SIZE:
+        raise APIException(error_msg='Request body is too large', status_code=EAPIResponseCode.payload_too_large.value)
+
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > ConfigClass.MAX_REQUEST_BODY_SIZE:
+            raise APIException(
+                error_msg='Request body is too large', status_code=EAPIResponseCode.payload_too_large.value
+            )
+        chunks.append(chunk)
+    body = b''.join(chunks)
+    # let other readers of the same request see the body that was already consumed
+    request._body = body
+
+    try:
+        request.state.json_body = json_utils.loads(body)
+    except json_utils.JSONDecodeError:
+        raise APIException(error_msg='Request body is not valid JSON', status_code=EAPIResponseCode.bad_request.value)
+    return request.state.json_body
@@ -0,0 +1,139 @@
+# Copyright (C) 2022 Indoc Research
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+from typing import Any
+from typing import Dict
+from typing import Optional
+
+import aioredis
+from common import LoggerFactory
+
+from config import ConfigClass
+from resources.cache import TTLCache
+
+logger = LoggerFactory('shared_version').get_logger()
+
+REDIS_ERRORS = (aioredis.exceptions.ConnectionError, aioredis.exceptions.TimeoutError)
+
+
+class SharedVersion:
+    """Version counter kept in Redis so every worker notices when state cached in process was changed by another one.
+
+    bump() increments the counter. current() reads it from Redis at most once every check_interval seconds and
+    returns the last value read in between, so changes reach the other workers within check_interval. When Redis is
+    unreachable the last known value is used and only the worker making the change notices it.
+    """
+
+    def __init__(self, name: str, check_interval: float) -> None:
+        self.key = f'bff-web-{name}-version'
+        self.check_interval = check_interval
+        self.value = 0
+        self.checked_at: Optional[float] = None
+        self.errors = 0
+        self._redis: Optional[aioredis.Redis] = None
+
+    @property
+    def redis(self) -> aioredis.Redis:
+        if self._redis is None:
+            self._redis = aioredis.from_url(ConfigClass.REDIS_URL)
+        return self._redis
+
+    async def current(self) -> int:
+        """Return the current version."""
+
+        now = time.monotonic()
+        if self.checked_at is not None and now - self.checked_at < self.check_interval:
+            return self.value
+
+        self.checked_at = now
+        try:
+            data = await self.redis.get(self.key)
+        except REDIS_ERRORS as e:
+            self.errors += 1
+            logger.error(f"Couldn't connect to redis, using last known {self.key}: {e}")
+            return self.value
+        self.value = int(data) if data is not None else 0
+        return self.value
+
+    async def bump(self) -> int:
+        """Increment the version and return the new one."""
+
+        try:
+            self.value = await self.redis.incr(self.key)
+        except REDIS_ERRORS as e:
+            self.errors += 1
+            logger.error(f"Couldn't connect to redis, {self.key} is only changed in this worker: {e}")
+            self.value += 1
+        self.checked_at = time.monotonic()
+        return self.value
+
+    def stats(self) -> Dict[str, Any]:
+        return {'version': self.value, 'check_interval': self.check_interval, 'errors': self.errors}
+
+
+class SharedVersions:
+    """Version counters per key, kept in one Redis hash so every worker notices when state cached for a key changed.
+
+    Works like SharedVersion, but bumping a key leaves whatever is cached for the other keys valid. The last version
+    read for a key is kept in process for up to ttl seconds, so it must not be shorter than the lifetime of the state
+    it guards.
+    """
+
+    def __init__(self, name: str, check_interval: float, maxsize: int, ttl: float) -> None:
+        self.key = f'bff-web-{name}-versions'
+        self.check_interval = check_interval
+        # (checked_at, version) per key
+        self.values = TTLCache(f'{name}_versions', maxsize, ttl)
+        self.errors = 0
+        self._redis: Optional[aioredis.Redis] = None
+
+    @property
+    def redis(self) -> aioredis.Redis:
+        if self._redis is None:
+            self._redis = aioredis.from_url(ConfigClass.REDIS_URL)
+        return self._redis
+
+    async def current(self, key: str) -> int:
+        """Return the current version of key."""
+
+        now = time.monotonic()
+        checked_at, value = self.values.get(key, (None, 0))
+        if checked_at is not None and now - checked_at < self.check_interval:
+            return value
+
+        # concurrent lookups of the same key use the last known version instead of all reading Redis
+        self.values.set(key, (now, value))
+        try:
+            data = await self.redis.hget(self.key, key)
+        except REDIS_ERRORS as e:
+            self.errors += 1
+            logger.error(f"Couldn't connect to redis, using last known {self.key} of {key}: {e}")
+            return value
+        value = int(data) if data is not None else 0
+        self.values.set(key, (now, value))
+        return value
+
+    async def bump(self, key: str) -> int:
+        """Increment the version of key and return the new one."""
+
+        try:
+            value = await self.redis.hincrby(self.key, key, 1)
+        except REDIS_ERRORS as e:
+            self.errors += 1
+            logger.error(f"Couldn't connect to redis, {self.key} of {key} is only changed in this worker: {e}")
+            value = self.values.get(key, (None, 0))[1] + 1
+        self.values.set(key, (time.monotonic(), value))
+        return value
@@ -0,0 +1,176 @@
+# Copyright (C) 2022 Indoc Research
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+import time
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import Optional
+
+import aioredis
+from common import LoggerFactory
+
+from config import ConfigClass
+from resources import json_utils
+from resources.cache import TTLCache
+from resources.cache import register_cache
+from resources.single_flight import SingleFlight
+from resources.tiered_cache import cache_bypass
+
+logger = LoggerFactory('swr_cache').get_logger()
+
+REDIS_ERRORS = (aioredis.exceptions.ConnectionError, aioredis.exceptions.TimeoutError)
+
+
+class StaleWhileRevalidateCache:
+    """Cache for expensive upstream responses that serves stale values while they are refreshed in the background.
+
+    Values younger than fresh_ttl are returned as they are. Older values are still returned for up to stale_ttl seconds,
+    but the first lookup after they turned stale starts a refresh in the background. Entries are kept in Redis so all
+    workers share them, and a Redis lock makes sure only one worker refreshes a key at a time. Each worker also keeps
+    its own copy, which is used when Redis is unreachable or the cache is not shared.
+    """
+
+    def __init__(self, name: str, maxsize: int, fresh_ttl: float, stale_ttl: int, shared: bool = True) -> None:
+        self.name = name
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+        self.shared = shared
+        self.prefix = f'bff-web-{name}-'
+        self.local = TTLCache(f'{name}_local', maxsize, stale_ttl)
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.errors = 0
+        self._loads = SingleFlight()
+        self._refreshes: Dict[str, asyncio.Task] = {}
+        self._redis: Optional[aioredis.Redis] = None
+        register_cache(name, self)
+
+    @property
+    def redis(self) -> aioredis.Redis:
+        if self._redis is None:
+            self._redis = aioredis.from_url(ConfigClass.REDIS_URL)
+        return self._redis
+
+    async def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        data = self.local.get(key)
+        entry = json_utils.loads(data) if data is not None else None
+        if not self.shared or entry is not None and self._age(entry) < self.fresh_ttl:
+            return entry
+
+        try:
+            data = await self.redis.get(self.prefix + key)
+        except REDIS_ERRORS as e:
+            self.errors += 1
+            logger.error(f"Couldn't connect to redis, using local cache: {e}")
+            return entry
+        if data is None:
+            return entry
+
+        shared = json_utils.loads(data)
+        age = self._age(shared)
+        if age >= self.stale_ttl:
+            return entry
+        if entry is None or shared['stored_at'] > entry['stored_at']:
+            # the local copy expires together with the shared entry, not stale_ttl after it was copied
+            self.local.set(key, data, ttl=self.stale_ttl - age)
+            entry = shared
+        return entry
+
+    @staticmethod
+    def _age(entry: Dict[str, Any]) -> float:
+        return time.time() - entry['stored_at']
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> bytes:
+        data = json_utils.dumps({'stored_at': time.time(), 'value': await loader()})
+        self.local.set(key, data)
+        if not self.shared:
+            return data
+        try:
+            await self.redis.setex(self.prefix + key, self.stale_ttl, data)
+        except REDIS_ERRORS as e:
+            self.errors += 1
+            logger.error(f"Couldn't connect to redis, skipping shared cache: {e}")
+        return data
+
+    async def _acquire_refresh(self, key: str) -> bool:
+        if not self.shared:
+            return True
+        try:
+            # the lock expires on its own should the refreshing worker go away
+            lock = self.prefix + key + '-refresh'
+            return bool(await self.redis.set(lock, 1, nx=True, ex=max(int(self.fresh_ttl), 1)))
+        except REDIS_ERRORS:
+            return True
+
+    async def _refresh(self, key: str, loader: Callable[[], Awaitable[Any]]) -> None:
+        if not await self._acquire_refresh(key):
+            return
+        self.refreshes += 1
+        try:
+            await self._loads.do(key, lambda: self._load(key, loader))
+        except Exception as e:
+            logger.error(f'Unable to refresh "{key}" in {self.name} cache, serving stale value: {e}')
+
+    def _refresh_in_background(self, key: str, loader: Callable[[], Awaitable[Any]]) -> None:
+        if key in self._refreshes:
+            return
+        task = self._refreshes[key] = asyncio.ensure_future(self._refresh(key, loader))
+        task.add_done_callback(lambda _: self._refreshes.pop(key, None))
+
+    async def get(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Return value for key, calling loader when there is no usable cached value.
+
+        Every call returns a new copy of the value, so callers are free to modify it. Requests bypassing the cache
+        always call loader and store its result.
+        """
+
+        if not cache_bypass.get():
+            entry = await self._lookup(key)
+            if entry is not None:
+                if self._age(entry) < self.fresh_ttl:
+                    self.hits += 1
+                else:
+                    self.stale_hits += 1
+                    self._refresh_in_background(key, loader)
+                return entry['value']
+
+        self.misses += 1
+        data = await self._loads.do(key, lambda: self._load(key, loader))
+        return json_utils.loads(data)['value']
+
+    def clear(self) -> None:
+        """Clear the in-process copies, entries in Redis expire on their own."""
+
+        self.local.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            'size': len(self.local),
+            'fresh_ttl': self.fresh_ttl,
+            'stale_ttl': self.stale_ttl,
+            'shared': self.shared,
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'refreshes': self.refreshes,
+            'errors': self.errors,
+            'hit_ratio': round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+        }
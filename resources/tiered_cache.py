@@ -0,0 +1,202 @@
+# Copyright (C) 2022 Indoc Research
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from contextvars import ContextVar
+from typing import Any
+from typing import Dict
+from typing import Hashable
+from typing import List
+from typing import Optional
+
+import aioredis
+from common import LoggerFactory
+from starlette.types import ASGIApp
+from starlette.types import Receive
+from starlette.types import Scope
+from starlette.types import Send
+
+from config import ConfigClass
+from resources import json_utils
+from resources.cache import TTLCache
+from resources.cache import register_cache
+
+logger = LoggerFactory('tiered_cache').get_logger()
+
+# requests sending this header skip cache lookups, fresh values are still stored
+BYPASS_HEADER = b'x-cache-bypass'
+
+cache_bypass: ContextVar[bool] = ContextVar('cache_bypass', default=False)
+
+
+class TieredCache:
+    """Cache with an in-process LRU in front of a Redis cache shared by all workers.
+
+    Values are stored JSON encoded in both tiers, so every lookup returns a new copy that callers are free to modify.
+    The in-process tier is not invalidated in other workers, so its ttl should be kept a few seconds. When Redis is
+    unreachable the shared tier is skipped.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float, shared_ttl: int) -> None:
+        self.name = name
+        self.shared_ttl = shared_ttl
+        self.prefix = f'bff-web-{name}-'
+        self.local = TTLCache(f'{name}_local', maxsize, ttl)
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.errors = 0
+        self._redis: Optional[aioredis.Redis] = None
+        register_cache(name, self)
+
+    @property
+    def redis(self) -> aioredis.Redis:
+        if self._redis is None:
+            self._redis = aioredis.from_url(ConfigClass.REDIS_URL)
+        return self._redis
+
+    async def get(self, key: Hashable) -> Any:
+        """Return cached value for key or None if it is missing or the request bypasses the cache."""
+
+        if cache_bypass.get():
+            self.bypassed += 1
+            return None
+
+        data = self.local.get(key)
+        if data is not None:
+            self.hits += 1
+            return json_utils.loads(data)
+
+        if self.shared_ttl > 0:
+            try:
+                data = await self.redis.get(self.prefix + str(key))
+            except (aioredis.exceptions.ConnectionError, aioredis.exceptions.TimeoutError) as e:
+                self.errors += 1
+                logger.error(f"Couldn't connect to redis, skipping cache: {e}")
+            if data is not None:
+                self.hits += 1
+                self.shared_hits += 1
+                self.local.set(key, data)
+                return json_utils.loads(data)
+
+        self.misses += 1
+        return None
+
+    async def get_many(self, keys: List[Hashable]) -> Dict[Hashable, Any]:
+        """Return cached values by key, keys which are not cached are left out."""
+
+        if cache_bypass.get():
+            self.bypassed += len(keys)
+            return {}
+
+        found = {}
+        for key in keys:
+            data = self.local.get(key)
+            if data is not None:
+                found[key] = data
+        self.hits += len(found)
+
+        missing = [key for key in keys if key not in found]
+        if missing and self.shared_ttl > 0:
+            try:
+                values = await self.redis.mget([self.prefix + str(key) for key in missing])
+            except (aioredis.exceptions.ConnectionError, aioredis.exceptions.TimeoutError) as e:
+                self.errors += 1
+                logger.error(f"Couldn't connect to redis, skipping cache: {e}")
+                values = []
+            for key, data in zip(missing, values):
+                if data is not None:
+                    found[key] = data
+                    self.local.set(key, data)
+                    self.hits += 1
+                    self.shared_hits += 1
+
+        self.misses += len(keys) - len(found)
+        return {key: json_utils.loads(data) for key, data in found.items()}
+
+    async def set(self, key: Hashable, value: Any) -> None:
+        data = json_utils.dumps(value)
+        self.local.set(key, data)
+        if self.shared_ttl > 0:
+            try:
+                await self.redis.setex(self.prefix + str(key), self.shared_ttl, data)
+            except (aioredis.exceptions.ConnectionError, aioredis.exceptions.TimeoutError) as e:
+                self.errors += 1
+                logger.error(f"Couldn't connect to redis, skipping cache: {e}")
+
+    async def set_many(self, values: Dict[Hashable, Any]) -> None:
+        encoded = {key: json_utils.dumps(value) for key, value in values.items()}
+        for key, data in encoded.items():
+            self.local.set(key, data)
+        if encoded and self.shared_ttl > 0:
+            try:
+                async with self.redis.pipeline(transaction=False) as pipeline:
+                    for key, data in encoded.items():
+                        pipeline.setex(self.prefix + str(key), self.shared_ttl, data)
+                    await pipeline.execute()
+            except (aioredis.exceptions.ConnectionError, aioredis.exceptions.TimeoutError) as e:
+                self.errors += 1
+                logger.error(f"Couldn't connect to redis, skipping cache: {e}")
+
+    async def delete(self, *keys: Hashable) -> None:
+        """Remove keys from both tiers."""
+
+        if not keys:
+            return
+        for key in keys:
+            self.local.pop(key)
+        if self.shared_ttl > 0:
+            try:
+                await self.redis.delete(*[self.prefix + str(key) for key in keys])
+            except (aioredis.exceptions.ConnectionError, aioredis.exceptions.TimeoutError) as e:
+                self.errors += 1
+                logger.error(f"Couldn't connect to redis, unable to invalidate cache: {e}")
+
+    def clear(self) -> None:
+        """Clear the in-process tier, entries in Redis expire on their own."""
+
+        self.local.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self.local),
+            'ttl': self.local.ttl,
+            'shared_ttl': self.shared_ttl,
+            'hits': self.hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+            'bypassed': self.bypassed,
+            'errors': self.errors,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class CacheBypassMiddleware:
+    """Let requests sending the bypass header skip cached values, useful for debugging stale data."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http' or not any(name == BYPASS_HEADER for name, _ in scope['headers']):
+            await self.app(scope, receive, send)
+            return
+
+        token = cache_bypass.set(True)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            cache_bypass.reset(token)
@@ -0,0 +1,168 @@
+# Copyright (C) 2022 Indoc Research
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from typing import Any
+from typing import AsyncIterator
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Tuple
+
+import httpx
+from fastapi import Request
+
+from config import ConfigClass
+from config import Settings
+
+UPSTREAMS = (
+    'approval',
+    'auth',
+    'dataops',
+    'dataset',
+    'download_core',
+    'download_greenroom',
+    'keycloak',
+    'kg',
+    'metadata',
+    'notify',
+    'project',
+    'provenance',
+    'search',
+)
+
+# headers describing the incoming connection and body encoding, they must not be copied to upstream requests
+HOP_HEADERS = {
+    'accept-encoding',
+    'connection',
+    'content-length',
+    'content-type',
+    'host',
+    'keep-alive',
+    'transfer-encoding',
+}
+
+
+def normalize_params(params: Any) -> Any:
+    """Encode query parameters the way requests did: None values are left out and booleans are sent as True/False.
+
+    httpx would send None as an empty value and booleans in lower case, which the upstream services read differently.
+    """
+
+    if params is None or isinstance(params, (str, bytes, httpx.QueryParams)):
+        return params
+
+    items = params.items() if hasattr(params, 'items') else params
+    normalized: List[Tuple[str, Any]] = []
+    for key, value in items:
+        values = value if isinstance(value, (list, tuple)) else [value]
+        for item in values:
+            if item is None:
+                continue
+            normalized.append((key, str(item) if isinstance(item, bool) else item))
+    return normalized
+
+
+class UpstreamClient(httpx.AsyncClient):
+    """Async client that encodes query parameters with normalize_params."""
+
+    def build_request(self, method: str, url: Any, *, params: Any = None, **kwargs: Any) -> httpx.Request:
+        return super().build_request(method, url, params=normalize_params(params), **kwargs)
+
+
+class UpstreamClients:
+    """Registry holding one pooled async HTTP client per upstream service.
+
+    Clients are created on first use, or at startup with open(), and kept open so connections are reused across
+    requests. Pool limits and the default timeout come from the settings; UPSTREAM_TIMEOUTS and UPSTREAM_LIMITS override
+    them for individual upstreams.
+    """
+
+    def __init__(self, settings: Settings) -> None:
+        self.settings = settings
+        self._clients: Dict[str, UpstreamClient] = {}
+
+    def _create(self, name: str) -> httpx.AsyncClient:
+        timeout = self.settings.UPSTREAM_TIMEOUTS.get(name, self.settings.UPSTREAM_TIMEOUT)
+        overrides = self.settings.UPSTREAM_LIMITS.get(name, {})
+        limits = httpx.Limits(
+            max_connections=int(overrides.get('max_connections', self.settings.UPSTREAM_MAX_CONNECTIONS)),
+            max_keepalive_connections=int(
+                overrides.get('max_keepalive_connections', self.settings.UPSTREAM_MAX_KEEPALIVE_CONNECTIONS)
+            ),
+            keepalive_expiry=overrides.get('keepalive_expiry', self.settings.UPSTREAM_KEEPALIVE_EXPIRY),
+        )
+        # requests followed redirects, callers migrated from it expect the final response
+        return UpstreamClient(timeout=timeout, limits=limits, follow_redirects=True)
+
+    def get(self, name: str) -> httpx.AsyncClient:
+        """Return the shared client for the upstream, creating it when needed."""
+
+        if name not in UPSTREAMS:
+            raise KeyError(f'Unknown upstream "{name}"')
+
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            client = self._clients[name] = self._create(name)
+        return client
+
+    def open(self, names: Iterable[str] = UPSTREAMS) -> None:
+        """Create clients for the upstreams up front instead of on the first request."""
+
+        for name in names:
+            self.get(name)
+
+    async def aclose(self) -> None:
+        """Close all clients, they are recreated on next use."""
+
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            await client.aclose()
+
+
+upstream_clients = UpstreamClients(ConfigClass)
+
+
+def upstream_client(name: str) -> Callable[[], httpx.AsyncClient]:
+    """Get shared client of the upstream as a FastAPI dependency."""
+
+    if name not in UPSTREAMS:
+        raise KeyError(f'Unknown upstream "{name}"')
+
+    def get_client() -> httpx.AsyncClient:
+        return upstream_clients.get(name)
+
+    return get_client
+
+
+def forward_headers(request: Request) -> Dict[str, str]:
+    """Return headers of the incoming request that can be passed on to an upstream service."""
+
+    return {key: value for key, value in request.headers.items() if key not in HOP_HEADERS}
+
+
+async def stream_upstream_response(response: httpx.Response, chunk_size: int) -> AsyncIterator[bytes]:
+    """Relay body of a streamed upstream response as it is received and close the response afterwards.
+
+    The next chunk is only read from upstream once the previous one was sent, so a slow client slows down the upstream
+    read. When the client goes away the generator is closed and so is the upstream connection.
+    """
+
+    try:
+        async for chunk in response.aiter_raw(chunk_size):
+            yield chunk
+    finally:
+        await response.aclose()
@@ -15,32 +15,30 @@
 import datetime
 from datetime import timezone
 
-import httpx
-import requests
-
 from config import ConfigClass
+from resources.upstream import upstream_clients
 from services.permissions_service.utils import has_permission
 
 
-def check_invite_permissions(dataset_node, current_identity):
+async def check_invite_permissions(dataset_node, current_identity):
     if not dataset_node:
         # Only platform admin can invite without a project
         if current_identity['role'] != 'admin':
             return False
     if current_identity['role'] != 'admin':
-        if not has_permission(dataset_node['code'], 'invite', '*', 'create', current_identity):
+        if not await has_permission(dataset_node['code'], 'invite', '*', 'create', current_identity):
             return False
     return True
 
 
-def remove_user_from_project_group(project_code, user_email, logger):
+async def remove_user_from_project_group(project_code, user_email, logger):
     # Remove user from keycloak group with the same name as the project
     payload = {
         'operation_type': 'remove',
         'user_email': user_email,
         'group_code': project_code,
     }
-    res = requests.put(
+    res = await upstream_clients.get('auth').put(
         url=ConfigClass.AUTH_SERVICE + 'user/ad-group',
         json=payload,
     )
@@ -48,13 +46,13 @@ def remove_user_from_project_group(project_code, user_email, logger):
         logger.error(f'Error removing user from group in ad: {res.text} {res.status_code}')
 
 
-def add_user_to_ad_group(user_email, project_code, logger):
+async def add_user_to_ad_group(user_email, project_code, logger):
     payload = {
         'operation_type': 'add',
         'user_email': user_email,
         'group_code': project_code,
     }
-    res = requests.put(
+    res = await upstream_clients.get('auth').put(
         url=ConfigClass.AUTH_SERVICE + 'user/ad-group',
         json=payload,
     )
@@ -73,16 +71,16 @@ def helper_now_utc():
     return utc_time
 
 
-def get_dataset(dataset_id: str) -> dict:
-    response = requests.get(f'{ConfigClass.DATASET_SERVICE}dataset/{dataset_id}')
+async def get_dataset(dataset_id: str) -> dict:
+    response = await upstream_clients.get('dataset').get(f'{ConfigClass.DATASET_SERVICE}dataset/{dataset_id}')
     res = response.json()
     dataset = res['result']
     return dataset
 
 
 async def get_dataset_by_code(dataset_code: str) -> dict:
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f'{ConfigClass.DATASET_SERVICE}dataset-peek/{dataset_code}')
+    client = upstream_clients.get('dataset')
+    response = await client.get(f'{ConfigClass.DATASET_SERVICE}dataset-peek/{dataset_code}')
     res = response.json()
     dataset = res['result']
     return dataset
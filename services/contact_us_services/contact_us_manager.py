@@ -24,11 +24,11 @@ class SrvContactUsManager(metaclass=MetaService):
     def __init__(self):
         self._logger = LoggerFactory('api_contact_use').get_logger()
 
-    def send_contact_us_email(self, contact_us_form: ContactUsForm):
+    async def send_contact_us_email(self, contact_us_form: ContactUsForm):
         email_sender = SrvEmail()
 
         subject = f'ACTION REQUIRED - {ConfigClass.PROJECT_NAME} Support Request Submitted'
-        email_sender.send(
+        await email_sender.async_send(
             subject,
             [ConfigClass.EMAIL_SUPPORT],
             msg_type='html',
@@ -43,7 +43,7 @@ class SrvContactUsManager(metaclass=MetaService):
         )
 
         confirm_subject = 'Confirmation of Contact Email'
-        email_sender.send(
+        await email_sender.async_send(
             confirm_subject,
             [contact_us_form.email],
             msg_type='html',
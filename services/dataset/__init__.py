@@ -15,11 +15,11 @@
 from config import ConfigClass
 from models.api_response import EAPIResponseCode
 from resources.error_handler import APIException
-import requests
+from resources.upstream import upstream_clients
 
 
-def get_dataset_by_id(dataset_id: str) -> dict:
-    response = requests.get(ConfigClass.DATASET_SERVICE + f'dataset/{dataset_id}')
+async def get_dataset_by_id(dataset_id: str) -> dict:
+    response = await upstream_clients.get('dataset').get(ConfigClass.DATASET_SERVICE + f'dataset/{dataset_id}')
     print(response.json())
     if response.status_code != 200:
         error_msg = f'Error calling Dataset service get_dataset_by_id: {response.json()}'
@@ -30,8 +30,8 @@ def get_dataset_by_id(dataset_id: str) -> dict:
     return response.json()['result']
 
 
-def get_dataset_by_code(dataset_code: str) -> dict:
-    response = requests.get(ConfigClass.DATASET_SERVICE + f'dataset-peek/{dataset_code}')
+async def get_dataset_by_code(dataset_code: str) -> dict:
+    response = await upstream_clients.get('dataset').get(ConfigClass.DATASET_SERVICE + f'dataset-peek/{dataset_code}')
     if response.status_code != 200:
         error_msg = f'Error calling Dataset service get_dataset_by_code: {response.json()}'
         raise APIException(error_msg=error_msg, status_code=EAPIResponseCode.internal_error.value)
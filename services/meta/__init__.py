@@ -12,32 +12,111 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import asyncio
+import copy
+from typing import AsyncIterator
+from typing import Iterable
+from typing import Optional
+
+import httpx
+
 from config import ConfigClass
 from models.api_response import EAPIResponseCode
+from resources import json_utils
 from resources.error_handler import APIException
-import requests
+from resources.single_flight import SingleFlight
+from resources.tiered_cache import TieredCache
+from resources.upstream import upstream_clients
+
+ZONE_NAMES = {0: 'greenroom', 1: 'core'}
+
+entity_cache = TieredCache(
+    'entities', ConfigClass.ENTITY_CACHE_SIZE, ConfigClass.ENTITY_CACHE_TTL, ConfigClass.ENTITY_CACHE_SHARED_TTL
+)
+entity_fetches = SingleFlight()
+template_cache = TieredCache(
+    'templates',
+    ConfigClass.TEMPLATE_CACHE_SIZE,
+    ConfigClass.TEMPLATE_CACHE_TTL,
+    ConfigClass.TEMPLATE_CACHE_SHARED_TTL,
+)
+
+
+def relabel_zones(entities: list) -> list:
+    """Replace zone numbers of entities by zone names in place."""
 
+    for entity in entities:
+        entity['zone'] = ZONE_NAMES.get(entity['zone'], 'core')
+    return entities
 
-def get_entity_by_id(entity_id: str) -> dict:
-    response = requests.get(ConfigClass.METADATA_SERVICE + f'item/{entity_id}')
+
+def decode_entities(response: httpx.Response) -> dict:
+    """Decode a metadata service listing once and relabel the zones of its entities on the way."""
+
+    result = json_utils.loads(response.content)
+    relabel_zones(result['result'])
+    return result
+
+
+async def fetch_entity(entity_id: str) -> dict:
+    response = await upstream_clients.get('metadata').get(ConfigClass.METADATA_SERVICE + f'item/{entity_id}')
     if response.status_code != 200:
         error_msg = f'Error calling Meta service get_node_by_id: {response.json()}'
         raise APIException(error_msg=error_msg, status_code=EAPIResponseCode.internal_error.value)
     if not response.json()['result']:
         error_msg = 'Entity not found'
         raise APIException(error_msg=error_msg, status_code=EAPIResponseCode.not_found.value)
-    return response.json()['result']
+    entity = response.json()['result']
+    await entity_cache.set(entity_id, entity)
+    return entity
 
 
-def get_entities_batch(entity_ids: list) -> list:
-    response = requests.get(ConfigClass.METADATA_SERVICE + "items/batch", params={"ids": entity_ids})
+async def get_entity_by_id(entity_id: str) -> dict:
+    entity = await entity_cache.get(entity_id)
+    if entity is None:
+        # concurrent callers share the fetched entity, each of them gets its own copy
+        entity = copy.deepcopy(await entity_fetches.do(entity_id, lambda: fetch_entity(entity_id)))
+    return entity
+
+
+async def invalidate_entities(entity_ids: list) -> None:
+    """Drop cached entities, must be called after the BFF updates items in the metadata service."""
+
+    await entity_cache.delete(*entity_ids)
+
+
+async def get_entities_batch(entity_ids: list) -> list:
+    response = await upstream_clients.get('metadata').get(
+        ConfigClass.METADATA_SERVICE + "items/batch", params={"ids": entity_ids}
+    )
     if response.status_code != 200:
         error_msg = f'Error calling Meta service get_node_by_id: {response.json()}'
         raise APIException(error_msg=error_msg, status_code=EAPIResponseCode.internal_error.value)
     return response.json()['result']
 
 
-def search_entities(
+async def get_entities_by_ids(entity_ids: list) -> dict:
+    """Return entities by id, entities which are not cached are fetched with concurrent batch calls."""
+
+    entity_ids = list(dict.fromkeys(entity_ids))
+    entities = await entity_cache.get_many(entity_ids)
+    missing = [entity_id for entity_id in entity_ids if entity_id not in entities]
+    if missing:
+        batch_size = ConfigClass.ENTITY_BATCH_SIZE
+        batches = await asyncio.gather(
+            *[get_entities_batch(missing[i : i + batch_size]) for i in range(0, len(missing), batch_size)]
+        )
+        fetched = {entity['id']: entity for batch in batches for entity in batch}
+        await entity_cache.set_many(fetched)
+        entities.update(fetched)
+
+    if len(entities) < len(entity_ids):
+        error_msg = 'Entity not found'
+        raise APIException(error_msg=error_msg, status_code=EAPIResponseCode.not_found.value)
+    return entities
+
+
+async def search_entities(
     container_code: str,
     parent_path: str,
     zone: str,
@@ -52,8 +131,75 @@ def search_entities(
     }
     if name:
         payload["name"] = name
-    response = requests.get(ConfigClass.METADATA_SERVICE + "items/search", params=payload)
+    response = await upstream_clients.get('metadata').get(ConfigClass.METADATA_SERVICE + "items/search", params=payload)
     if response.status_code != 200:
         error_msg = f'Error calling Meta service search_entities: {response.json()}'
         raise APIException(error_msg=error_msg, status_code=EAPIResponseCode.internal_error.value)
     return response.json()['result']
+
+
+async def search_entity_pages(
+    params: dict, page_size: int = ConfigClass.METADATA_SEARCH_PAGE_SIZE
+) -> AsyncIterator[list]:
+    """Yield items/search results page by page, so callers can stop reading as soon as they are done."""
+
+    page = 0
+    while True:
+        response = await upstream_clients.get('metadata').get(
+            ConfigClass.METADATA_SERVICE + 'items/search/', params={**params, 'page': page, 'page_size': page_size}
+        )
+        if response.status_code != 200:
+            error_msg = f'Error calling Meta service search_entity_pages: {response.text}'
+            raise APIException(error_msg=error_msg, status_code=EAPIResponseCode.internal_error.value)
+        data = response.json()
+        yield data['result']
+
+        page += 1
+        if len(data['result']) < page_size or page >= data.get('num_of_pages', page + 1):
+            return
+
+
+async def get_template(template_id: str) -> Optional[dict]:
+    """Return attribute template by id or None when it does not exist."""
+
+    template = await template_cache.get(f'id-{template_id}')
+    if template is not None:
+        return template
+
+    response = await upstream_clients.get('metadata').get(ConfigClass.METADATA_SERVICE + f'template/{template_id}/')
+    if response.status_code == 404:
+        return None
+    if response.status_code != 200:
+        error_msg = f'Error calling Meta service get_template: {response.text}'
+        raise APIException(error_msg=error_msg, status_code=EAPIResponseCode.internal_error.value)
+    template = response.json()['result']
+    if not template:
+        return None
+    await template_cache.set(f'id-{template_id}', template)
+    return template
+
+
+async def list_project_templates(project_code: str) -> dict:
+    """Return metadata service response listing all attribute templates of the project."""
+
+    templates = await template_cache.get(f'project-{project_code}')
+    if templates is not None:
+        return templates
+
+    response = await upstream_clients.get('metadata').get(
+        ConfigClass.METADATA_SERVICE + 'template/', params={'project_code': project_code}
+    )
+    if response.status_code != 200:
+        error_msg = f'Error calling Meta service list_project_templates: {response.text}'
+        raise APIException(error_msg=error_msg, status_code=EAPIResponseCode.internal_error.value)
+    templates = response.json()
+    await template_cache.set(f'project-{project_code}', templates)
+    return templates
+
+
+async def invalidate_templates(template_ids: Iterable[str] = (), project_codes: Iterable[str] = ()) -> None:
+    """Drop cached templates, must be called after the BFF changes templates in the metadata service."""
+
+    keys = [f'id-{template_id}' for template_id in template_ids]
+    keys += [f'project-{project_code}' for project_code in project_codes]
+    await template_cache.delete(*keys)
@@ -14,36 +14,10 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 from models.service_meta_class import MetaService
 from config import ConfigClass
-import requests
-import httpx
-import json
+from resources.upstream import upstream_clients
 
 
 class SrvEmail(metaclass=MetaService):
-    def send(self, subject, receiver: list = [], content=None, msg_type="plain", attachments=[], \
-            sender=ConfigClass.EMAIL_SUPPORT, template=None, template_kwargs={}):
-        '''
-        (str, str, str, str, str) -> dict   #**TypeContract**
-        '''
-        url = ConfigClass.NOTIFY_SERVICE + "email"
-        payload = {
-            "subject": subject,
-            "sender": sender,
-            "receiver": receiver,
-            "msg_type": msg_type,
-            "attachments": attachments,
-        }
-        if content:
-            payload["message"] = content
-        if template:
-            payload["template"] = template
-            payload["template_kwargs"] = template_kwargs
-        res = requests.post(
-            url=url,
-            json=payload
-        )
-        return json.loads(res.text)
-
     async def async_send(
         self,
         subject,
@@ -68,6 +42,6 @@ class SrvEmail(metaclass=MetaService):
         if template:
             payload["template"] = template
             payload["template_kwargs"] = template_kwargs
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, json=payload)
+        client = upstream_clients.get('notify')
+        response = await client.post(url, json=payload)
         return response.json()
@@ -16,9 +16,10 @@ from fastapi import Request
 from .utils import has_permission, get_project_code_from_request
 from common import LoggerFactory
 from services.dataset import get_dataset_by_id, get_dataset_by_code
-from app.auth import get_current_identity
+from app.auth import get_request_identity
 from models.api_response import EAPIResponseCode
 from resources.error_handler import APIException
+from resources.request_body import get_request_json
 
 _logger = LoggerFactory('permissions').get_logger()
 
@@ -33,8 +34,8 @@ class PermissionsCheck:
         project_code = await get_project_code_from_request(request)
         if not project_code:
             _logger.error("Couldn't get project_code in permissions_check decorator")
-        current_identity = get_current_identity(request)
-        if has_permission(project_code, self.resource, self.zone, self.operation, current_identity):
+        current_identity = await get_request_identity(request)
+        if await has_permission(project_code, self.resource, self.zone, self.operation, current_identity):
             return True
         _logger.info(f"Permission denied for {project_code} - {self.resource} - {self.zone} - {self.operation}")
         raise APIException(error_msg="Permission Denied", status_code=EAPIResponseCode.forbidden.value)
@@ -44,10 +45,10 @@ class DatasetPermission:
     async def __call__(self, request: Request):
         dataset_id = request.path_params.get("dataset_id")
         if not dataset_id:
-            data = await request.json()
+            data = await get_request_json(request)
             dataset_id = data.get("dataset_id") or data.get("dataset_geid")
-        dataset = get_dataset_by_id(dataset_id)
-        current_identity = get_current_identity(request)
+        dataset = await get_dataset_by_id(dataset_id)
+        current_identity = await get_request_identity(request)
         if dataset["creator"] != current_identity["username"]:
             raise APIException(error_msg="Permission Denied", status_code=EAPIResponseCode.forbidden.value)
         return True
@@ -57,10 +58,10 @@ class DatasetPermissionByCode:
     async def __call__(self, request: Request):
         dataset_code = request.path_params.get("dataset_code")
         if not dataset_code:
-            data = await request.json()
+            data = await get_request_json(request)
             dataset_code = data.get("dataset_code")
-        dataset = get_dataset_by_code(dataset_code)
-        current_identity = get_current_identity(request)
+        dataset = await get_dataset_by_code(dataset_code)
+        current_identity = await get_request_identity(request)
         if dataset["creator"] != current_identity["username"]:
             raise APIException(error_msg="Permission Denied", status_code=EAPIResponseCode.forbidden.value)
         return True
@@ -0,0 +1,153 @@
+# Copyright (C) 2022 Indoc Research
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+import time
+from typing import Any
+from typing import Dict
+from typing import FrozenSet
+from typing import Optional
+from typing import Tuple
+
+from common import LoggerFactory
+
+from config import ConfigClass
+from resources.shared_version import SharedVersion
+from resources.single_flight import SingleFlight
+from resources.upstream import upstream_clients
+
+_logger = LoggerFactory('permission_matrix').get_logger()
+
+Permission = Tuple[str, str, str, str]
+
+
+class PermissionMatrix:
+    """In-process copy of the role/resource/zone/operation permission matrix of the auth service.
+
+    The matrix is loaded from the auth service permissions listing, which returns one row per granted
+    (role, resource, zone, operation) tuple. Lookups are answered from memory. While the matrix has not been loaded, or
+    has not been refreshed for longer than max_age seconds, lookups return None so callers fall back to the authorize
+    API instead of using stale rules.
+
+    refresh_all_workers() bumps a version shared through Redis. Workers holding a matrix loaded under an older version
+    stop using it, reload it in the background and fall back to the authorize API in the meantime.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        refresh_interval: int,
+        max_age: int,
+        page_size: int = 1000,
+        version_check_interval: float = 5,
+    ) -> None:
+        self.url = url
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self.page_size = page_size
+        self.permissions: FrozenSet[Permission] = frozenset()
+        self.refreshed_at: Optional[float] = None
+        self.version = SharedVersion('permission-matrix', version_check_interval)
+        self.loaded_version = 0
+        self._refreshes = SingleFlight()
+        self._task: Optional[asyncio.Task] = None
+        self._background_refresh: Optional[asyncio.Task] = None
+
+    @property
+    def is_fresh(self) -> bool:
+        return self.refreshed_at is not None and time.monotonic() - self.refreshed_at < self.max_age
+
+    async def lookup(self, role: str, resource: str, zone: str, operation: str) -> Optional[bool]:
+        """Return whether the role is allowed the operation or None when the matrix cannot be trusted."""
+
+        if not self.is_fresh:
+            return None
+        if await self.version.current() != self.loaded_version:
+            self._refresh_in_background()
+            return None
+        return (role, resource, zone, operation) in self.permissions
+
+    async def _fetch(self) -> int:
+        version = await self.version.current()
+        permissions = set()
+        page = 0
+        client = upstream_clients.get('auth')
+        while True:
+            response = await client.get(self.url, params={'page': page, 'page_size': self.page_size})
+            if response.status_code != 200:
+                raise Exception(f'Error calling permissions API - {response.text}')
+            data = response.json()
+            for row in data['result']:
+                permissions.add((row['role'], row['resource'], row['zone'], row['operation']))
+            page += 1
+            if page >= data.get('num_of_pages', 1) or len(data['result']) < self.page_size:
+                break
+
+        self.permissions = frozenset(permissions)
+        self.refreshed_at = time.monotonic()
+        self.loaded_version = version
+        _logger.info(f'Loaded permission matrix with {len(permissions)} permissions')
+        return len(permissions)
+
+    async def refresh(self) -> int:
+        """Reload the matrix from the auth service and return the number of permissions loaded."""
+
+        return await self._refreshes.do('matrix', self._fetch)
+
+    async def refresh_all_workers(self) -> int:
+        """Reload the matrix in this worker and make the other workers reload it on their next lookup."""
+
+        count = await self.refresh()
+        self.loaded_version = await self.version.bump()
+        return count
+
+    async def _refresh_quietly(self) -> None:
+        try:
+            await self.refresh()
+        except Exception as e:
+            _logger.error(f'Unable to refresh permission matrix: {e}')
+
+    def _refresh_in_background(self) -> None:
+        if self._background_refresh is None or self._background_refresh.done():
+            self._background_refresh = asyncio.ensure_future(self._refresh_quietly())
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            await self._refresh_quietly()
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self) -> None:
+        self._task = asyncio.ensure_future(self._refresh_periodically())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'permissions': len(self.permissions),
+            'is_fresh': self.is_fresh,
+            'age': round(time.monotonic() - self.refreshed_at, 1) if self.refreshed_at is not None else None,
+            'version': self.loaded_version,
+        }
+
+
+permission_matrix = PermissionMatrix(
+    ConfigClass.AUTH_SERVICE + 'permissions',
+    ConfigClass.PERMISSION_MATRIX_REFRESH_INTERVAL,
+    ConfigClass.PERMISSION_MATRIX_MAX_AGE,
+    version_check_interval=ConfigClass.PERMISSION_MATRIX_VERSION_CHECK_INTERVAL,
+)
@@ -12,15 +12,23 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-import requests
+import asyncio
+from typing import Dict
+from typing import Iterable
+from typing import Tuple
+
 from fastapi import Request
 from common import LoggerFactory, ProjectClient
 from config import ConfigClass
+from resources.request_body import get_request_json
+from resources.upstream import upstream_clients
+
+from .matrix import permission_matrix
 
 _logger = LoggerFactory('permissions').get_logger()
 
 
-def has_permission(project_code, resource, zone, operation, current_identity):
+async def has_permission(project_code, resource, zone, operation, current_identity):
     if current_identity["role"] == "admin":
         role = "platform_admin"
     else:
@@ -34,6 +42,11 @@ def has_permission(project_code, resource, zone, operation, current_identity):
                 "Unable to get project role in permissions check, user might not belong to project")
             return False
 
+    allowed = await permission_matrix.lookup(role, resource, zone, operation)
+    if allowed is not None:
+        return allowed
+
+    # matrix isn't loaded or is stale, ask the auth service directly
     try:
         payload = {
             "role": role,
@@ -41,7 +54,7 @@ def has_permission(project_code, resource, zone, operation, current_identity):
             "zone": zone,
             "operation": operation,
         }
-        response = requests.get(
+        response = await upstream_clients.get('auth').get(
             ConfigClass.AUTH_SERVICE + "authorize", params=payload)
         if response.status_code != 200:
             raise Exception(f"Error calling authorize API - {response.json()}")
@@ -55,6 +68,26 @@ def has_permission(project_code, resource, zone, operation, current_identity):
         raise Exception(f"Error calling authorize API - {error_msg}")
 
 
+async def has_permissions_batch(
+    resource: str,
+    checks: Iterable[Tuple[str, str, str]],
+    current_identity: dict,
+) -> Dict[Tuple[str, str, str], bool]:
+    """Evaluate (project_code, zone, operation) checks on one resource, every unique check only once.
+
+    Unique checks run concurrently. Returns result of every check keyed by its tuple so it can be mapped back to the
+    entities it was built from.
+    """
+    unique_checks = list(dict.fromkeys(checks))
+    results = await asyncio.gather(
+        *[
+            has_permission(project_code, resource, zone, operation, current_identity)
+            for project_code, zone, operation in unique_checks
+        ]
+    )
+    return dict(zip(unique_checks, results))
+
+
 def get_project_role(project_code, current_identity):
     role = None
     if current_identity["role"] == "admin":
@@ -71,12 +104,12 @@ def get_project_role(project_code, current_identity):
 # NEED REDESIGN THIS FUNCTION
 async def get_project_code_from_request(request: Request):
     if request.method == "POST":
-        data = await request.json()
+        data = await get_request_json(request)
     elif request.method == "DELETE":
         data = request.query_params
         if not data:
             try:
-                data = await request.json()
+                data = await get_request_json(request)
             except Exception:
                 pass
     else:
@@ -16,14 +16,14 @@
 from typing import Any
 from typing import Dict
 from typing import Mapping
+from typing import Optional
 
 from common import LoggerFactory
-from fastapi import Depends
 from httpx import AsyncClient
 from httpx import Response
 
-from config import Settings
-from config import get_settings
+from config import ConfigClass
+from resources.upstream import upstream_clients
 
 logger = LoggerFactory('search_client').get_logger()
 
@@ -33,11 +33,19 @@ class SearchServiceException(Exception):
 
 
 class SearchServiceClient:
-    """Client for search service."""
+    """Client for search service.
 
-    def __init__(self, endpoint: str) -> None:
+    Unless a client is given, requests go through the shared pooled client of the search upstream, which is opened at
+    startup and closed at shutdown together with the other upstream clients.
+    """
+
+    def __init__(self, endpoint: str, client: Optional[AsyncClient] = None) -> None:
         self.endpoint_v1 = f'{endpoint}/v1'
-        self.client = AsyncClient(timeout=30)
+        self._client = client
+
+    @property
+    def client(self) -> AsyncClient:
+        return self._client or upstream_clients.get('search')
 
     async def _get(self, url: str, params: Mapping[str, Any]) -> Response:
         logger.info(f'Calling search service {url} with query params: {params}')
@@ -93,7 +101,10 @@ class SearchServiceClient:
         return response.json()
 
 
-def get_search_service_client(settings: Settings = Depends(get_settings)) -> SearchServiceClient:
+search_service_client = SearchServiceClient(ConfigClass.SEARCH_SERVICE)
+
+
+def get_search_service_client() -> SearchServiceClient:
     """Get search service client as a FastAPI dependency."""
 
-    return SearchServiceClient(settings.SEARCH_SERVICE)
+    return search_service_client
@@ -12,8 +12,20 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import re
 from uuid import uuid4
+
+import httpx
+import pytest
 from config import ConfigClass
+from resources.pagination import encode_cursor
+
+
+@pytest.fixture
+def assert_all_responses_were_requested() -> bool:
+    # upstream responses are registered per endpoint, not every test reaches all of them
+    return False
+
 
 MOCK_FILE_DATA = {
     "archived": False,
@@ -46,19 +58,23 @@ MOCK_FILE_DATA = {
 }
 
 
-def test_list_meta_admin_200(test_client, requests_mocker, jwt_token_admin, has_permission_true):
+def test_list_meta_admin_200(test_client, httpx_mock, jwt_token_admin, has_permission_true):
     mock_data = {
         "result": [
             MOCK_FILE_DATA
         ]
     }
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + "items/search", json=mock_data)
+    httpx_mock.add_response(
+        method='GET',
+        url=re.compile(ConfigClass.METADATA_SERVICE + 'items/search.*'),
+        json=mock_data,
+    )
 
     mock_data = {
         "result": MOCK_FILE_DATA
     }
     file_id = MOCK_FILE_DATA["parent"]
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + f"item/{file_id}", json=mock_data)
+    httpx_mock.add_response(method='GET', url=ConfigClass.METADATA_SERVICE + f"item/{file_id}", json=mock_data)
 
     payload = {
         "zone": "greenroom",
@@ -71,19 +87,23 @@ def test_list_meta_admin_200(test_client, requests_mocker, jwt_token_admin, has_
     assert response.status_code == 200
 
 
-def test_list_meta_contrib_200(test_client, requests_mocker, jwt_token_contrib, has_permission_true):
+def test_list_meta_contrib_200(test_client, httpx_mock, jwt_token_contrib, has_permission_true):
     mock_data = {
         "result": [
             MOCK_FILE_DATA
         ]
     }
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + "items/search", json=mock_data)
+    httpx_mock.add_response(
+        method='GET',
+        url=re.compile(ConfigClass.METADATA_SERVICE + 'items/search.*'),
+        json=mock_data,
+    )
 
     mock_data = {
         "result": MOCK_FILE_DATA
     }
     file_id = MOCK_FILE_DATA["parent"]
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + f"item/{file_id}", json=mock_data)
+    httpx_mock.add_response(method='GET', url=ConfigClass.METADATA_SERVICE + f"item/{file_id}", json=mock_data)
 
     payload = {
         "zone": "core",
@@ -96,19 +116,23 @@ def test_list_meta_contrib_200(test_client, requests_mocker, jwt_token_contrib,
     assert response.status_code == 200
 
 
-def test_list_meta_wrong_project_403(test_client, requests_mocker, jwt_token_contrib, has_permission_false):
+def test_list_meta_wrong_project_403(test_client, httpx_mock, jwt_token_contrib, has_permission_false):
     mock_data = {
         "result": [
             MOCK_FILE_DATA
         ]
     }
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + "items/search", json=mock_data)
+    httpx_mock.add_response(
+        method='GET',
+        url=re.compile(ConfigClass.METADATA_SERVICE + 'items/search.*'),
+        json=mock_data,
+    )
 
     mock_data = {
         "result": MOCK_FILE_DATA
     }
     file_id = MOCK_FILE_DATA["parent"]
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + f"item/{file_id}", json=mock_data)
+    httpx_mock.add_response(method='GET', url=ConfigClass.METADATA_SERVICE + f"item/{file_id}", json=mock_data)
 
     payload = {
         "zone": "greenroom",
@@ -121,7 +145,7 @@ def test_list_meta_wrong_project_403(test_client, requests_mocker, jwt_token_con
     assert response.status_code == 403
 
 
-def test_list_meta_contrib_permissions_403(test_client, requests_mocker, jwt_token_contrib, has_permission_true):
+def test_list_meta_contrib_permissions_403(test_client, httpx_mock, jwt_token_contrib, has_permission_true):
     file_data = MOCK_FILE_DATA.copy()
     file_data["parent_path"] = "admin"
     mock_data = {
@@ -129,13 +153,17 @@ def test_list_meta_contrib_permissions_403(test_client, requests_mocker, jwt_tok
            file_data
         ]
     }
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + "items/search", json=mock_data)
+    httpx_mock.add_response(
+        method='GET',
+        url=re.compile(ConfigClass.METADATA_SERVICE + 'items/search.*'),
+        json=mock_data,
+    )
 
     mock_data = {
         "result": file_data
     }
     file_id = MOCK_FILE_DATA["parent"]
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + f"item/{file_id}", json=mock_data)
+    httpx_mock.add_response(method='GET', url=ConfigClass.METADATA_SERVICE + f"item/{file_id}", json=mock_data)
 
     payload = {
         "zone": "greenroom",
@@ -148,19 +176,23 @@ def test_list_meta_contrib_permissions_403(test_client, requests_mocker, jwt_tok
     assert response.status_code == 403
 
 
-def test_list_meta_bad_zone_400(test_client, requests_mocker, jwt_token_admin, has_permission_true):
+def test_list_meta_bad_zone_400(test_client, httpx_mock, jwt_token_admin, has_permission_true):
     mock_data = {
         "result": [
             MOCK_FILE_DATA
         ]
     }
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + "items/search", json=mock_data)
+    httpx_mock.add_response(
+        method='GET',
+        url=re.compile(ConfigClass.METADATA_SERVICE + 'items/search.*'),
+        json=mock_data,
+    )
 
     mock_data = {
         "result": MOCK_FILE_DATA
     }
     file_id = MOCK_FILE_DATA["parent"]
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + f"item/{file_id}", json=mock_data)
+    httpx_mock.add_response(method='GET', url=ConfigClass.METADATA_SERVICE + f"item/{file_id}", json=mock_data)
 
     payload = {
         "zone": "bad",
@@ -173,19 +205,23 @@ def test_list_meta_bad_zone_400(test_client, requests_mocker, jwt_token_admin, h
     assert response.status_code == 400
 
 
-def test_list_meta_bad_source_type_400(test_client, requests_mocker, jwt_token_admin, has_permission_true):
+def test_list_meta_bad_source_type_400(test_client, httpx_mock, jwt_token_admin, has_permission_true):
     mock_data = {
         "result": [
             MOCK_FILE_DATA
         ]
     }
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + "items/search", json=mock_data)
+    httpx_mock.add_response(
+        method='GET',
+        url=re.compile(ConfigClass.METADATA_SERVICE + 'items/search.*'),
+        json=mock_data,
+    )
 
     mock_data = {
         "result": MOCK_FILE_DATA
     }
     file_id = MOCK_FILE_DATA["parent"]
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + f"item/{file_id}", json=mock_data)
+    httpx_mock.add_response(method='GET', url=ConfigClass.METADATA_SERVICE + f"item/{file_id}", json=mock_data)
 
     payload = {
         "zone": "greenroom",
@@ -198,19 +234,23 @@ def test_list_meta_bad_source_type_400(test_client, requests_mocker, jwt_token_a
     assert response.status_code == 400
 
 
-def test_list_meta_filter_200(test_client, requests_mocker, jwt_token_admin, has_permission_true):
+def test_list_meta_filter_200(test_client, httpx_mock, jwt_token_admin, has_permission_true):
     mock_data = {
         "result": [
             MOCK_FILE_DATA
         ]
     }
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + "items/search", json=mock_data)
+    httpx_mock.add_response(
+        method='GET',
+        url=re.compile(ConfigClass.METADATA_SERVICE + 'items/search.*'),
+        json=mock_data,
+    )
 
     mock_data = {
         "result": MOCK_FILE_DATA
     }
     file_id = MOCK_FILE_DATA["parent"]
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + f"item/{file_id}", json=mock_data)
+    httpx_mock.add_response(method='GET', url=ConfigClass.METADATA_SERVICE + f"item/{file_id}", json=mock_data)
 
     payload = {
         "zone": "greenroom",
@@ -225,19 +265,23 @@ def test_list_meta_filter_200(test_client, requests_mocker, jwt_token_admin, has
     assert response.status_code == 200
 
 
-def test_list_meta_trash_200(test_client, requests_mocker, jwt_token_admin, has_permission_true):
+def test_list_meta_trash_200(test_client, httpx_mock, jwt_token_admin, has_permission_true):
     mock_data = {
         "result": [
             MOCK_FILE_DATA
         ]
     }
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + "items/search", json=mock_data)
+    httpx_mock.add_response(
+        method='GET',
+        url=re.compile(ConfigClass.METADATA_SERVICE + 'items/search.*'),
+        json=mock_data,
+    )
 
     mock_data = {
         "result": MOCK_FILE_DATA
     }
     file_id = MOCK_FILE_DATA["parent"]
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + f"item/{file_id}", json=mock_data)
+    httpx_mock.add_response(method='GET', url=ConfigClass.METADATA_SERVICE + f"item/{file_id}", json=mock_data)
 
     payload = {
         "zone": "greenroom",
@@ -250,13 +294,240 @@ def test_list_meta_trash_200(test_client, requests_mocker, jwt_token_admin, has_
     assert response.status_code == 200
 
 
-def test_file_detail_bulk_200(test_client, requests_mocker, jwt_token_admin, has_permission_true):
+def test_list_meta_project_all_zones_omits_empty_params(test_client, httpx_mock, jwt_token_admin, has_permission_true):
+    httpx_mock.add_response(
+        method='GET',
+        url=re.compile(ConfigClass.METADATA_SERVICE + 'items/search.*'),
+        json={"result": [MOCK_FILE_DATA]},
+    )
+
+    payload = {
+        "zone": "all",
+        "source_type": "project",
+        "project_code": "test_project",
+    }
+    headers = {"Authorization": jwt_token_admin}
+    response = test_client.get("v1/files/meta", params=payload, headers=headers)
+
+    assert response.status_code == 200
+    request = httpx_mock.get_request(url=re.compile(ConfigClass.METADATA_SERVICE + 'items/search.*'))
+    assert request.url.query == (
+        b'page=0&page_size=25&order=desc&sorting=created_time&container_code=test_project&recursive=False&archived=False'
+    )
+
+
+def mock_folder_items(count):
+    return [
+        {
+            "id": str(uuid4()),
+            "name": f"file_{i}",
+            "container_code": "test_project",
+            "created_time": f"2021-05-10 19:43:{i // 2:02d}",
+            "parent_path": "test",
+            "type": "file",
+            "zone": 1,
+        }
+        for i in range(count)
+    ]
+
+
+def test_list_meta_cursor_skips_items_shifted_by_inserts(test_client, httpx_mock, jwt_token_admin, has_permission_true):
+    items = mock_folder_items(7)
+
+    def items_search(request: httpx.Request):
+        page = int(request.url.params["page"])
+        page_size = int(request.url.params["page_size"])
+        rows = sorted(items, key=lambda item: item["created_time"])
+        return httpx.Response(status_code=200, json={
+            "result": rows[page * page_size:(page + 1) * page_size], "total": len(rows)
+        })
+
+    httpx_mock.add_callback(items_search, method="GET", url=re.compile(ConfigClass.METADATA_SERVICE + "items/search.*"))
+
+    params = {
+        "zone": "core",
+        "source_type": "folder",
+        "parent_path": "test",
+        "project_code": "test_project",
+        "order_by": "created_time",
+        "order_type": "asc",
+        "page_size": 3,
+        "pagination": "cursor",
+    }
+    headers = {"Authorization": jwt_token_admin}
+    names = []
+    while True:
+        response = test_client.get("v1/files/meta", params=params, headers=headers)
+        assert response.status_code == 200
+        names += [item["name"] for item in response.json()["result"]]
+        if not response.json()["next_cursor"]:
+            break
+        params["cursor"] = response.json()["next_cursor"]
+        # files added at the start of the listing shift everything towards the next page
+        items += [dict(items[0], id=str(uuid4()), name=f"new_{len(names)}", created_time="2021-01-01 00:00:00")]
+
+    # files created at the same time are listed by id
+    assert len(names) == 7
+    assert sorted(names) == [f"file_{i}" for i in range(7)]
+
+
+def test_list_meta_cursor_does_not_skip_items_shifted_by_deletes(
+    test_client, httpx_mock, jwt_token_admin, has_permission_true
+):
+    items = mock_folder_items(12)
+    for index, item in enumerate(items):
+        item["created_time"] = f"2021-05-10 19:43:{index:02d}"
+
+    def items_search(request: httpx.Request):
+        page = int(request.url.params["page"])
+        page_size = int(request.url.params["page_size"])
+        return httpx.Response(status_code=200, json={"result": items[page * page_size:(page + 1) * page_size]})
+
+    httpx_mock.add_callback(items_search, method="GET", url=re.compile(ConfigClass.METADATA_SERVICE + "items/search.*"))
+
+    params = {
+        "zone": "core",
+        "source_type": "folder",
+        "parent_path": "test",
+        "project_code": "test_project",
+        "order_by": "created_time",
+        "order_type": "asc",
+        "page_size": 3,
+        "pagination": "cursor",
+    }
+    headers = {"Authorization": jwt_token_admin}
+    names = []
+    while True:
+        response = test_client.get("v1/files/meta", params=params, headers=headers)
+        assert response.status_code == 200
+        names += [item["name"] for item in response.json()["result"]]
+        if not response.json()["next_cursor"]:
+            break
+        params["cursor"] = response.json()["next_cursor"]
+        # files returned before are deleted, which moves the following ones back by a page
+        del items[:3]
+
+    assert names == [f"file_{i}" for i in range(12)]
+
+
+def test_list_meta_cursor_passes_through_upstream_cursor(
+    test_client, httpx_mock, jwt_token_admin, has_permission_true
+):
+    httpx_mock.add_response(
+        method="GET",
+        url=re.compile(ConfigClass.METADATA_SERVICE + "items/search.*"),
+        json={"result": mock_folder_items(2), "next_cursor": "upstream-token"},
+    )
+    params = {
+        "zone": "core",
+        "source_type": "folder",
+        "parent_path": "test",
+        "project_code": "test_project",
+        "page_size": 2,
+        "pagination": "cursor",
+    }
+    headers = {"Authorization": jwt_token_admin}
+    response = test_client.get("v1/files/meta", params=params, headers=headers)
+    assert response.status_code == 200
+
+    params["cursor"] = response.json()["next_cursor"]
+    response = test_client.get("v1/files/meta", params=params, headers=headers)
+    assert response.status_code == 200
+    assert httpx_mock.get_requests()[-1].url.params["cursor"] == "upstream-token"
+    assert "page" not in httpx_mock.get_requests()[-1].url.params
+
+
+def test_list_meta_cursor_from_other_sorting_400(test_client, jwt_token_admin, has_permission_true):
+    cursor = encode_cursor({"sorting": "name", "order": "asc", "value": "file_1", "id": str(uuid4()), "offset": 3})
+    params = {
+        "zone": "core",
+        "source_type": "folder",
+        "parent_path": "test",
+        "project_code": "test_project",
+        "order_by": "created_time",
+        "order_type": "asc",
+        "cursor": cursor,
+    }
+    headers = {"Authorization": jwt_token_admin}
+    response = test_client.get("v1/files/meta", params=params, headers=headers)
+    assert response.status_code == 400
+
+
+def test_list_meta_invalid_cursor_400(test_client, jwt_token_admin, has_permission_true):
+    params = {
+        "zone": "core",
+        "source_type": "folder",
+        "parent_path": "test",
+        "project_code": "test_project",
+        "cursor": "not-a-cursor",
+    }
+    headers = {"Authorization": jwt_token_admin}
+    response = test_client.get("v1/files/meta", params=params, headers=headers)
+    assert response.status_code == 400
+
+
+def test_list_meta_fields_projection(test_client, httpx_mock, jwt_token_admin, has_permission_true):
+    item = dict(mock_folder_items(1)[0], extended={"extra": {"tags": ["a"], "attributes": {"x": 1}}})
+    httpx_mock.add_response(
+        method="GET",
+        url=re.compile(ConfigClass.METADATA_SERVICE + "items/search.*"),
+        json={"result": [item], "total": 1},
+    )
+    params = {
+        "zone": "core",
+        "source_type": "folder",
+        "parent_path": "test",
+        "project_code": "test_project",
+        "fields": "name,extended.extra.tags,missing",
+    }
+    headers = {"Authorization": jwt_token_admin}
+    response = test_client.get("v1/files/meta", params=params, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["result"] == [
+        {"id": item["id"], "name": item["name"], "extended": {"extra": {"tags": ["a"]}}}
+    ]
+    upstream = httpx_mock.get_requests()[-1].url.params["fields"].split(",")
+    assert set(upstream) == {"id", "name", "extended.extra.tags", "missing", "zone", "created_time"}
+
+
+def test_list_meta_invalid_field_400(test_client, jwt_token_admin, has_permission_true):
+    params = {
+        "zone": "core",
+        "source_type": "folder",
+        "parent_path": "test",
+        "project_code": "test_project",
+        "fields": "name,extended..tags",
+    }
+    headers = {"Authorization": jwt_token_admin}
+    response = test_client.get("v1/files/meta", params=params, headers=headers)
+    assert response.status_code == 400
+
+
+def test_file_detail_bulk_fields_projection(test_client, httpx_mock, jwt_token_admin, has_permission_true):
+    httpx_mock.add_response(
+        method='GET',
+        url=re.compile(ConfigClass.METADATA_SERVICE + 'items/batch.*'),
+        json={"result": [dict(MOCK_FILE_DATA)]},
+    )
+    headers = {"Authorization": jwt_token_admin}
+    response = test_client.post(
+        "v1/files/bulk/detail", params={"fields": "name,zone"}, json={"ids": [MOCK_FILE_DATA["id"]]}, headers=headers
+    )
+    assert response.status_code == 200
+    assert response.json()["result"] == [{"id": MOCK_FILE_DATA["id"], "name": MOCK_FILE_DATA["name"], "zone": "core"}]
+
+
+def test_file_detail_bulk_200(test_client, httpx_mock, jwt_token_admin, has_permission_true):
     mock_data = {
         "result": [
             MOCK_FILE_DATA
         ]
     }
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + "items/batch", json=mock_data)
+    httpx_mock.add_response(
+        method='GET',
+        url=re.compile(ConfigClass.METADATA_SERVICE + 'items/batch.*'),
+        json=mock_data,
+    )
 
     payload = {
         "ids": [MOCK_FILE_DATA["id"]]
@@ -266,13 +537,30 @@ def test_file_detail_bulk_200(test_client, requests_mocker, jwt_token_admin, has
     assert response.status_code == 200
 
 
-def test_file_detail_bulk_permissions_403(test_client, requests_mocker, jwt_token_contrib, has_permission_false):
+def test_file_detail_bulk_relabels_zones(test_client, httpx_mock, jwt_token_admin, has_permission_true):
+    items = [dict(MOCK_FILE_DATA, id=str(uuid4()), zone=zone) for zone in (0, 1)]
+    httpx_mock.add_response(
+        method='GET',
+        url=re.compile(ConfigClass.METADATA_SERVICE + 'items/batch.*'),
+        json={"result": items},
+    )
+    headers = {"Authorization": jwt_token_admin}
+    response = test_client.post("v1/files/bulk/detail", json={"ids": [item["id"] for item in items]}, headers=headers)
+    assert response.status_code == 200
+    assert [item["zone"] for item in response.json()["result"]] == ["greenroom", "core"]
+
+
+def test_file_detail_bulk_permissions_403(test_client, httpx_mock, jwt_token_contrib, has_permission_false):
     mock_data = {
         "result": [
             MOCK_FILE_DATA
         ]
     }
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + "items/batch", json=mock_data)
+    httpx_mock.add_response(
+        method='GET',
+        url=re.compile(ConfigClass.METADATA_SERVICE + 'items/batch.*'),
+        json=mock_data,
+    )
 
     payload = {
         "ids": [MOCK_FILE_DATA["id"]]
@@ -112,7 +112,7 @@ async def test_put_request_complete_200(
 
     httpx_mock.add_response(
         method="GET",
-        url=ConfigClass.AUTH_SERVICE + f"admin/user?user_id={user_id}&exact=true",
+        url=ConfigClass.AUTH_SERVICE + f"admin/user?user_id={user_id}&exact=True",
         json={'result': USER},
         status_code=200
     )
@@ -148,7 +148,7 @@ async def test_put_request_complete_500(
 
     httpx_mock.add_response(
         method="GET",
-        url=ConfigClass.AUTH_SERVICE + f"admin/user?user_id={user_id}&exact=true",
+        url=ConfigClass.AUTH_SERVICE + f"admin/user?user_id={user_id}&exact=True",
         json={'result': USER},
         status_code=500
     )
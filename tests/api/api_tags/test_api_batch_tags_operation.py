@@ -12,11 +12,28 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import asyncio
+import json
 import re
+import time
 from uuid import uuid4
 
+import aioredis
+import httpx
+import pytest
+
+from api.api_tags.utils import collapse_subtrees
+from api.api_tags.utils import job_heartbeat
+from api.api_tags.utils import tag_jobs
 from config import ConfigClass
 
+
+@pytest.fixture
+def assert_all_responses_were_requested() -> bool:
+    # upstream responses are registered per endpoint, not every test reaches all of them
+    return False
+
+
 MOCK_FILE_DATA = {
     "archived": False,
     "container_code": "test_project",
@@ -48,24 +65,32 @@ MOCK_FILE_DATA = {
 }
 
 
-def test_update_tags_200(test_client, requests_mocker, jwt_token_admin, has_permission_true):
+def test_update_tags_200(test_client, httpx_mock, jwt_token_admin, has_permission_true):
     mock_data = {
         "result": [
             MOCK_FILE_DATA
         ]
     }
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + "items/search", json=mock_data)
+    httpx_mock.add_response(
+        method='GET',
+        url=re.compile(ConfigClass.METADATA_SERVICE + 'items/search.*'),
+        json=mock_data,
+    )
 
     mock_data = {
         "result": [MOCK_FILE_DATA]
     }
     matcher = re.compile(ConfigClass.METADATA_SERVICE + 'items/batch.*')
-    requests_mocker.get(matcher, json=mock_data)
+    httpx_mock.add_response(method='GET', url=matcher, json=mock_data)
 
     mock_data = {
         "result": [MOCK_FILE_DATA]
     }
-    requests_mocker.put(ConfigClass.METADATA_SERVICE + 'items/batch', json=mock_data)
+    httpx_mock.add_response(
+        method='PUT',
+        url=re.compile(ConfigClass.METADATA_SERVICE + 'items/batch.*'),
+        json=mock_data,
+    )
 
     payload = {
         "entity": [
@@ -84,24 +109,32 @@ def test_update_tags_200(test_client, requests_mocker, jwt_token_admin, has_perm
     assert response.status_code == 200
 
 
-def test_update_tags_inherit_200(test_client, requests_mocker, jwt_token_admin, has_permission_true):
+def test_update_tags_inherit_200(test_client, httpx_mock, jwt_token_admin, has_permission_true):
     mock_data = {
         "result": [
             MOCK_FILE_DATA
         ]
     }
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + "items/search", json=mock_data)
+    httpx_mock.add_response(
+        method='GET',
+        url=re.compile(ConfigClass.METADATA_SERVICE + 'items/search.*'),
+        json=mock_data,
+    )
 
     mock_data = {
         "result": [MOCK_FILE_DATA]
     }
     matcher = re.compile(ConfigClass.METADATA_SERVICE + 'items/batch.*')
-    requests_mocker.get(matcher, json=mock_data)
+    httpx_mock.add_response(method='GET', url=matcher, json=mock_data)
 
     mock_data = {
         "result": [MOCK_FILE_DATA]
     }
-    requests_mocker.put(ConfigClass.METADATA_SERVICE + 'items/batch', json=mock_data)
+    httpx_mock.add_response(
+        method='PUT',
+        url=re.compile(ConfigClass.METADATA_SERVICE + 'items/batch.*'),
+        json=mock_data,
+    )
 
     payload = {
         "entity": [
@@ -120,7 +153,7 @@ def test_update_tags_inherit_200(test_client, requests_mocker, jwt_token_admin,
     assert response.status_code == 200
 
 
-def test_update_tags_only_files_200(test_client, requests_mocker, jwt_token_admin, has_permission_true):
+def test_update_tags_only_files_200(test_client, httpx_mock, jwt_token_admin, has_permission_true):
     mock_folder = MOCK_FILE_DATA.copy()
     mock_folder["type"] = "folder"
     mock_data = {
@@ -128,18 +161,26 @@ def test_update_tags_only_files_200(test_client, requests_mocker, jwt_token_admi
             mock_folder
         ]
     }
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + "items/search", json=mock_data)
+    httpx_mock.add_response(
+        method='GET',
+        url=re.compile(ConfigClass.METADATA_SERVICE + 'items/search.*'),
+        json=mock_data,
+    )
 
     mock_data = {
         "result": [mock_folder]
     }
     matcher = re.compile(ConfigClass.METADATA_SERVICE + 'items/batch.*')
-    requests_mocker.get(matcher, json=mock_data)
+    httpx_mock.add_response(method='GET', url=matcher, json=mock_data)
 
     mock_data = {
         "result": [mock_folder]
     }
-    requests_mocker.put(ConfigClass.METADATA_SERVICE + 'items/batch', json=mock_data)
+    httpx_mock.add_response(
+        method='PUT',
+        url=re.compile(ConfigClass.METADATA_SERVICE + 'items/batch.*'),
+        json=mock_data,
+    )
 
     payload = {
         "entity": [
@@ -158,24 +199,32 @@ def test_update_tags_only_files_200(test_client, requests_mocker, jwt_token_admi
     assert response.status_code == 200
 
 
-def test_update_tags_remove_200(test_client, requests_mocker, jwt_token_admin, has_permission_true):
+def test_update_tags_remove_200(test_client, httpx_mock, jwt_token_admin, has_permission_true):
     mock_data = {
         "result": [
             MOCK_FILE_DATA
         ]
     }
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + "items/search", json=mock_data)
+    httpx_mock.add_response(
+        method='GET',
+        url=re.compile(ConfigClass.METADATA_SERVICE + 'items/search.*'),
+        json=mock_data,
+    )
 
     mock_data = {
         "result": [MOCK_FILE_DATA]
     }
     matcher = re.compile(ConfigClass.METADATA_SERVICE + 'items/batch.*')
-    requests_mocker.get(matcher, json=mock_data)
+    httpx_mock.add_response(method='GET', url=matcher, json=mock_data)
 
     mock_data = {
         "result": [MOCK_FILE_DATA]
     }
-    requests_mocker.put(ConfigClass.METADATA_SERVICE + 'items/batch', json=mock_data)
+    httpx_mock.add_response(
+        method='PUT',
+        url=re.compile(ConfigClass.METADATA_SERVICE + 'items/batch.*'),
+        json=mock_data,
+    )
 
     payload = {
         "entity": [
@@ -192,3 +241,190 @@ def test_update_tags_remove_200(test_client, requests_mocker, jwt_token_admin, h
     headers = {"Authorization": jwt_token_admin}
     response = test_client.post("/v2/entity/tags", json=payload, headers=headers)
     assert response.status_code == 200
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def setex(self, key, ttl, value):
+        self.data[key] = value
+
+
+class UnreachableRedis:
+    async def get(self, key):
+        raise aioredis.exceptions.ConnectionError('unreachable')
+
+
+@pytest.fixture
+def fake_job_store(monkeypatch):
+    monkeypatch.setattr(tag_jobs, '_redis', FakeRedis())
+
+
+def mock_entity(name: str, parent_path: str, entity_type: str = "file") -> dict:
+    return {
+        **MOCK_FILE_DATA,
+        "id": str(uuid4()),
+        "name": name,
+        "parent_path": parent_path,
+        "type": entity_type,
+        "extended": {"extra": {"tags": ["old"], "system_tags": [], "attributes": {}}},
+    }
+
+
+def test_collapse_subtrees_drops_entities_below_selected_folders():
+    folder = mock_entity("folder", "test", "folder")
+    sub_folder = mock_entity("sub", "test.folder", "folder")
+    nested_file = mock_entity("file.txt", "test.folder.sub")
+    other_file = mock_entity("file.txt", "test.other")
+
+    assert collapse_subtrees([sub_folder, folder, nested_file, other_file]) == [folder, other_file]
+
+
+def test_update_tags_inherit_background_job_202(test_client, httpx_mock, jwt_token_admin, has_permission_true,
+                                                fake_job_store):
+    folder = mock_entity("folder", "test", "folder")
+    sub_folder = mock_entity("sub", "test.folder", "folder")
+    children = [sub_folder] + [mock_entity(f"file_{index}.txt", "test.folder.sub") for index in range(250)]
+    page_size = ConfigClass.METADATA_SEARCH_PAGE_SIZE
+
+    def items_search(request: httpx.Request):
+        assert request.url.params["parent_path"] == "test.folder"
+        page = int(request.url.params["page"])
+        return httpx.Response(200, json={"result": children[page * page_size:(page + 1) * page_size]})
+
+    httpx_mock.add_response(
+        method="GET",
+        url=re.compile(ConfigClass.METADATA_SERVICE + "items/batch.*"),
+        json={"result": [folder, sub_folder]},
+    )
+    httpx_mock.add_callback(items_search, method="GET", url=re.compile(ConfigClass.METADATA_SERVICE + "items/search.*"))
+    httpx_mock.add_response(
+        method="PUT", url=re.compile(ConfigClass.METADATA_SERVICE + "items/batch.*"), json={"result": []}
+    )
+
+    payload = {
+        "entity": [folder["id"], sub_folder["id"]],
+        "tags": ["new"],
+        "operation": "add",
+        "inherit": True,
+        "only_files": True,
+        "background": True,
+    }
+    response = test_client.post("/v2/entity/tags", json=payload)
+    assert response.status_code == 202
+    job_id = response.json()["result"]["job_id"]
+
+    response = test_client.get(f"/v2/entity/tags/jobs/{job_id}")
+    assert response.status_code == 200
+    job = response.json()["result"]
+    assert job["status"] == "succeeded"
+    assert job["processed"] == 252
+    assert job["updated"] == 250
+    updates = [request for request in httpx_mock.get_requests() if request.method == "PUT"]
+    assert len(updates) == 3
+    # descendants are read once to check permissions and once to update them
+    assert len([request for request in httpx_mock.get_requests() if "items/search" in request.url.path]) == 2
+
+
+def test_update_tags_inherit_background_job_checks_permissions_before_updates(
+    test_client, httpx_mock, mocker, jwt_token_admin, fake_job_store
+):
+    folder = mock_entity("folder", "test", "folder")
+    children = [mock_entity(f"file_{index}.txt", "test.folder") for index in range(ConfigClass.TAG_JOB_CHUNK_SIZE + 1)]
+    # access was revoked between accepting the job and running it
+    mocker.patch("api.api_tags.utils.has_permission", side_effect=[True, False])
+    httpx_mock.add_response(
+        method="GET", url=re.compile(ConfigClass.METADATA_SERVICE + "items/batch.*"), json={"result": [folder]}
+    )
+    httpx_mock.add_response(
+        method="GET", url=re.compile(ConfigClass.METADATA_SERVICE + "items/search.*"), json={"result": children}
+    )
+
+    payload = {"entity": [folder["id"]], "tags": ["new"], "operation": "add", "inherit": True, "background": True}
+    response = test_client.post("/v2/entity/tags", json=payload)
+    assert response.status_code == 202
+    job_id = response.json()["result"]["job_id"]
+
+    job = test_client.get(f"/v2/entity/tags/jobs/{job_id}").json()["result"]
+    assert job["status"] == "failed"
+    assert job["updated"] == 0
+    assert not [request for request in httpx_mock.get_requests() if request.method == "PUT"]
+
+
+def test_update_tags_inherit_updates_nested_selection_once(test_client, httpx_mock, jwt_token_admin,
+                                                           has_permission_true):
+    folder = mock_entity("folder", "test", "folder")
+    sub_folder = mock_entity("sub", "test.folder", "folder")
+    files = [mock_entity(f"file_{index}.txt", "test.folder.sub") for index in range(2)]
+    httpx_mock.add_response(
+        method="GET",
+        url=re.compile(ConfigClass.METADATA_SERVICE + "items/batch.*"),
+        json={"result": [folder, sub_folder]},
+    )
+    httpx_mock.add_response(
+        method="GET",
+        url=re.compile(ConfigClass.METADATA_SERVICE + "items/search.*"),
+        json={"result": [sub_folder] + files},
+    )
+    httpx_mock.add_response(
+        method="PUT", url=re.compile(ConfigClass.METADATA_SERVICE + "items/batch.*"), json={"result": []}
+    )
+
+    payload = {"entity": [folder["id"], sub_folder["id"]], "tags": ["new"], "operation": "add", "inherit": True}
+    response = test_client.post("/v2/entity/tags", json=payload)
+
+    assert response.status_code == 200
+    update = next(request for request in httpx_mock.get_requests() if request.method == "PUT")
+    ids = update.url.params.get_list("ids")
+    assert sorted(ids) == sorted([folder["id"], sub_folder["id"]] + [file["id"] for file in files])
+
+
+@pytest.mark.asyncio
+async def test_get_tags_job_of_other_user_403(test_client, jwt_token_contrib, fake_job_store):
+    job = await tag_jobs.create(created_by="other", operation="add", processed=0, updated=0)
+
+    response = test_client.get(f"/v2/entity/tags/jobs/{job['job_id']}")
+    assert response.status_code == 403
+
+
+def test_get_unknown_tags_job_404(test_client, jwt_token_admin, fake_job_store):
+    response = test_client.get(f"/v2/entity/tags/jobs/{uuid4()}")
+    assert response.status_code == 404
+
+
+def test_get_tags_job_without_redis_500(test_client, jwt_token_admin, monkeypatch):
+    monkeypatch.setattr(tag_jobs, '_redis', UnreachableRedis())
+
+    response = test_client.get(f"/v2/entity/tags/jobs/{uuid4()}")
+
+    assert response.status_code == 500
+    assert response.json()["error_msg"] == "Unable to get tags job"
+
+
+@pytest.mark.asyncio
+async def test_get_stale_running_tags_job_reports_failure(test_client, jwt_token_admin, fake_job_store):
+    job = await tag_jobs.create(created_by="test", operation="add", processed=0, updated=0)
+    job.update(status="running", updated_at=int(time.time()) - ConfigClass.TAG_JOB_STALE_AFTER - 1)
+    tag_jobs._redis.data[tag_jobs.prefix + job["job_id"]] = json.dumps(job)
+
+    response = test_client.get(f"/v2/entity/tags/jobs/{job['job_id']}")
+
+    assert response.json()["result"]["status"] == "failed"
+    assert response.json()["result"]["error"] == "Job stopped without finishing"
+
+
+@pytest.mark.asyncio
+async def test_job_heartbeat_saves_running_job(mocker, fake_job_store):
+    mocker.patch.object(ConfigClass, 'TAG_JOB_HEARTBEAT_INTERVAL', 0.01)
+    job = await tag_jobs.create(created_by="test", operation="add", processed=0, updated=0)
+    job.update(status="running", updated_at=0)
+    tag_jobs._redis.data[tag_jobs.prefix + job["job_id"]] = json.dumps(job)
+
+    async with job_heartbeat(job):
+        await asyncio.sleep(0.05)
+
+    assert (await tag_jobs.get(job["job_id"]))["status"] == "running"
@@ -14,8 +14,17 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 from uuid import uuid4
 
+import pytest
+
 from config import ConfigClass
 
+
+@pytest.fixture
+def assert_all_responses_were_requested() -> bool:
+    # upstream responses are registered per endpoint, not every test reaches all of them
+    return False
+
+
 MOCK_FILE_DATA = {
     "archived": False,
     "container_code": "test_project",
@@ -47,17 +56,17 @@ MOCK_FILE_DATA = {
 }
 
 
-def test_update_tags_200(test_client, requests_mocker, jwt_token_admin, has_permission_true):
+def test_update_tags_200(test_client, httpx_mock, jwt_token_admin, has_permission_true):
     entity_id = MOCK_FILE_DATA["id"]
     mock_data = {
         "result": MOCK_FILE_DATA
     }
-    requests_mocker.put(ConfigClass.METADATA_SERVICE + "item?id=" + entity_id, json=mock_data)
+    httpx_mock.add_response(method='PUT', url=ConfigClass.METADATA_SERVICE + "item?id=" + entity_id, json=mock_data)
 
     mock_data = {
         "result": MOCK_FILE_DATA
     }
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + f"item/{entity_id}", json=mock_data)
+    httpx_mock.add_response(method='GET', url=ConfigClass.METADATA_SERVICE + f"item/{entity_id}", json=mock_data)
 
     payload = {
         "tags": [
@@ -69,17 +78,17 @@ def test_update_tags_200(test_client, requests_mocker, jwt_token_admin, has_perm
     assert response.status_code == 200
 
 
-def test_update_tags_bad_type_400(test_client, requests_mocker, jwt_token_admin, has_permission_true):
+def test_update_tags_bad_type_400(test_client, httpx_mock, jwt_token_admin, has_permission_true):
     entity_id = MOCK_FILE_DATA["id"]
     mock_data = {
         "result": MOCK_FILE_DATA
     }
-    requests_mocker.put(ConfigClass.METADATA_SERVICE + "item?id=" + entity_id, json=mock_data)
+    httpx_mock.add_response(method='PUT', url=ConfigClass.METADATA_SERVICE + "item?id=" + entity_id, json=mock_data)
 
     mock_data = {
         "result": MOCK_FILE_DATA
     }
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + f"item/{entity_id}", json=mock_data)
+    httpx_mock.add_response(method='GET', url=ConfigClass.METADATA_SERVICE + f"item/{entity_id}", json=mock_data)
 
     payload = {
         "tags": "tag3"
@@ -12,9 +12,21 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import json
+import re
 from uuid import uuid4
+
+import httpx
+import pytest
 from config import ConfigClass
 
+
+@pytest.fixture
+def assert_all_responses_were_requested() -> bool:
+    # upstream responses are registered per endpoint, not every test reaches all of them
+    return False
+
+
 MOCK_FILE_DATA = {
     'archived': False,
     'container_code': 'test_project',
@@ -97,16 +109,16 @@ MOCK_TEMPLATE_DATA = {
 }
 
 
-def test_list_templates_admin_200(test_client, requests_mocker, jwt_token_admin):
+def test_list_templates_admin_200(test_client, httpx_mock, jwt_token_admin):
     mock_data = {'result': {'has_permission': 'True'}}
-    requests_mocker.get(ConfigClass.AUTH_SERVICE + 'authorize', json=mock_data)
+    httpx_mock.add_response(method='GET', url=re.compile(ConfigClass.AUTH_SERVICE + 'authorize.*'), json=mock_data)
 
     mock_data = {
         'result': [
             MOCK_TEMPLATE_DATA
         ]
     }
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + 'template/', json=mock_data)
+    httpx_mock.add_response(method='GET', url=re.compile(ConfigClass.METADATA_SERVICE + 'template/.*'), json=mock_data)
 
     params = {'project_code': 'test_project'}
     headers = {'Authorization': ""}
@@ -114,54 +126,54 @@ def test_list_templates_admin_200(test_client, requests_mocker, jwt_token_admin)
     assert response.status_code == 200
 
 
-def test_create_new_templates_admin_200(test_client, requests_mocker, jwt_token_admin):
+def test_create_new_templates_admin_200(test_client, httpx_mock, jwt_token_admin):
     mock_data = {'result': {'has_permission': 'True'}}
-    requests_mocker.get(ConfigClass.AUTH_SERVICE + 'authorize', json=mock_data)
+    httpx_mock.add_response(method='GET', url=re.compile(ConfigClass.AUTH_SERVICE + 'authorize.*'), json=mock_data)
 
     mock_data = {
         'result': [
             MOCK_TEMPLATE_DATA
         ]
     }
-    requests_mocker.post(ConfigClass.METADATA_SERVICE + 'template/', json=mock_data)
+    httpx_mock.add_response(method='POST', url=re.compile(ConfigClass.METADATA_SERVICE + 'template/.*'), json=mock_data)
 
     headers = {'Authorization': jwt_token_admin}
     response = test_client.post('v1/data/manifests', json=MOCK_TEMPLATE_DATA, headers=headers)
     assert response.status_code == 200
 
 
-def test_get_template_by_id_admin_200(test_client, requests_mocker, jwt_token_admin):
+def test_get_template_by_id_admin_200(test_client, httpx_mock, jwt_token_admin):
     mock_data = {'result': {'has_permission': 'True'}}
-    requests_mocker.get(ConfigClass.AUTH_SERVICE + 'authorize', json=mock_data)
+    httpx_mock.add_response(method='GET', url=re.compile(ConfigClass.AUTH_SERVICE + 'authorize.*'), json=mock_data)
 
     mock_data = {
         'result':
             MOCK_TEMPLATE_DATA
 
     }
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + f'template/{template_id}/', json=mock_data)
+    httpx_mock.add_response(method='GET', url=ConfigClass.METADATA_SERVICE + f'template/{template_id}/', json=mock_data)
 
     headers = {'Authorization': jwt_token_admin}
     response = test_client.get(f'v1/data/manifest/{template_id}', headers=headers)
     assert response.status_code == 200
 
 
-def test_get_template_by_invalid_id_admin_404(test_client, requests_mocker, jwt_token_admin):
+def test_get_template_by_invalid_id_admin_404(test_client, httpx_mock, jwt_token_admin):
     invalid_id = '1234'
     mock_data = {'result': {'has_permission': 'True'}}
-    requests_mocker.get(ConfigClass.AUTH_SERVICE + 'authorize', json=mock_data)
+    httpx_mock.add_response(method='GET', url=re.compile(ConfigClass.AUTH_SERVICE + 'authorize.*'), json=mock_data)
 
     mock_data = {
         'result': {}
     }
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + f'template/{invalid_id}/', json=mock_data)
+    httpx_mock.add_response(method='GET', url=ConfigClass.METADATA_SERVICE + f'template/{invalid_id}/', json=mock_data)
 
     headers = {'Authorization': jwt_token_admin}
     response = test_client.get(f'v1/data/manifest/{invalid_id}', headers=headers)
     assert response.status_code == 404
 
 
-def test_update_template_attributes_admin_200(test_client, requests_mocker, jwt_token_admin,
+def test_update_template_attributes_admin_200(test_client, httpx_mock, jwt_token_admin,
                                               has_permission_true):
     MOCK_TEMPLATE_UPDATE = MOCK_TEMPLATE_DATA.copy()
     MOCK_TEMPLATE_UPDATE['attributes'][0]['name'] = 'attr2'
@@ -176,15 +188,23 @@ def test_update_template_attributes_admin_200(test_client, requests_mocker, jwt_
         ]
     }
 
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + f'template/{template_id}/', json=mock_data_1)
-    requests_mocker.put(ConfigClass.METADATA_SERVICE + 'template/', json=mock_data_2)
+    httpx_mock.add_response(
+        method='GET',
+        url=ConfigClass.METADATA_SERVICE + f'template/{template_id}/',
+        json=mock_data_1,
+    )
+    httpx_mock.add_response(
+        method='PUT',
+        url=re.compile(ConfigClass.METADATA_SERVICE + 'template/.*'),
+        json=mock_data_2,
+    )
 
     headers = {'Authorization': jwt_token_admin}
     response = test_client.put(f'v1/data/manifest/{template_id}', json=MOCK_TEMPLATE_UPDATE, headers=headers)
     assert response.status_code == 200
 
 
-def test_update_template_attributes_permission_denied_403(test_client, requests_mocker, jwt_token_contrib,
+def test_update_template_attributes_permission_denied_403(test_client, httpx_mock, jwt_token_contrib,
                                                           has_permission_false):
     MOCK_TEMPLATE_UPDATE = MOCK_TEMPLATE_DATA.copy()
     MOCK_TEMPLATE_UPDATE['attributes'][0]['name'] = 'attr2'
@@ -193,14 +213,14 @@ def test_update_template_attributes_permission_denied_403(test_client, requests_
             MOCK_TEMPLATE_UPDATE
         ]
     }
-    requests_mocker.put(ConfigClass.METADATA_SERVICE + 'template/', json=mock_data)
+    httpx_mock.add_response(method='PUT', url=re.compile(ConfigClass.METADATA_SERVICE + 'template/.*'), json=mock_data)
 
     headers = {'Authorization': jwt_token_contrib}
     response = test_client.put(f'v1/data/manifest/{template_id}', json=MOCK_TEMPLATE_UPDATE, headers=headers)
     assert response.status_code == 403
 
 
-def test_delete_template_by_id_admin_200(test_client, requests_mocker, jwt_token_admin, has_permission_true):
+def test_delete_template_by_id_admin_200(test_client, httpx_mock, jwt_token_admin, has_permission_true):
     mock_data_template = {
         'result': MOCK_TEMPLATE_DATA
     }
@@ -210,16 +230,28 @@ def test_delete_template_by_id_admin_200(test_client, requests_mocker, jwt_token
         ]
     }
 
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + f'template/{template_id}/', json=mock_data_template)
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + 'items/search/', json=mock_data)
-    requests_mocker.delete(ConfigClass.METADATA_SERVICE + f'template/?id={template_id}', json=mock_data)
+    httpx_mock.add_response(
+        method='GET',
+        url=ConfigClass.METADATA_SERVICE + f'template/{template_id}/',
+        json=mock_data_template,
+    )
+    httpx_mock.add_response(
+        method='GET',
+        url=re.compile(ConfigClass.METADATA_SERVICE + 'items/search/.*'),
+        json=mock_data,
+    )
+    httpx_mock.add_response(
+        method='DELETE',
+        url=ConfigClass.METADATA_SERVICE + f'template/?id={template_id}',
+        json=mock_data,
+    )
 
     headers = {'Authorization': jwt_token_admin}
     response = test_client.delete(f'v1/data/manifest/{template_id}', headers=headers)
     assert response.status_code == 200
 
 
-def test_delete_template_by_id_permission_denied_403(test_client, jwt_token_contrib, has_permission_false, requests_mocker):
+def test_delete_template_by_id_permission_denied_403(test_client, jwt_token_contrib, has_permission_false, httpx_mock):
 
     mock_data = {
         'result': MOCK_TEMPLATE_DATA
@@ -227,34 +259,34 @@ def test_delete_template_by_id_permission_denied_403(test_client, jwt_token_cont
     }
 
     headers = {'Authorization': jwt_token_contrib}
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + f'template/{template_id}/', json=mock_data)
+    httpx_mock.add_response(method='GET', url=ConfigClass.METADATA_SERVICE + f'template/{template_id}/', json=mock_data)
     response = test_client.delete(f'v1/data/manifest/{template_id}', headers=headers)
     assert response.status_code == 403
 
 
-def test_update_template_attributes_of_file_admin_200(test_client, requests_mocker, jwt_token_admin,
+def test_update_template_attributes_of_file_admin_200(test_client, httpx_mock, jwt_token_admin,
                                                       has_permission_true):
     MOCK_FILE_DATA_ATTR = MOCK_FILE_DATA.copy()
+    MOCK_FILE_DATA_ATTR['extended']['extra']['attributes'] = {template_id: {'attr1': 'B'}}
     # mock get item by id
     mock_data = {
         'result': MOCK_FILE_DATA_ATTR
     }
     file_id = MOCK_FILE_DATA_ATTR['id']
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + f'item/{file_id}', json=mock_data)
+    httpx_mock.add_response(method='GET', url=ConfigClass.METADATA_SERVICE + f'item/{file_id}', json=mock_data)
 
     # mock update item attributes by id
-    MOCK_FILE_DATA_ATTR['extended']['extra']['attributes'] = {template_id: {'attr1': 'B'}}
     mock_data = {
         'result': MOCK_FILE_DATA_ATTR
     }
-    requests_mocker.put(ConfigClass.METADATA_SERVICE + f'item/?id={file_id}', json=mock_data)
+    httpx_mock.add_response(method='PUT', url=ConfigClass.METADATA_SERVICE + f'item/?id={file_id}', json=mock_data)
 
     headers = {'Authorization': jwt_token_admin}
     response = test_client.put(f'v1/file/{file_id}/manifest', json={'attr1': 'B'}, headers=headers)
     assert response.status_code == 200
 
 
-def test_update_template_attributes_of_file_permission_denied_contrib_403(test_client, requests_mocker,
+def test_update_template_attributes_of_file_permission_denied_contrib_403(test_client, httpx_mock,
                                                                           jwt_token_contrib, has_permission_false):
     MOCK_FILE_DATA_ATTR = MOCK_FILE_DATA.copy()
     MOCK_FILE_DATA_ATTR['extended']['extra']['attributes'] = {template_id: {'attr1': 'C'}}
@@ -263,14 +295,14 @@ def test_update_template_attributes_of_file_permission_denied_contrib_403(test_c
         'result': MOCK_FILE_DATA_ATTR
     }
     file_id = MOCK_FILE_DATA_ATTR['id']
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + f'item/{file_id}', json=mock_data)
+    httpx_mock.add_response(method='GET', url=ConfigClass.METADATA_SERVICE + f'item/{file_id}', json=mock_data)
 
     headers = {'Authorization': jwt_token_contrib}
     response = test_client.put(f'v1/file/{file_id}/manifest', json={'attr1': 'B'}, headers=headers)
     assert response.status_code == 403
 
 
-def test_update_template_attributes_of_file_permission_denied_admin_403(test_client, requests_mocker,
+def test_update_template_attributes_of_file_permission_denied_admin_403(test_client, httpx_mock,
                                                                         jwt_token_admin, has_permission_false):
     MOCK_FILE_DATA_ATTR = MOCK_FILE_DATA.copy()
     MOCK_FILE_DATA_ATTR['extended']['extra']['attributes'] = {template_id: {'attr1': 'C'}}
@@ -279,46 +311,48 @@ def test_update_template_attributes_of_file_permission_denied_admin_403(test_cli
         'result': MOCK_FILE_DATA_ATTR
     }
     file_id = MOCK_FILE_DATA_ATTR['id']
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + f'item/{file_id}', json=mock_data)
+    httpx_mock.add_response(method='GET', url=ConfigClass.METADATA_SERVICE + f'item/{file_id}', json=mock_data)
 
     headers = {'Authorization': jwt_token_admin}
     response = test_client.put(f'v1/file/{file_id}/manifest', json={'attr1': 'B'}, headers=headers)
     assert response.status_code == 403
 
 
-def test_import_template_admin_200(test_client, requests_mocker, jwt_token_admin, has_permission_true):
+def test_import_template_admin_200(test_client, httpx_mock, jwt_token_admin, has_permission_true):
     mock_data = {'result': {'has_permission': 'True'}}
-    requests_mocker.get(ConfigClass.AUTH_SERVICE + 'authorize', json=mock_data)
+    httpx_mock.add_response(method='GET', url=re.compile(ConfigClass.AUTH_SERVICE + 'authorize.*'), json=mock_data)
 
     mock_data = {
         'result': [
             MOCK_TEMPLATE_DATA
         ]
     }
-    requests_mocker.post(ConfigClass.METADATA_SERVICE + 'template/', json=mock_data)
+    httpx_mock.add_response(method='POST', url=re.compile(ConfigClass.METADATA_SERVICE + 'template/.*'), json=mock_data)
 
     headers = {'Authorization': jwt_token_admin}
     response = test_client.post('v1/import/manifest', json=MOCK_TEMPLATE_DATA, headers=headers)
     assert response.status_code == 200
 
 
-def test_list_file_template_attributes_admin_200(test_client, requests_mocker, jwt_token_admin, has_permission_true):
+def test_list_file_template_attributes_admin_200(test_client, httpx_mock, jwt_token_admin, has_permission_true):
     MOCK_FILE_DATA_ATTR = MOCK_FILE_DATA.copy()
     MOCK_FILE_DATA_ATTR['extended']['extra']['attributes'] = {template_id: {'attr2': 'A'}}
     file_id = MOCK_FILE_DATA['id']
 
-    # get item by id
+    # get items by ids
     mock_data = {
-        'result': MOCK_FILE_DATA_ATTR
+        'result': [MOCK_FILE_DATA_ATTR]
     }
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + f'item/{file_id}', json=mock_data)
+    httpx_mock.add_response(
+        method='GET', url=re.compile(ConfigClass.METADATA_SERVICE + 'items/batch.*'), json=mock_data
+    )
 
     # get template
     mock_data = {
         'result':
             MOCK_TEMPLATE_DATA
     }
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + f'template/{template_id}/', json=mock_data)
+    httpx_mock.add_response(method='GET', url=ConfigClass.METADATA_SERVICE + f'template/{template_id}/', json=mock_data)
 
     headers = {'Authorization': jwt_token_admin}
     payload = {'geid_list': [file_id]}
@@ -326,17 +360,25 @@ def test_list_file_template_attributes_admin_200(test_client, requests_mocker, j
     assert response.status_code == 200
 
 
-def test_list_file_template_attributes_permission_denied_contrib_403(test_client, requests_mocker, jwt_token_contrib,
+def test_list_file_template_attributes_permission_denied_contrib_403(test_client, httpx_mock, jwt_token_contrib,
                                                                      has_permission_false):
     MOCK_FILE_DATA_ATTR = MOCK_FILE_DATA.copy()
     MOCK_FILE_DATA_ATTR['extended']['extra']['attributes'] = {template_id: {'attr1': 'A'}}
     file_id = MOCK_FILE_DATA['id']
 
-    # get item by id
+    # get items by ids
     mock_data = {
-        'result': MOCK_FILE_DATA_ATTR
+        'result': [MOCK_FILE_DATA_ATTR]
     }
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + f'item/{file_id}', json=mock_data)
+    httpx_mock.add_response(
+        method='GET', url=re.compile(ConfigClass.METADATA_SERVICE + 'items/batch.*'), json=mock_data
+    )
+
+    # get template
+    mock_data = {
+        'result': MOCK_TEMPLATE_DATA
+    }
+    httpx_mock.add_response(method='GET', url=ConfigClass.METADATA_SERVICE + f'template/{template_id}/', json=mock_data)
 
     headers = {'Authorization': jwt_token_contrib}
     payload = {'geid_list': [file_id]}
@@ -344,21 +386,27 @@ def test_list_file_template_attributes_permission_denied_contrib_403(test_client
     assert response.status_code == 403
 
 
-def test_list_file_template_attributes_template_not_found_contrib_404(test_client, requests_mocker, jwt_token_contrib,
+def test_list_file_template_attributes_template_not_found_contrib_404(test_client, httpx_mock, jwt_token_contrib,
                                                                       has_permission_true):
     MOCK_FILE_DATA_ATTR = MOCK_FILE_DATA.copy()
     MOCK_FILE_DATA_ATTR['extended']['extra']['attributes'] = {template_id: {'attr1': 'A'}}
     file_id = MOCK_FILE_DATA['id']
 
-    # get item by id
+    # get items by ids
     mock_data = {
-        'result': MOCK_FILE_DATA_ATTR
+        'result': [MOCK_FILE_DATA_ATTR]
     }
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + f'item/{file_id}', json=mock_data)
+    httpx_mock.add_response(
+        method='GET', url=re.compile(ConfigClass.METADATA_SERVICE + 'items/batch.*'), json=mock_data
+    )
 
     # get template
     mock_data = {}
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + f'template/{template_id}/', json=mock_data, status_code=404)
+    httpx_mock.add_response(
+        method='GET',
+        url=ConfigClass.METADATA_SERVICE + f'template/{template_id}/',
+        json=mock_data, status_code=404,
+    )
 
     headers = {'Authorization': jwt_token_contrib}
     payload = {'geid_list': [file_id]}
@@ -366,7 +414,7 @@ def test_list_file_template_attributes_template_not_found_contrib_404(test_clien
     assert response.status_code == 404
 
 
-def test_attach_attributes_to_file_contrib_missing_attributes_field_400(test_client, requests_mocker,
+def test_attach_attributes_to_file_contrib_missing_attributes_field_400(test_client, httpx_mock,
                                                                         jwt_token_contrib):
     headers = {'Authorization': jwt_token_contrib}
     payload = {
@@ -378,7 +426,7 @@ def test_attach_attributes_to_file_contrib_missing_attributes_field_400(test_cli
     assert response.status_code == 400
 
 
-def test_attach_attributes_to_file_contrib_invalid_role_field_403(test_client, requests_mocker,
+def test_attach_attributes_to_file_contrib_invalid_role_field_403(test_client, httpx_mock,
                                                                   jwt_token_contrib, has_invalid_project_role):
     headers = {'Authorization': jwt_token_contrib}
     payload = {
@@ -391,15 +439,16 @@ def test_attach_attributes_to_file_contrib_invalid_role_field_403(test_client, r
     assert response.status_code == 403
 
 
-def test_attach_attributes_to_folder_contrib_200(test_client, requests_mocker,
+def test_attach_attributes_to_folder_contrib_200(test_client, httpx_mock,
                                                  jwt_token_contrib, has_permission_true, has_project_contributor_role):
-    # get item by id
-    file_id = MOCK_FILE_DATA['id']
+    # get items by ids
     mock_data = {
-        'result': MOCK_FILE_DATA
+        'result': [MOCK_FILE_DATA]
     }
 
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + f'item/{file_id}', json=mock_data)
+    httpx_mock.add_response(
+        method='GET', url=re.compile(ConfigClass.METADATA_SERVICE + 'items/batch.*'), json=mock_data
+    )
 
     # search for items recursively in folder
     mock_data = {
@@ -407,7 +456,11 @@ def test_attach_attributes_to_folder_contrib_200(test_client, requests_mocker,
         ]
     }
 
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + 'items/search/', json=mock_data)
+    httpx_mock.add_response(
+        method='GET',
+        url=re.compile(ConfigClass.METADATA_SERVICE + 'items/search/.*'),
+        json=mock_data,
+    )
 
     # update attributes for folder (bequeath)
     MOCK_FILE_DATA_ATTR = MOCK_FILE_DATA.copy()
@@ -415,7 +468,11 @@ def test_attach_attributes_to_folder_contrib_200(test_client, requests_mocker,
     mock_data = {
         'result': [MOCK_FILE_DATA_ATTR]
     }
-    requests_mocker.put(ConfigClass.METADATA_SERVICE + 'items/batch/', json=mock_data)
+    httpx_mock.add_response(
+        method='PUT',
+        url=re.compile(ConfigClass.METADATA_SERVICE + 'items/batch/.*'),
+        json=mock_data,
+    )
     headers = {'Authorization': jwt_token_contrib}
     payload = {
         'item_ids': [MOCK_FILE_DATA['id']],
@@ -427,16 +484,17 @@ def test_attach_attributes_to_folder_contrib_200(test_client, requests_mocker,
     assert response.status_code == 200
 
 
-def test_attach_attributes_to_folder_failed_folder_search_contrib_500(test_client, requests_mocker,
+def test_attach_attributes_to_folder_failed_folder_search_contrib_500(test_client, httpx_mock,
                                                                       jwt_token_contrib, has_permission_true,
                                                                       has_project_contributor_role):
-    # get item by id
-    file_id = MOCK_FILE_DATA['id']
+    # get items by ids
     mock_data = {
-        'result': MOCK_FILE_DATA
+        'result': [MOCK_FILE_DATA]
     }
 
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + f'item/{file_id}', json=mock_data)
+    httpx_mock.add_response(
+        method='GET', url=re.compile(ConfigClass.METADATA_SERVICE + 'items/batch.*'), json=mock_data
+    )
 
     # search for items recursively in folder
     mock_data = {
@@ -444,7 +502,11 @@ def test_attach_attributes_to_folder_failed_folder_search_contrib_500(test_clien
         ]
     }
 
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + 'items/search/', json=mock_data, status_code=500)
+    httpx_mock.add_response(
+        method='GET',
+        url=re.compile(ConfigClass.METADATA_SERVICE + 'items/search/.*'),
+        json=mock_data, status_code=500,
+    )
 
     # update attributes for folder (bequeath)
     MOCK_FILE_DATA_ATTR = MOCK_FILE_DATA.copy()
@@ -460,24 +522,20 @@ def test_attach_attributes_to_folder_failed_folder_search_contrib_500(test_clien
     assert response.status_code == 500
 
 
-def test_attach_attributes_to_file_and_folder_contrib_200(test_client, requests_mocker,
+def test_attach_attributes_to_file_and_folder_contrib_200(test_client, httpx_mock,
                                                           jwt_token_contrib, has_permission_true,
                                                           has_project_contributor_role):
     MOCK_FILE_DATA_ATTR_1 = MOCK_FILE_DATA.copy()
     MOCK_FILE_DATA_ATTR_2 = MOCK_FILE_DATA_2.copy()
 
-    # get item by id
-    file_id_1 = MOCK_FILE_DATA_ATTR_1['id']
-    mock_data_folder = {
-        'result': MOCK_FILE_DATA_ATTR_1
-    }
-    file_id_2 = MOCK_FILE_DATA_ATTR_2['id']
-    mock_data_file = {
-        'result': MOCK_FILE_DATA_ATTR_2
+    # get items by ids
+    mock_data = {
+        'result': [MOCK_FILE_DATA_ATTR_1, MOCK_FILE_DATA_ATTR_2]
     }
 
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + f'item/{file_id_1}', json=mock_data_folder)
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + f'item/{file_id_2}', json=mock_data_file)
+    httpx_mock.add_response(
+        method='GET', url=re.compile(ConfigClass.METADATA_SERVICE + 'items/batch.*'), json=mock_data
+    )
 
     # search for files recursively in folder
     mock_data = {
@@ -485,7 +543,11 @@ def test_attach_attributes_to_file_and_folder_contrib_200(test_client, requests_
         ]
     }
 
-    requests_mocker.get(ConfigClass.METADATA_SERVICE + 'items/search/', json=mock_data)
+    httpx_mock.add_response(
+        method='GET',
+        url=re.compile(ConfigClass.METADATA_SERVICE + 'items/search/.*'),
+        json=mock_data,
+    )
 
     # update attributes for file and folder
     MOCK_FILE_DATA_ATTR_1['extended']['extra']['attributes'] = {template_id: {'attr1': 'A'}}
@@ -497,7 +559,11 @@ def test_attach_attributes_to_file_and_folder_contrib_200(test_client, requests_
             MOCK_FILE_DATA_ATTR_1, MOCK_FILE_DATA_ATTR_2
         ]
     }
-    requests_mocker.put(ConfigClass.METADATA_SERVICE + 'items/batch/', json=mock_data)
+    httpx_mock.add_response(
+        method='PUT',
+        url=re.compile(ConfigClass.METADATA_SERVICE + 'items/batch/.*'),
+        json=mock_data,
+    )
 
     headers = {'Authorization': jwt_token_contrib}
     payload = {
@@ -508,3 +574,274 @@ def test_attach_attributes_to_file_and_folder_contrib_200(test_client, requests_
     }
     response = test_client.post(f'v1/file/attributes/attach', json=payload, headers=headers)
     assert response.status_code == 200
+
+
+def test_delete_template_attached_to_file_stops_at_first_match_403(test_client, httpx_mock, jwt_token_admin,
+                                                                     has_permission_true):
+    attached_file = {**MOCK_FILE_DATA_2, 'extended': {'extra': {'attributes': {template_id: {'attr1': 'A'}}}}}
+    httpx_mock.add_response(
+        method='GET',
+        url=ConfigClass.METADATA_SERVICE + f'template/{template_id}/',
+        json={'result': MOCK_TEMPLATE_DATA},
+    )
+    httpx_mock.add_response(
+        method='GET',
+        url=re.compile(ConfigClass.METADATA_SERVICE + 'items/search/.*page=0.*'),
+        json={'result': [attached_file], 'num_of_pages': 10},
+    )
+
+    headers = {'Authorization': jwt_token_admin}
+    response = test_client.delete(f'v1/data/manifest/{template_id}', headers=headers)
+    assert response.status_code == 403
+    search_requests = [request for request in httpx_mock.get_requests() if 'items/search' in request.url.path]
+    assert len(search_requests) == 1
+    assert search_requests[0].url.params['attribute_template_id'] == template_id
+
+
+def test_delete_template_pages_through_project_files_200(test_client, httpx_mock, jwt_token_admin,
+                                                         has_permission_true):
+    unattached_file = {**MOCK_FILE_DATA_2, 'extended': {'extra': {'attributes': {}}}}
+    httpx_mock.add_response(
+        method='GET',
+        url=ConfigClass.METADATA_SERVICE + f'template/{template_id}/',
+        json={'result': MOCK_TEMPLATE_DATA},
+    )
+    httpx_mock.add_response(
+        method='GET',
+        url=re.compile(ConfigClass.METADATA_SERVICE + 'items/search/.*page=0.*'),
+        json={'result': [unattached_file] * ConfigClass.METADATA_SEARCH_PAGE_SIZE, 'num_of_pages': 2},
+    )
+    httpx_mock.add_response(
+        method='GET',
+        url=re.compile(ConfigClass.METADATA_SERVICE + 'items/search/.*page=1.*'),
+        json={'result': [unattached_file], 'num_of_pages': 2},
+    )
+    httpx_mock.add_response(
+        method='DELETE',
+        url=ConfigClass.METADATA_SERVICE + f'template/?id={template_id}',
+        json={'result': []},
+    )
+
+    headers = {'Authorization': jwt_token_admin}
+    response = test_client.delete(f'v1/data/manifest/{template_id}', headers=headers)
+    assert response.status_code == 200
+    search_requests = [request for request in httpx_mock.get_requests() if 'items/search' in request.url.path]
+    assert len(search_requests) == 8
+    searched = {(request.url.params['zone'], request.url.params['archived']) for request in search_requests}
+    assert searched == {('0', 'False'), ('0', 'True'), ('1', 'False'), ('1', 'True')}
+
+
+def test_get_template_is_served_from_cache_until_updated_200(test_client, httpx_mock, jwt_token_admin,
+                                                             has_permission_true):
+    httpx_mock.add_response(
+        method='GET',
+        url=ConfigClass.METADATA_SERVICE + f'template/{template_id}/',
+        json={'result': MOCK_TEMPLATE_DATA},
+    )
+    httpx_mock.add_response(method='PUT', url=re.compile(ConfigClass.METADATA_SERVICE + 'template/.*'), json={})
+
+    headers = {'Authorization': jwt_token_admin}
+    for _ in range(3):
+        response = test_client.get(f'v1/data/manifest/{template_id}', headers=headers)
+        assert response.status_code == 200
+        assert response.json()['result']['name'] == MOCK_TEMPLATE_DATA['name']
+    template_requests = [request for request in httpx_mock.get_requests() if 'template' in request.url.path]
+    assert len(template_requests) == 1
+
+    payload = {'project_code': 'test_project', 'name': 'Template02'}
+    response = test_client.put(f'v1/data/manifest/{template_id}', json=payload, headers=headers)
+    assert response.status_code == 200
+    response = test_client.get(f'v1/data/manifest/{template_id}', headers=headers)
+    template_requests = [request for request in httpx_mock.get_requests() if 'template' in request.url.path]
+    assert [request.method for request in template_requests] == ['GET', 'PUT', 'GET']
+
+
+def test_list_project_templates_is_invalidated_by_create_200(test_client, httpx_mock, jwt_token_admin,
+                                                             has_permission_true):
+    httpx_mock.add_response(
+        method='GET',
+        url=ConfigClass.METADATA_SERVICE + 'template/?project_code=test_project',
+        json={'result': [MOCK_TEMPLATE_DATA]},
+    )
+    httpx_mock.add_response(method='POST', url=ConfigClass.METADATA_SERVICE + 'template/', json={'result': {}})
+
+    params = {'project_code': 'test_project'}
+    headers = {'Authorization': jwt_token_admin}
+    test_client.get('/v1/data/manifests', params=params, headers=headers)
+    test_client.get('/v1/data/manifests', params=params, headers=headers)
+    test_client.post('/v1/data/manifests', json={'name': 'Template02', 'project_code': 'test_project'}, headers=headers)
+    response = test_client.get('/v1/data/manifests', params=params, headers=headers)
+
+    assert response.json() == {'result': [MOCK_TEMPLATE_DATA]}
+    template_requests = [request for request in httpx_mock.get_requests() if 'template' in request.url.path]
+    assert [request.method for request in template_requests] == ['GET', 'POST', 'GET']
+
+
+def test_list_file_template_attributes_fetches_entities_and_templates_in_batches_200(test_client, httpx_mock,
+                                                                                     jwt_token_admin,
+                                                                                     has_permission_true):
+    def items_batch(request: httpx.Request):
+        attributes = {template_id: {'attr1': 'A'}}
+        items = [
+            {**MOCK_FILE_DATA_2, 'id': geid, 'extended': {'id': geid, 'extra': {'attributes': attributes}}}
+            for geid in request.url.params.get_list('ids')
+        ]
+        return httpx.Response(200, json={'result': items})
+
+    httpx_mock.add_callback(items_batch, method='GET', url=re.compile(ConfigClass.METADATA_SERVICE + 'items/batch.*'))
+    template = {
+        'id': template_id,
+        'name': 'Template01',
+        'project_code': 'test_project',
+        'attributes': [{'name': 'attr1', 'optional': True, 'type': 'multiple_choice', 'options': ['A', 'B']}],
+    }
+    httpx_mock.add_response(
+        method='GET',
+        url=ConfigClass.METADATA_SERVICE + f'template/{template_id}/',
+        json={'result': template},
+    )
+    geid_list = [str(uuid4()) for _ in range(5000)]
+
+    headers = {'Authorization': jwt_token_admin}
+    response = test_client.post('v1/file/manifest/query', json={'geid_list': geid_list}, headers=headers)
+
+    assert response.status_code == 200
+    result = response.json()['result']
+    assert len(result) == 5000
+    assert result[geid_list[-1]] == [{
+        'id': geid_list[-1],
+        'name': 'attr1',
+        'manifest_name': 'Template01',
+        'value': 'A',
+        'type': 'multiple_choice',
+        'optional': True,
+        'manifest_id': template_id,
+    }]
+    metadata_requests = [request.url.path for request in httpx_mock.get_requests() if request.url.host == 'metadata']
+    assert metadata_requests.count('/v1/items/batch') == 5000 // ConfigClass.ENTITY_BATCH_SIZE
+    assert metadata_requests.count(f'/v1/template/{template_id}/') == 1
+
+
+def test_attach_attributes_to_large_folder_streams_ndjson_in_chunks_200(test_client, httpx_mock, jwt_token_admin,
+                                                                        has_permission_true):
+    folder = {**MOCK_FILE_DATA, 'extended': {'extra': {'attributes': {}, 'tags': [], 'system_tags': []}}}
+    files = [
+        {
+            **MOCK_FILE_DATA_2,
+            'id': str(uuid4()),
+            'name': f'file_{index}.txt',
+            'extended': {'extra': {'attributes': {}, 'tags': [], 'system_tags': []}},
+        }
+        for index in range(2500)
+    ]
+    files[0]['extended']['extra']['attributes'] = {template_id: {}}
+    page_size = ConfigClass.METADATA_SEARCH_PAGE_SIZE
+
+    def items_search(request: httpx.Request):
+        page = int(request.url.params['page'])
+        return httpx.Response(200, json={'result': files[page * page_size:(page + 1) * page_size]})
+
+    def items_batch_update(request: httpx.Request):
+        ids = request.url.params.get_list('ids')
+        return httpx.Response(200, json={'result': [{'id': id_, 'name': id_} for id_ in ids]})
+
+    httpx_mock.add_response(
+        method='GET', url=re.compile(ConfigClass.METADATA_SERVICE + 'items/batch.*'), json={'result': [folder]}
+    )
+    httpx_mock.add_callback(
+        items_search, method='GET', url=re.compile(ConfigClass.METADATA_SERVICE + 'items/search/.*')
+    )
+    httpx_mock.add_callback(
+        items_batch_update, method='PUT', url=re.compile(ConfigClass.METADATA_SERVICE + 'items/batch/.*')
+    )
+
+    headers = {'Authorization': jwt_token_admin, 'Accept': 'application/x-ndjson'}
+    payload = {
+        'item_ids': [folder['id']],
+        'manifest_id': template_id,
+        'project_code': folder['container_code'],
+        'attributes': {'attr1': 'A'}
+    }
+    response = test_client.post('v1/file/attributes/attach', json=payload, headers=headers)
+
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[-1] == {'total': 2500}
+    statuses = [line['operation_status'] for line in lines[:-1]]
+    assert statuses.count('SUCCEED') == 2499
+    assert statuses.count('TERMINATED') == 1
+    updates = [request for request in httpx_mock.get_requests() if request.method == 'PUT']
+    chunk_size = ConfigClass.ATTRIBUTE_ATTACH_CHUNK_SIZE
+    assert max(len(request.url.params.get_list('ids')) for request in updates) <= chunk_size
+
+
+def test_attach_attributes_stream_reports_failed_update_200(test_client, httpx_mock, jwt_token_admin,
+                                                            has_permission_true):
+    file = {**MOCK_FILE_DATA_2, 'extended': {'extra': {'attributes': {}, 'tags': [], 'system_tags': []}}}
+    httpx_mock.add_response(
+        method='GET', url=re.compile(ConfigClass.METADATA_SERVICE + 'items/batch.*'), json={'result': [file]}
+    )
+    httpx_mock.add_response(
+        method='PUT', url=re.compile(ConfigClass.METADATA_SERVICE + 'items/batch/.*'), status_code=500, text='error'
+    )
+
+    headers = {'Authorization': jwt_token_admin, 'Accept': 'application/x-ndjson'}
+    payload = {
+        'item_ids': [file['id']],
+        'manifest_id': template_id,
+        'project_code': file['container_code'],
+        'attributes': {'attr1': 'A'}
+    }
+    response = test_client.post('v1/file/attributes/attach', json=payload, headers=headers)
+
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        {'operation_status': 'FAILED', 'error_msg': 'error'}
+    ]
+
+
+def test_attach_attributes_reports_updated_files_when_later_chunk_fails(test_client, httpx_mock, jwt_token_admin,
+                                                                        has_permission_true):
+    folder = {**MOCK_FILE_DATA, 'extended': {'extra': {'attributes': {}, 'tags': [], 'system_tags': []}}}
+    chunk_size = ConfigClass.ATTRIBUTE_ATTACH_CHUNK_SIZE
+    files = [
+        {
+            **MOCK_FILE_DATA_2,
+            'id': str(uuid4()),
+            'name': f'file_{index}.txt',
+            'extended': {'extra': {'attributes': {}, 'tags': [], 'system_tags': []}},
+        }
+        for index in range(chunk_size + 1)
+    ]
+
+    def items_batch_update(request: httpx.Request):
+        ids = request.url.params.get_list('ids')
+        if files[-1]['id'] in ids:
+            return httpx.Response(500, text='error')
+        return httpx.Response(200, json={'result': [{'id': id_, 'name': id_} for id_ in ids]})
+
+    httpx_mock.add_response(
+        method='GET', url=re.compile(ConfigClass.METADATA_SERVICE + 'items/batch.*'), json={'result': [folder]}
+    )
+    httpx_mock.add_response(
+        method='GET', url=re.compile(ConfigClass.METADATA_SERVICE + 'items/search/.*'), json={'result': files}
+    )
+    httpx_mock.add_callback(
+        items_batch_update, method='PUT', url=re.compile(ConfigClass.METADATA_SERVICE + 'items/batch/.*')
+    )
+
+    headers = {'Authorization': jwt_token_admin}
+    payload = {
+        'item_ids': [folder['id']],
+        'manifest_id': template_id,
+        'project_code': folder['container_code'],
+        'attributes': {'attr1': 'A'}
+    }
+    response = test_client.post('v1/file/attributes/attach', json=payload, headers=headers)
+
+    assert response.status_code == 500
+    body = response.json()
+    assert body['error_msg'] == 'error'
+    assert body['result']['partial'] is True
+    assert body['result']['total'] == chunk_size
+    assert {result['operation_status'] for result in body['result']['result']} == {'SUCCEED'}
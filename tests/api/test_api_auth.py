@@ -0,0 +1,68 @@
+# Copyright (C) 2022 Indoc Research
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import json
+
+import httpx
+import pytest
+
+from config import ConfigClass
+
+
+@pytest.fixture
+def disabled_user(httpx_mock, mocker):
+    mocker.patch("api.api_auth.SrvEmail")
+    httpx_mock.add_response(
+        method="GET",
+        url=ConfigClass.AUTH_SERVICE + "admin/user?email=user%40example.com",
+        json={"result": {"username": "user", "email": "user@example.com", "role": "member"}},
+    )
+
+
+def test_user_account_forwards_headers_without_host_and_content_length(
+    test_client, httpx_mock, jwt_token_admin, disabled_user
+):
+    def user_account(request: httpx.Request):
+        assert request.headers["authorization"] == "Bearer token"
+        assert request.headers["host"] == httpx.URL(ConfigClass.AUTH_SERVICE).netloc.decode()
+        assert int(request.headers["content-length"]) == len(request.content)
+        assert json.loads(request.content)["operator"] == "test"
+        return httpx.Response(status_code=200, json={"result": "success"})
+
+    httpx_mock.add_callback(user_account, method="PUT", url=ConfigClass.AUTH_SERVICE + "user/account")
+
+    response = test_client.get(
+        "/v1/user/account",
+        headers={"Authorization": "Bearer token", "Host": "bff.example.com"},
+        json={"operation_type": "disable", "user_email": "user@example.com"},
+    )
+
+    assert response.status_code == 200
+
+
+def test_user_account_keeps_cached_identity_when_auth_service_rejects_change(
+    test_client, httpx_mock, jwt_token_admin, disabled_user, mocker
+):
+    invalidate_identity = mocker.patch("api.api_auth.invalidate_identity")
+    httpx_mock.add_response(
+        method="PUT", url=ConfigClass.AUTH_SERVICE + "user/account", status_code=404, json={"result": "not found"}
+    )
+
+    test_client.get(
+        "/v1/user/account",
+        headers={"Authorization": "Bearer token"},
+        json={"operation_type": "disable", "user_email": "user@example.com"},
+    )
+
+    invalidate_identity.assert_not_called()
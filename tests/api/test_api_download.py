@@ -0,0 +1,151 @@
+# Copyright (C) 2022 Indoc Research
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import math
+import re
+from uuid import uuid4
+
+import httpx
+import pytest
+
+from config import ConfigClass
+
+
+@pytest.fixture
+def assert_all_responses_were_requested() -> bool:
+    return False
+
+
+def mock_file(file_id: str, container_code: str = "test_project", owner: str = "test", zone: int = 1) -> dict:
+    return {
+        "id": file_id,
+        "container_code": container_code,
+        "container_type": "project",
+        "name": f"{file_id}.txt",
+        "parent_path": f"{owner}.folder",
+        "type": "file",
+        "zone": zone,
+    }
+
+
+@pytest.fixture
+def metadata_items(httpx_mock):
+    def items_batch(request: httpx.Request):
+        ids = request.url.params.get_list("ids")
+        return httpx.Response(200, json={"result": [mock_file(file_id) for file_id in ids]})
+
+    httpx_mock.add_callback(items_batch, method="GET", url=re.compile(ConfigClass.METADATA_SERVICE + "items/batch.*"))
+
+
+@pytest.fixture
+def download_core(httpx_mock):
+    httpx_mock.add_response(
+        method="POST", url=ConfigClass.DOWNLOAD_SERVICE_CORE_V2 + "download/pre/", json={"result": "started"}
+    )
+
+
+def get_metadata_requests(httpx_mock) -> list:
+    return [
+        request for request in httpx_mock.get_requests() if str(request.url).startswith(ConfigClass.METADATA_SERVICE)
+    ]
+
+
+@pytest.mark.parametrize("files_count", [10, 100, 1000])
+def test_download_fetches_entities_in_batches(
+    test_client, httpx_mock, jwt_token_admin, has_permission_true, metadata_items, download_core, files_count
+):
+    payload = {"files": [{"id": str(uuid4())} for _ in range(files_count)], "container_code": "test_project"}
+
+    response = test_client.post("/v2/download/pre", json=payload)
+
+    assert response.status_code == 200
+    assert len(get_metadata_requests(httpx_mock)) == math.ceil(files_count / ConfigClass.ENTITY_BATCH_SIZE)
+
+
+def test_download_denies_contributor_files_of_other_users(
+    test_client, httpx_mock, jwt_token_contrib, has_permission_true, has_project_contributor_role
+):
+    file_ids = [str(uuid4()), str(uuid4())]
+    httpx_mock.add_response(
+        method="GET",
+        url=re.compile(ConfigClass.METADATA_SERVICE + "items/batch.*"),
+        json={"result": [mock_file(file_ids[0]), mock_file(file_ids[1], owner="other")]},
+    )
+
+    response = test_client.post("/v2/download/pre", json={"files": [{"id": file_id} for file_id in file_ids]})
+
+    assert response.status_code == 403
+
+
+def test_download_allows_contributor_own_greenroom_files(
+    test_client, httpx_mock, jwt_token_contrib, has_permission_true
+):
+    file_ids = [str(uuid4()), str(uuid4())]
+    httpx_mock.add_response(
+        method="GET",
+        url=re.compile(ConfigClass.METADATA_SERVICE + "items/batch.*"),
+        json={"result": [mock_file(file_id, zone=0) for file_id in file_ids]},
+    )
+    httpx_mock.add_response(
+        method="POST", url=ConfigClass.DOWNLOAD_SERVICE_GR_V2 + "download/pre/", json={"result": "started"}
+    )
+
+    response = test_client.post("/v2/download/pre", json={"files": [{"id": file_id} for file_id in file_ids]})
+
+    assert response.status_code == 200
+    assert response.json() == {"result": "started"}
+
+
+def test_download_rejects_files_from_both_zones(test_client, httpx_mock, jwt_token_admin, has_permission_true):
+    file_ids = [str(uuid4()), str(uuid4())]
+    httpx_mock.add_response(
+        method="GET",
+        url=re.compile(ConfigClass.METADATA_SERVICE + "items/batch.*"),
+        json={"result": [mock_file(file_ids[0], zone=0), mock_file(file_ids[1], zone=1)]},
+    )
+
+    response = test_client.post("/v2/download/pre", json={"files": [{"id": file_id} for file_id in file_ids]})
+
+    assert response.status_code == 400
+
+
+def test_download_returns_404_for_unknown_file(test_client, httpx_mock, jwt_token_admin, has_permission_true):
+    httpx_mock.add_response(
+        method="GET", url=re.compile(ConfigClass.METADATA_SERVICE + "items/batch.*"), json={"result": []}
+    )
+
+    response = test_client.post("/v2/download/pre", json={"files": [{"id": str(uuid4())}]})
+
+    assert response.status_code == 404
+
+
+def test_dataset_download_denies_files_outside_of_dataset(
+    test_client, httpx_mock, mocker, jwt_token_admin, has_permission_true
+):
+    mocker.patch("api.api_download.get_dataset_by_code", return_value={"code": "dataset", "creator": "test"})
+    file_ids = [str(uuid4()), str(uuid4())]
+    httpx_mock.add_response(
+        method="GET",
+        url=re.compile(ConfigClass.METADATA_SERVICE + "items/batch.*"),
+        json={"result": [mock_file(file_ids[0], "dataset"), mock_file(file_ids[1], "test_project")]},
+    )
+    payload = {
+        "files": [{"id": file_id} for file_id in file_ids],
+        "container_type": "dataset",
+        "container_code": "dataset",
+    }
+
+    response = test_client.post("/v2/download/pre", json=payload)
+
+    assert response.status_code == 403
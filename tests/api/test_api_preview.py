@@ -0,0 +1,84 @@
+# Copyright (C) 2022 Indoc Research
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import re
+
+import httpx
+import pytest
+
+from config import ConfigClass
+
+
+@pytest.fixture
+def assert_all_responses_were_requested() -> bool:
+    return False
+
+
+@pytest.fixture
+def preview_file(httpx_mock):
+    dataset = {"id": "dataset-1", "code": "testdataset", "creator": "test"}
+    httpx_mock.add_response(
+        method="GET", url=ConfigClass.DATASET_SERVICE + "dataset/dataset-1", json={"result": dataset}
+    )
+    httpx_mock.add_response(
+        method="GET",
+        url=ConfigClass.METADATA_SERVICE + "item/file-1",
+        json={"result": {"id": "file-1", "container_code": "testdataset", "zone": 1}},
+    )
+
+
+def test_preview_stream_forwards_range_and_auth_headers(test_client, httpx_mock, jwt_token_admin, preview_file, mocker):
+    mocker.patch.object(ConfigClass, "PREVIEW_STREAM_CHUNK_SIZE", 4)
+    content = b"0123456789abcdef"
+
+    def preview_stream(request: httpx.Request):
+        assert request.headers["range"] == "bytes=2-9"
+        assert request.headers["if-none-match"] == '"v1"'
+        assert request.headers["authorization"] == "Bearer token"
+        return httpx.Response(
+            status_code=206,
+            headers={"Content-Type": "text/plain", "Content-Range": "bytes 2-9/16", "ETag": '"v2"'},
+            content=content[2:10],
+        )
+
+    httpx_mock.add_callback(
+        preview_stream, method="GET", url=re.compile(ConfigClass.DATASET_SERVICE + "file-1/preview/stream.*")
+    )
+
+    headers = {"Authorization": "Bearer token", "Range": "bytes=2-9", "If-None-Match": '"v1"'}
+    response = test_client.get(
+        "/v1/preview/stream", params={"file_id": "file-1", "dataset_geid": "dataset-1"}, headers=headers
+    )
+
+    assert response.status_code == 206
+    assert response.content == b"23456789"
+    assert response.headers["content-range"] == "bytes 2-9/16"
+    assert response.headers["etag"] == '"v2"'
+
+
+def test_preview_stream_returns_not_modified(test_client, httpx_mock, jwt_token_admin, preview_file):
+    httpx_mock.add_response(
+        method="GET",
+        url=re.compile(ConfigClass.DATASET_SERVICE + "file-1/preview/stream.*"),
+        status_code=304,
+        headers={"ETag": '"v1"'},
+    )
+
+    headers = {"Authorization": jwt_token_admin, "If-None-Match": '"v1"'}
+    response = test_client.get(
+        "/v1/preview/stream", params={"file_id": "file-1", "dataset_geid": "dataset-1"}, headers=headers
+    )
+
+    assert response.status_code == 304
+    assert response.content == b""
@@ -13,10 +13,15 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import asyncio
+import csv
+import io
+import json
 import os
 import re
 from typing import Union
 
+import httpx
 import pytest
 
 from config import ConfigClass
@@ -176,6 +181,38 @@ async def test_statistics_endpoint_returns_search_service_response(mocker, test_
     assert response.json() == expected_response
 
 
+@pytest.mark.asyncio
+async def test_statistics_endpoint_serves_repeated_polls_from_cache(
+    mocker, test_async_client, httpx_mock, mock_project
+):
+    mocker.patch('app.auth.get_current_identity', return_value={'role': 'member'})
+    project_code = os.urandom(6).hex()
+    httpx_mock.add_response(
+        method='GET',
+        url=f'{ConfigClass.PROJECT_SERVICE}/v1/projects/{project_code}',
+        json=mock_project(project_code),
+    )
+    httpx_mock.add_response(
+        method='GET',
+        url=re.compile(rf'^{ConfigClass.SEARCH_SERVICE}/v1/project-files/{project_code}/statistics'),
+        json={
+            'files': {'total_count': 1, 'total_size': 1, 'total_per_zone': {0: 5, 1: 15}},
+            'activity': {'today_uploaded': 2, 'today_downloaded': 2},
+        },
+    )
+    headers = {'Authorization': ''}
+    first = await test_async_client.get(f'/v1/project-files/{project_code}/statistics', headers=headers)
+    second = await test_async_client.get(f'/v1/project-files/{project_code}/statistics', headers=headers)
+
+    assert first.json() == second.json()
+    assert second.json()['files']['total_per_zone'] == {
+        ConfigClass.GREENROOM_ZONE_LABEL: 5,
+        ConfigClass.CORE_ZONE_LABEL: 15,
+    }
+    search_requests = [request for request in httpx_mock.get_requests() if 'statistics' in request.url.path]
+    assert len(search_requests) == 1
+
+
 @pytest.mark.asyncio
 async def test_activity_endpoint_returns_search_service_response(mocker, test_async_client, httpx_mock, mock_project):
     mocker.patch('app.auth.get_current_identity', return_value={'role': 'member'})
@@ -203,3 +240,154 @@ async def test_activity_endpoint_returns_search_service_response(mocker, test_as
     assert response.status_code == 200
 
     assert response.json() == expected_response
+
+
+@pytest.mark.asyncio
+async def test_dashboard_returns_partial_result_with_section_errors(
+    mocker, test_async_client, httpx_mock, mock_project
+):
+    mocker.patch('app.auth.get_current_identity', return_value={'role': 'member'})
+    mocker.patch('api.api_project_files.has_permission', return_value=True)
+    mocker.patch.object(ConfigClass, 'PROJECT_DASHBOARD_TIMEOUTS', {'workbench': 0.05})
+
+    async def slow_workbench_entries(project, current_identity):
+        await asyncio.sleep(1)
+
+    mocker.patch('api.api_project_files.get_workbench_entries', slow_workbench_entries)
+    project_code = os.urandom(6).hex()
+    httpx_mock.add_response(
+        method='GET',
+        url=f'{ConfigClass.PROJECT_SERVICE}/v1/projects/{project_code}',
+        json=mock_project(project_code),
+    )
+    for section, response in (
+        ('size', {'data': {'labels': []}}),
+        ('statistics', {'files': {'total_count': 1, 'total_size': 1, 'total_per_zone': {0: 5}}, 'activity': {}}),
+        ('activity', {'data': {'2022-01-01': 1}}),
+    ):
+        httpx_mock.add_response(
+            method='GET',
+            url=re.compile(rf'^{ConfigClass.SEARCH_SERVICE}/v1/project-files/{project_code}/{section}'),
+            json=response,
+        )
+    httpx_mock.add_response(
+        method='GET', url=re.compile(rf'^{ConfigClass.NOTIFY_SERVICE}announcements.*'), status_code=500, json={}
+    )
+    headers = {'Authorization': ''}
+    response = await test_async_client.get(
+        f'/v1/project-files/{project_code}/dashboard', headers=headers, query_string={'activity.page_size': 10}
+    )
+
+    assert response.status_code == 200
+    result = response.json()['result']
+    assert result['project']['code'] == project_code
+    assert result['size'] == {'data': {'labels': []}}
+    assert result['statistics']['files']['total_per_zone'] == {ConfigClass.GREENROOM_ZONE_LABEL: 5}
+    assert result['activity'] == {'data': {'2022-01-01': 1}}
+    assert result['announcements'] is None
+    assert result['workbench'] is None
+    assert result['errors']['announcements']['code'] == 500
+    assert result['errors']['workbench'] == {'code': 504, 'error_msg': 'Timed out'}
+    activity_request = next(request for request in httpx_mock.get_requests() if 'activity' in request.url.path)
+    assert activity_request.url.params['page_size'] == '10'
+
+
+@pytest.fixture
+def search_pages(httpx_mock, mock_project):
+    project_code = os.urandom(6).hex()
+    items = [{'id': str(i), 'name': f'file_{i}', 'zone': i % 2, 'extended': {'tags': ['a']}} for i in range(3)]
+
+    def metadata_items(request):
+        page = int(request.url.params['page'])
+        page_size = int(request.url.params['page_size'])
+        return httpx.Response(
+            status_code=200,
+            json={
+                'result': items[page * page_size : (page + 1) * page_size],
+                'num_of_pages': -(-len(items) // page_size),
+                'total_per_zone': {},
+            },
+        )
+
+    httpx_mock.add_response(
+        method='GET',
+        url=f'{ConfigClass.PROJECT_SERVICE}/v1/projects/{project_code}',
+        json=mock_project(project_code),
+    )
+    httpx_mock.add_callback(metadata_items, url=re.compile(rf'^{ConfigClass.SEARCH_SERVICE}/v1/metadata-items/.*$'))
+    yield project_code
+
+
+@pytest.mark.asyncio
+async def test_search_streams_all_pages_as_ndjson(mocker, test_async_client, httpx_mock, search_pages):
+    mocker.patch('app.auth.get_current_identity', return_value={'role': 'admin'})
+    mocker.patch.object(ConfigClass, 'SEARCH_EXPORT_PAGE_SIZE', 2)
+
+    headers = {'Authorization': '', 'Accept': 'application/x-ndjson'}
+    response = await test_async_client.get(f'/v1/project-files/{search_pages}/search', headers=headers)
+
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line['name'] for line in lines[:-1]] == ['file_0', 'file_1', 'file_2']
+    assert [line['zone'] for line in lines[:-1]] == [
+        ConfigClass.GREENROOM_ZONE_LABEL,
+        ConfigClass.CORE_ZONE_LABEL,
+        ConfigClass.GREENROOM_ZONE_LABEL,
+    ]
+    assert lines[-1] == {'total': 3}
+    assert len(httpx_mock.get_requests(url=re.compile(rf'^{ConfigClass.SEARCH_SERVICE}.*'))) == 2
+
+
+@pytest.mark.asyncio
+async def test_search_streams_selected_fields_as_csv(mocker, test_async_client, search_pages):
+    mocker.patch('app.auth.get_current_identity', return_value={'role': 'admin'})
+
+    headers = {'Authorization': '', 'Accept': 'text/csv'}
+    response = await test_async_client.get(
+        f'/v1/project-files/{search_pages}/search', headers=headers, query_string={'fields': 'name,zone,extended'}
+    )
+
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/csv')
+    assert list(csv.reader(io.StringIO(response.text))) == [
+        ['id', 'name', 'zone', 'extended'],
+        ['0', 'file_0', ConfigClass.GREENROOM_ZONE_LABEL, '{"tags":["a"]}'],
+        ['1', 'file_1', ConfigClass.CORE_ZONE_LABEL, '{"tags":["a"]}'],
+        ['2', 'file_2', ConfigClass.GREENROOM_ZONE_LABEL, '{"tags":["a"]}'],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_search_streams_selected_fields_as_ndjson(mocker, test_async_client, httpx_mock, search_pages):
+    mocker.patch('app.auth.get_current_identity', return_value={'role': 'admin'})
+
+    headers = {'Authorization': '', 'Accept': 'application/x-ndjson'}
+    response = await test_async_client.get(
+        f'/v1/project-files/{search_pages}/search', headers=headers, query_string={'fields': 'name,extended.tags'}
+    )
+
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[:-1] == [{'id': str(i), 'name': f'file_{i}', 'extended': {'tags': ['a']}} for i in range(3)]
+    assert lines[-1] == {'total': 3}
+    search_request = httpx_mock.get_requests(url=re.compile(rf'^{ConfigClass.SEARCH_SERVICE}.*'))[0]
+    assert 'fields' not in search_request.url.params
+
+
+@pytest.mark.asyncio
+async def test_search_export_rejects_invalid_fields(mocker, test_async_client, httpx_mock, mock_project):
+    mocker.patch('app.auth.get_current_identity', return_value={'role': 'admin'})
+    project_code = os.urandom(6).hex()
+    httpx_mock.add_response(
+        method='GET',
+        url=f'{ConfigClass.PROJECT_SERVICE}/v1/projects/{project_code}',
+        json=mock_project(project_code),
+    )
+
+    headers = {'Authorization': '', 'Accept': 'application/x-ndjson'}
+    response = await test_async_client.get(
+        f'/v1/project-files/{project_code}/search', headers=headers, query_string={'fields': 'name;drop'}
+    )
+
+    assert response.status_code == 400
+    assert not httpx_mock.get_requests(url=re.compile(rf'^{ConfigClass.SEARCH_SERVICE}.*'))
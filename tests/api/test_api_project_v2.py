@@ -15,10 +15,17 @@
 from config import ConfigClass
 from services.permissions_service.utils import has_permission
 from resources.error_handler import APIException
+import re
 from uuid import uuid4
 import pytest
 
 
+@pytest.fixture
+def assert_all_responses_were_requested() -> bool:
+    # upstream responses are registered per endpoint, not every test reaches all of them
+    return False
+
+
 MOCK_ADMINS = [
     {
         "username": "admin",
@@ -40,7 +47,7 @@ PROJECT_DATA = {
 @pytest.mark.asyncio
 async def test_create_project_200(
     test_async_client,
-    mocker, requests_mocker,
+    mocker,
     httpx_mock,
     jwt_token_admin,
     has_permission_true
@@ -52,22 +59,25 @@ async def test_create_project_200(
     mocker.patch('api.api_project_v2.ldap_create_user_group', return_value=None)
 
     # create name folders
-    requests_mocker.post(
-        ConfigClass.METADATA_SERVICE + "items/batch/",
+    httpx_mock.add_response(
+        method='POST',
+        url=ConfigClass.METADATA_SERVICE + "items/batch/",
         json={},
         status_code=200
     )
 
     # create keycloak group
-    requests_mocker.post(
-        ConfigClass.AUTH_SERVICE + "admin/users/realm-roles",
+    httpx_mock.add_response(
+        method='POST',
+        url=re.compile(ConfigClass.AUTH_SERVICE + 'admin/users/realm-roles.*'),
         json={},
         status_code=200
     )
 
     # get all platform admins
-    requests_mocker.post(
-        ConfigClass.AUTH_SERVICE + "admin/roles/users",
+    httpx_mock.add_response(
+        method='POST',
+        url=ConfigClass.AUTH_SERVICE + "admin/roles/users",
         json={"result": [{"name": "test"}]},
         status_code=200
     )
@@ -102,7 +112,7 @@ async def test_create_project_200(
 
 def test_create_project_409(
     test_client,
-    mocker, requests_mocker,
+    mocker,
     httpx_mock,
     jwt_token_admin,
     has_permission_true
@@ -112,22 +122,25 @@ def test_create_project_409(
     mocker.patch('api.api_project_v2.ldap_create_user_group', return_value=None)
 
     # create name folders
-    requests_mocker.post(
-        ConfigClass.METADATA_SERVICE + "items/batch/",
+    httpx_mock.add_response(
+        method='POST',
+        url=ConfigClass.METADATA_SERVICE + "items/batch/",
         json={},
         status_code=200
     )
 
     # create keycloak group
-    requests_mocker.post(
-        ConfigClass.AUTH_SERVICE + "admin/users/realm-roles",
+    httpx_mock.add_response(
+        method='POST',
+        url=re.compile(ConfigClass.AUTH_SERVICE + 'admin/users/realm-roles.*'),
         json={},
         status_code=200
     )
 
     # get all platform admins
-    requests_mocker.post(
-        ConfigClass.AUTH_SERVICE + "admin/roles/users",
+    httpx_mock.add_response(
+        method='POST',
+        url=ConfigClass.AUTH_SERVICE + "admin/roles/users",
         json={},
         status_code=200
     )
@@ -147,7 +160,7 @@ def test_create_project_409(
 
 def test_create_project_missing_code_400(
     test_client,
-    mocker, requests_mocker,
+    mocker,
     httpx_mock,
     jwt_token_admin,
     has_permission_true
@@ -158,22 +171,25 @@ def test_create_project_missing_code_400(
     mocker.patch('api.api_project_v2.ldap_create_user_group', return_value=None)
 
     # create name folders
-    requests_mocker.post(
-        ConfigClass.METADATA_SERVICE + "items/batch/",
+    httpx_mock.add_response(
+        method='POST',
+        url=ConfigClass.METADATA_SERVICE + "items/batch/",
         json={},
         status_code=200
     )
 
     # create keycloak group
-    requests_mocker.post(
-        ConfigClass.AUTH_SERVICE + "admin/users/realm-roles",
+    httpx_mock.add_response(
+        method='POST',
+        url=re.compile(ConfigClass.AUTH_SERVICE + 'admin/users/realm-roles.*'),
         json={},
         status_code=200
     )
 
     # get all platform admins
-    requests_mocker.post(
-        ConfigClass.AUTH_SERVICE + "admin/roles/users",
+    httpx_mock.add_response(
+        method='POST',
+        url=ConfigClass.AUTH_SERVICE + "admin/roles/users",
         json={},
         status_code=200
     )
@@ -185,7 +201,7 @@ def test_create_project_missing_code_400(
 
 def test_create_project_bad_code_400(
     test_client,
-    mocker, requests_mocker,
+    mocker,
     httpx_mock,
     jwt_token_admin,
     has_permission_true
@@ -196,22 +212,25 @@ def test_create_project_bad_code_400(
     mocker.patch('api.api_project_v2.ldap_create_user_group', return_value=None)
 
     # create name folders
-    requests_mocker.post(
-        ConfigClass.METADATA_SERVICE + "items/batch/",
+    httpx_mock.add_response(
+        method='POST',
+        url=ConfigClass.METADATA_SERVICE + "items/batch/",
         json={},
         status_code=200
     )
 
     # create keycloak group
-    requests_mocker.post(
-        ConfigClass.AUTH_SERVICE + "admin/users/realm-roles",
+    httpx_mock.add_response(
+        method='POST',
+        url=re.compile(ConfigClass.AUTH_SERVICE + 'admin/users/realm-roles.*'),
         json={},
         status_code=200
     )
 
     # get all platform admins
-    requests_mocker.post(
-        ConfigClass.AUTH_SERVICE + "admin/roles/users",
+    httpx_mock.add_response(
+        method='POST',
+        url=ConfigClass.AUTH_SERVICE + "admin/roles/users",
         json={},
         status_code=200
     )
@@ -239,7 +258,7 @@ def test_create_project_bad_code_400(
 
 def test_create_project_bad_name_400(
     test_client,
-    mocker, requests_mocker,
+    mocker,
     httpx_mock,
     jwt_token_admin,
     has_permission_true
@@ -251,22 +270,25 @@ def test_create_project_bad_name_400(
     payload["name"] = "".join(str(i) for i in range(1000))
 
     # create name folders
-    requests_mocker.post(
-        ConfigClass.METADATA_SERVICE + "items/batch/",
+    httpx_mock.add_response(
+        method='POST',
+        url=ConfigClass.METADATA_SERVICE + "items/batch/",
         json={},
         status_code=200
     )
 
     # create keycloak group
-    requests_mocker.post(
-        ConfigClass.AUTH_SERVICE + "admin/users/realm-roles",
+    httpx_mock.add_response(
+        method='POST',
+        url=re.compile(ConfigClass.AUTH_SERVICE + 'admin/users/realm-roles.*'),
         json={},
         status_code=200
     )
 
     # get all platform admins
-    requests_mocker.post(
-        ConfigClass.AUTH_SERVICE + "admin/roles/users",
+    httpx_mock.add_response(
+        method='POST',
+        url=ConfigClass.AUTH_SERVICE + "admin/roles/users",
         json={},
         status_code=200
     )
@@ -0,0 +1,69 @@
+# Copyright (C) 2022 Indoc Research
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import ast
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).parents[2]
+PACKAGES = ['api', 'app', 'resources', 'services']
+
+# modules that perform blocking network I/O and must not be used by the application
+BLOCKING_MODULES = {'requests', 'urllib.request', 'http.client'}
+BLOCKING_ATTRIBUTES = {('httpx', 'Client'), ('httpx', 'get'), ('httpx', 'post'), ('httpx', 'put'), ('httpx', 'delete')}
+
+
+def get_source_files():
+    for package in PACKAGES:
+        yield from sorted((ROOT / package).rglob('*.py'))
+
+
+class BlockingCallFinder(ast.NodeVisitor):
+    """Collect imports and attribute lookups of blocking HTTP clients."""
+
+    def __init__(self) -> None:
+        self.calls = []
+
+    def visit_Import(self, node: ast.Import) -> None:
+        for alias in node.names:
+            if alias.name in BLOCKING_MODULES:
+                self.calls.append((node.lineno, f'import {alias.name}'))
+
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        if node.module in BLOCKING_MODULES:
+            self.calls.append((node.lineno, f'from {node.module} import ...'))
+            return
+        for alias in node.names:
+            if (node.module, alias.name) in BLOCKING_ATTRIBUTES:
+                self.calls.append((node.lineno, f'from {node.module} import {alias.name}'))
+
+    def visit_Attribute(self, node: ast.Attribute) -> None:
+        if isinstance(node.value, ast.Name) and (node.value.id, node.attr) in BLOCKING_ATTRIBUTES:
+            self.calls.append((node.lineno, f'{node.value.id}.{node.attr}'))
+        self.generic_visit(node)
+
+
+def find_blocking_calls(path: Path):
+    finder = BlockingCallFinder()
+    finder.visit(ast.parse(path.read_text(), filename=str(path)))
+    return finder.calls
+
+
+@pytest.mark.parametrize('path', get_source_files(), ids=lambda path: str(path.relative_to(ROOT)))
+def test_source_file_does_not_use_blocking_http_client(path):
+    blocking_calls = [f'{path.relative_to(ROOT)}:{lineno} {call}' for lineno, call in find_blocking_calls(path)]
+
+    assert not blocking_calls, 'Blocking HTTP calls stall the event loop, use resources.upstream clients instead'
@@ -0,0 +1,220 @@
+# Copyright (C) 2022 Indoc Research
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+import time
+from uuid import uuid4
+
+import pytest
+from starlette.requests import Request
+
+from app.auth import get_current_identity
+from app.auth import get_request_identity
+from app.auth import identity_cache
+from app.auth import invalidate_identity
+from resources.shared_version import SharedVersions
+from config import ConfigClass
+
+
+@pytest.fixture
+def token_payload(mocker):
+    payload = {
+        'exp': int(time.time()) + 300,
+        'preferred_username': 'test',
+        'realm_access': {'roles': ['test_project-admin']},
+    }
+    mocker.patch('jwt.decode', return_value=payload)
+    yield payload
+
+
+@pytest.fixture
+def auth_user(httpx_mock):
+    user = {
+        'id': str(uuid4()),
+        'email': 'test@example.com',
+        'first_name': 'test',
+        'last_name': 'test',
+        'attributes': {'status': 'active'},
+        'role': 'member',
+    }
+    httpx_mock.add_response(
+        method='GET',
+        url=ConfigClass.AUTH_SERVICE + 'admin/user?username=test&exact=True',
+        json={'result': user},
+    )
+    yield user
+
+
+@pytest.fixture
+def request_with_token():
+    return Request({'type': 'http', 'headers': [(b'authorization', b'Bearer token')]})
+
+
+@pytest.mark.asyncio
+async def test_get_current_identity_is_cached_for_same_token(token_payload, auth_user, request_with_token, httpx_mock):
+    hits = identity_cache.hits
+
+    first = await get_current_identity(request_with_token)
+    second = await get_current_identity(request_with_token)
+
+    assert first == second
+    assert first['user_id'] == auth_user['id']
+    assert first['realm_roles'] == ['test_project-admin']
+    assert len(httpx_mock.get_requests()) == 1
+    assert identity_cache.hits == hits + 1
+
+
+@pytest.mark.asyncio
+async def test_invalidate_identity_forces_new_lookup(token_payload, auth_user, request_with_token, httpx_mock):
+    await get_current_identity(request_with_token)
+
+    assert await invalidate_identity(email='TEST@example.com') == 1
+
+    await get_current_identity(request_with_token)
+
+    assert len(httpx_mock.get_requests()) == 2
+
+
+@pytest.mark.asyncio
+async def test_invalidation_by_other_worker_forces_new_lookup(
+    mocker, token_payload, auth_user, request_with_token, httpx_mock
+):
+    versions = SharedVersions('identity_test', 0, 10, 60)
+    versions._redis = mocker.AsyncMock()
+    versions._redis.hget.return_value = b'1'
+    mocker.patch('app.auth.identity_versions', versions)
+    await get_current_identity(request_with_token)
+
+    versions._redis.hget.return_value = b'2'
+    await get_current_identity(request_with_token)
+
+    assert len(httpx_mock.get_requests()) == 2
+    versions._redis.hget.assert_awaited_with(versions.key, 'test')
+
+
+@pytest.mark.asyncio
+async def test_invalidate_identity_keeps_identities_of_other_users(
+    mocker, token_payload, auth_user, request_with_token, httpx_mock
+):
+    bump = mocker.patch('app.auth.identity_versions.bump')
+    await get_current_identity(request_with_token)
+
+    assert await invalidate_identity(username='other') == 0
+    await get_current_identity(request_with_token)
+
+    assert len(httpx_mock.get_requests()) == 1
+    bump.assert_awaited_once_with('other')
+
+
+@pytest.mark.asyncio
+async def test_invalidate_identity_looks_up_username_of_uncached_user(mocker, httpx_mock):
+    bump = mocker.patch('app.auth.identity_versions.bump')
+    httpx_mock.add_response(
+        method='GET',
+        url=ConfigClass.AUTH_SERVICE + 'admin/user?email=other%40example.com',
+        json={'result': {'username': 'other', 'email': 'other@example.com'}},
+    )
+
+    assert await invalidate_identity(email='other@example.com') == 0
+
+    bump.assert_awaited_once_with('other')
+
+
+@pytest.mark.asyncio
+async def test_get_current_identity_does_not_cache_expired_token(
+    token_payload, auth_user, request_with_token, httpx_mock
+):
+    token_payload['exp'] = int(time.time()) - 10
+
+    await get_current_identity(request_with_token)
+    await get_current_identity(request_with_token)
+
+    assert len(httpx_mock.get_requests()) == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_for_same_user_share_one_auth_call(
+    token_payload, auth_user, request_with_token, httpx_mock
+):
+    identities = await asyncio.gather(*[get_current_identity(request_with_token) for _ in range(20)])
+
+    assert all(identity['user_id'] == auth_user['id'] for identity in identities)
+    assert len(httpx_mock.get_requests()) == 1
+
+
+@pytest.mark.asyncio
+async def test_get_request_identity_resolves_identity_once_per_request(mocker):
+    identity = {'username': 'test', 'role': 'member'}
+    resolver = mocker.patch('app.auth.get_current_identity', return_value=identity)
+    scope = {'type': 'http', 'headers': []}
+
+    first = await get_request_identity(Request(scope))
+    second = await get_request_identity(Request(scope))
+
+    assert first is second is identity
+    resolver.assert_awaited_once()
+
+
+@pytest.fixture
+def verified_claims(mocker):
+    mocker.patch.object(ConfigClass, 'JWT_VERIFY_SIGNATURE', True)
+    claims = {
+        'sub': str(uuid4()),
+        'preferred_username': 'test',
+        'email': 'test@example.com',
+        'given_name': 'first',
+        'family_name': 'last',
+        'realm_access': {'roles': ['platform-admin']},
+    }
+    mocker.patch('app.auth.jwks_client.decode', return_value=claims)
+    yield claims
+
+
+@pytest.mark.asyncio
+async def test_get_current_identity_trusts_claims_of_verified_token(
+    verified_claims, auth_user, request_with_token, httpx_mock
+):
+    identity = await get_current_identity(request_with_token)
+    await get_current_identity(request_with_token)
+
+    assert identity['user_id'] == verified_claims['sub']
+    assert identity['role'] == 'admin'
+    assert identity['realm_roles'] == ['platform-admin']
+    assert len(httpx_mock.get_requests()) == 1
+
+
+@pytest.mark.asyncio
+async def test_get_current_identity_denies_disabled_user_with_verified_token(
+    verified_claims, request_with_token, httpx_mock
+):
+    httpx_mock.add_response(
+        method='GET',
+        url=ConfigClass.AUTH_SERVICE + 'admin/user?username=test&exact=True',
+        json={'result': {'id': verified_claims['sub'], 'attributes': {'status': 'disabled'}}},
+    )
+
+    assert await get_current_identity(request_with_token) is None
+
+
+@pytest.mark.asyncio
+async def test_invalidate_identity_drops_cached_status_of_verified_token(
+    verified_claims, auth_user, request_with_token, httpx_mock
+):
+    await get_current_identity(request_with_token)
+
+    await invalidate_identity(username='test')
+    await get_current_identity(request_with_token)
+
+    assert len(httpx_mock.get_requests()) == 2
@@ -0,0 +1,97 @@
+# Copyright (C) 2022 Indoc Research
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+import json
+import time
+
+import jwt
+import pytest
+
+from app.jwks import JWKSClient
+from app.jwks import JWKSException
+
+pytest.importorskip('cryptography')
+
+JWKS_URL = 'http://keycloak/realms/test/protocol/openid-connect/certs'
+
+
+@pytest.fixture
+def signing_key():
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+@pytest.fixture
+def jwks(signing_key):
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(signing_key.public_key()))
+    jwk.update({'kid': 'key-1', 'use': 'sig', 'alg': 'RS256'})
+    return {'keys': [jwk]}
+
+
+def create_token(signing_key, kid: str = 'key-1', **claims) -> str:
+    payload = {'preferred_username': 'test', 'exp': int(time.time()) + 300, **claims}
+    return jwt.encode(payload, signing_key, algorithm='RS256', headers={'kid': kid}).decode()
+
+
+@pytest.mark.asyncio
+async def test_decode_verifies_token_with_fetched_keys(httpx_mock, signing_key, jwks):
+    httpx_mock.add_response(method='GET', url=JWKS_URL, json=jwks)
+    client = JWKSClient(JWKS_URL)
+    await client.refresh()
+
+    claims = await client.decode(create_token(signing_key))
+
+    assert claims['preferred_username'] == 'test'
+
+
+@pytest.mark.asyncio
+async def test_decode_rejects_token_signed_with_other_key(httpx_mock, signing_key, jwks):
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    httpx_mock.add_response(method='GET', url=JWKS_URL, json=jwks)
+    client = JWKSClient(JWKS_URL)
+    await client.refresh()
+    other_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+    with pytest.raises(JWKSException):
+        await client.decode(create_token(other_key))
+
+
+@pytest.mark.asyncio
+async def test_refresh_falls_back_to_file_when_endpoint_is_unavailable(httpx_mock, tmp_path, signing_key, jwks):
+    httpx_mock.add_response(method='GET', url=JWKS_URL, status_code=503)
+    fallback_file = tmp_path / 'jwks.json'
+    fallback_file.write_text(json.dumps(jwks))
+    client = JWKSClient(JWKS_URL, fallback_file=str(fallback_file))
+
+    await client.refresh()
+    claims = await client.decode(create_token(signing_key))
+
+    assert claims['preferred_username'] == 'test'
+
+
+@pytest.mark.asyncio
+async def test_periodic_refresh_keeps_running_after_error(mocker):
+    client = JWKSClient(JWKS_URL, refresh_interval=0)
+    refresh = mocker.patch.object(client, 'refresh', side_effect=[RuntimeError('unexpected'), True, True])
+
+    task = asyncio.ensure_future(client._refresh_periodically())
+    while refresh.await_count < 3:
+        await asyncio.sleep(0)
+    task.cancel()
+
+    assert refresh.await_count == 3
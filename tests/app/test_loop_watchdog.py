@@ -0,0 +1,110 @@
+# Copyright (C) 2022 Indoc Research
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+
+from app.loop_watchdog import UNKNOWN_ROUTE
+from app.loop_watchdog import LoopWatchdog
+from app.loop_watchdog import LoopWatchdogMiddleware
+
+
+def create_app(watchdog: LoopWatchdog) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(LoopWatchdogMiddleware, watchdog=watchdog)
+
+    @app.get('/v1/blocking/{item_id}')
+    async def blocking(item_id: str):
+        time.sleep(0.3)
+        return {'item_id': item_id}
+
+    @app.get('/v1/non-blocking')
+    async def non_blocking():
+        await asyncio.sleep(0.3)
+        return {}
+
+    return app
+
+
+async def call(app: FastAPI, path: str) -> None:
+    scope = {
+        'type': 'http',
+        'method': 'GET',
+        'path': path,
+        'raw_path': path.encode(),
+        'root_path': '',
+        'query_string': b'',
+        'headers': [],
+        'scheme': 'http',
+        'server': ('testserver', 80),
+    }
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+@pytest.mark.asyncio
+async def test_blocking_call_is_reported_with_route_and_frame():
+    watchdog = LoopWatchdog(interval=0.01, threshold=0.05)
+    app = create_app(watchdog)
+    watchdog.start(app.routes)
+    try:
+        await call(app, '/v1/blocking/any')
+        await asyncio.sleep(0.1)
+    finally:
+        watchdog.stop()
+
+    offenders = watchdog.top_offenders()
+    assert len(offenders) == 1
+    assert offenders[0]['route'] == 'GET /v1/blocking/{item_id}'
+    assert offenders[0]['stalls'] == 1
+    assert offenders[0]['max_blocked'] >= 0.25
+    assert offenders[0]['blocking_frame'].startswith('tests/app/test_loop_watchdog.py:')
+    assert offenders[0]['blocking_frame'].endswith('in blocking')
+
+
+@pytest.mark.asyncio
+async def test_awaiting_does_not_stall_the_loop():
+    watchdog = LoopWatchdog(interval=0.01, threshold=0.05)
+    app = create_app(watchdog)
+    watchdog.start(app.routes)
+    try:
+        await call(app, '/v1/non-blocking')
+    finally:
+        watchdog.stop()
+
+    assert watchdog.top_offenders() == []
+    assert watchdog.stats()['samples'] > 0
+
+
+def test_top_offenders_are_ordered_by_total_blocked_time():
+    watchdog = LoopWatchdog(interval=0.01, threshold=0.05)
+    watchdog.record('GET /v1/a', 0.2, [])
+    watchdog.record('GET /v1/b', 0.3, [])
+    watchdog.record('GET /v1/a', 0.2, [])
+    watchdog.record(UNKNOWN_ROUTE, 0.1, [])
+
+    offenders = watchdog.top_offenders(limit=2)
+
+    assert [offender['route'] for offender in offenders] == ['GET /v1/a', 'GET /v1/b']
+    assert offenders[0]['stalls'] == 2
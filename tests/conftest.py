@@ -24,6 +24,9 @@ from fastapi.testclient import TestClient
 from pytest_httpx import HTTPXMock
 from httpx import AsyncClient
 from async_asgi_testclient import TestClient as TestAsyncClient
+from resources.cache import get_caches
+from resources.swr_cache import StaleWhileRevalidateCache
+from resources.tiered_cache import TieredCache
 
 
 @pytest.fixture(scope='session')
@@ -40,6 +43,22 @@ def test_async_client(redis):
     return TestAsyncClient(app)
 
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    for cache in get_caches().values():
+        cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def local_caches(monkeypatch):
+    # values stored in redis would leak between tests mocking the same ids
+    for cache in get_caches().values():
+        if isinstance(cache, TieredCache):
+            monkeypatch.setattr(cache, 'shared_ttl', 0)
+        elif isinstance(cache, StaleWhileRevalidateCache):
+            monkeypatch.setattr(cache, 'shared', False)
+
+
 @pytest.fixture
 def requests_mocker():
     kw = {'real_http': True}
@@ -101,7 +120,7 @@ def jwt_mock(mocker, httpx_mock: HTTPXMock, platform_role: str, project_role: st
             "realm_roles": []
         }
     }
-    url = ConfigClass.AUTH_SERVICE + 'admin/user?username=test&exact=true'
+    url = ConfigClass.AUTH_SERVICE + 'admin/user?username=test&exact=True'
     httpx_mock.add_response(
         method='GET',
         url=url,
@@ -0,0 +1,65 @@
+# Copyright (C) 2022 Indoc Research
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import pytest
+from starlette.requests import Request
+
+from config import ConfigClass
+from resources.error_handler import APIException
+from resources.request_body import get_request_json
+
+
+def build_request(body: bytes) -> Request:
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+
+    async def receive():
+        return messages.pop(0)
+
+    scope = {
+        'type': 'http',
+        'method': 'POST',
+        'headers': [(b'content-length', str(len(body)).encode())],
+    }
+    return Request(scope, receive)
+
+
+@pytest.mark.asyncio
+async def test_get_request_json_decodes_body_once(mocker):
+    request = build_request(b'{"project_code": "test"}')
+    loads = mocker.patch('resources.json_utils.loads', return_value={'project_code': 'test'})
+
+    assert await get_request_json(request) == {'project_code': 'test'}
+    assert await get_request_json(request) == {'project_code': 'test'}
+    assert await request.body() == b'{"project_code": "test"}'
+    loads.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_get_request_json_rejects_large_body(mocker):
+    mocker.patch.object(ConfigClass, 'MAX_REQUEST_BODY_SIZE', 8)
+    request = build_request(b'{"project_code": "test"}')
+
+    with pytest.raises(APIException) as e:
+        await get_request_json(request)
+    assert e.value.status_code == 413
+
+
+@pytest.mark.asyncio
+async def test_get_request_json_rejects_invalid_json():
+    request = build_request(b'{"project_code"')
+
+    with pytest.raises(APIException) as e:
+        await get_request_json(request)
+    assert e.value.status_code == 400
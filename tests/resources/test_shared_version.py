@@ -0,0 +1,133 @@
+# Copyright (C) 2022 Indoc Research
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import aioredis
+import pytest
+
+from resources.shared_version import SharedVersion
+from resources.shared_version import SharedVersions
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def incr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+
+    async def hget(self, key, field):
+        return self.data.get(key, {}).get(field)
+
+    async def hincrby(self, key, field, amount):
+        fields = self.data.setdefault(key, {})
+        fields[field] = int(fields.get(field, 0)) + amount
+        return fields[field]
+
+
+class UnreachableRedis:
+    async def get(self, key):
+        raise aioredis.exceptions.ConnectionError('unreachable')
+
+    async def incr(self, key):
+        raise aioredis.exceptions.ConnectionError('unreachable')
+
+    async def hget(self, key, field):
+        raise aioredis.exceptions.ConnectionError('unreachable')
+
+    async def hincrby(self, key, field, amount):
+        raise aioredis.exceptions.ConnectionError('unreachable')
+
+
+def make_version(redis, check_interval=0):
+    version = SharedVersion('test', check_interval)
+    version._redis = redis
+    return version
+
+
+@pytest.mark.asyncio
+async def test_bump_is_seen_by_other_workers():
+    redis = FakeRedis()
+    worker = make_version(redis)
+    other = make_version(redis)
+    assert await other.current() == 0
+
+    assert await worker.bump() == 1
+
+    assert await other.current() == 1
+
+
+@pytest.mark.asyncio
+async def test_current_reads_redis_once_per_check_interval():
+    redis = FakeRedis()
+    worker = make_version(redis, check_interval=60)
+    assert await worker.current() == 0
+
+    await make_version(redis).bump()
+
+    assert await worker.current() == 0
+
+
+@pytest.mark.asyncio
+async def test_bump_without_redis_changes_local_version():
+    worker = make_version(UnreachableRedis())
+
+    assert await worker.bump() == 1
+    assert await worker.current() == 1
+    assert worker.errors == 2
+
+
+def make_versions(redis, check_interval=0):
+    versions = SharedVersions('test', check_interval, 10, 60)
+    versions._redis = redis
+    return versions
+
+
+@pytest.mark.asyncio
+async def test_bump_of_key_is_seen_by_other_workers_and_leaves_other_keys():
+    redis = FakeRedis()
+    worker = make_versions(redis)
+    other = make_versions(redis)
+    assert await other.current('a') == 0
+
+    assert await worker.bump('a') == 1
+
+    assert await other.current('a') == 1
+    assert await other.current('b') == 0
+
+
+@pytest.mark.asyncio
+async def test_current_of_key_reads_redis_once_per_check_interval():
+    redis = FakeRedis()
+    worker = make_versions(redis, check_interval=60)
+    assert await worker.current('a') == 0
+
+    await make_versions(redis).bump('a')
+
+    assert await worker.current('a') == 0
+    assert await worker.current('b') == 0
+    assert await make_versions(redis).current('a') == 1
+
+
+@pytest.mark.asyncio
+async def test_bump_of_key_without_redis_changes_local_version():
+    worker = make_versions(UnreachableRedis())
+
+    assert await worker.bump('a') == 1
+    assert await worker.current('a') == 1
+    assert await worker.current('b') == 0
+    assert worker.errors == 3
@@ -0,0 +1,135 @@
+# Copyright (C) 2022 Indoc Research
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+import time
+
+import pytest
+
+from resources import json_utils
+from resources.swr_cache import StaleWhileRevalidateCache
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+
+class Loader:
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return {'total': self.calls}
+
+
+def make_cache(name, redis=None, fresh_ttl=30):
+    cache = StaleWhileRevalidateCache(name, 10, fresh_ttl, 600, shared=redis is not None)
+    cache._redis = redis
+    return cache
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_load():
+    cache = make_cache('swr_misses')
+    loader = Loader()
+
+    results = await asyncio.gather(*[cache.get('key', loader) for _ in range(5)])
+
+    assert results == [{'total': 1}] * 5
+    assert loader.calls == 1
+    results[0]['total'] = 42
+    assert await cache.get('key', loader) == {'total': 1}
+
+
+@pytest.mark.asyncio
+async def test_stale_value_is_served_while_refreshed_once():
+    cache = make_cache('swr_stale', fresh_ttl=0)
+    loader = Loader()
+    await cache.get('key', loader)
+
+    stale = await asyncio.gather(*[cache.get('key', loader) for _ in range(5)])
+    await asyncio.gather(*cache._refreshes.values())
+
+    assert stale == [{'total': 1}] * 5
+    assert loader.calls == 2
+    assert await cache.get('key', loader) == {'total': 2}
+    assert cache.stats()['stale_hits'] == 6
+    await asyncio.gather(*cache._refreshes.values())
+
+
+@pytest.mark.asyncio
+async def test_value_is_shared_between_workers_through_redis():
+    redis = FakeRedis()
+    first = make_cache('swr_worker_1', redis)
+    second = make_cache('swr_worker_2', redis)
+    second.prefix = first.prefix
+    loader = Loader()
+
+    await first.get('key', loader)
+
+    assert await second.get('key', loader) == {'total': 1}
+    assert loader.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_only_one_worker_refreshes_stale_value():
+    redis = FakeRedis()
+    first = make_cache('swr_refresh_1', redis, fresh_ttl=0)
+    second = make_cache('swr_refresh_2', redis, fresh_ttl=0)
+    second.prefix = first.prefix
+    loader = Loader()
+    await first.get('key', loader)
+
+    await asyncio.gather(first.get('key', loader), second.get('key', loader))
+    await asyncio.gather(*first._refreshes.values(), *second._refreshes.values())
+
+    assert loader.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_shared_value_older_than_stale_ttl_is_not_served():
+    redis = FakeRedis()
+    cache = make_cache('swr_expired', redis)
+    redis.data[cache.prefix + 'key'] = json_utils.dumps({'stored_at': time.time() - 601, 'value': {'total': 0}})
+    loader = Loader()
+
+    assert await cache.get('key', loader) == {'total': 1}
+    assert loader.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_shared_value_copied_locally_keeps_its_age():
+    redis = FakeRedis()
+    cache = make_cache('swr_copied', redis)
+    redis.data[cache.prefix + 'key'] = json_utils.dumps({'stored_at': time.time() - 590, 'value': {'total': 0}})
+
+    assert await cache.get('key', Loader()) == {'total': 0}
+    assert 9 <= cache.local._entries['key'][0] - time.monotonic() <= 10
+    await asyncio.gather(*cache._refreshes.values())
@@ -0,0 +1,146 @@
+# Copyright (C) 2022 Indoc Research
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import httpx
+import pytest
+from starlette.requests import Request
+
+from config import ConfigClass
+from resources.upstream import UpstreamClients
+from resources.upstream import forward_headers
+from resources.upstream import normalize_params
+from resources.upstream import stream_upstream_response
+from resources.upstream import upstream_client
+
+
+@pytest.mark.asyncio
+async def test_upstream_clients_reuse_one_client_per_upstream():
+    clients = UpstreamClients(ConfigClass)
+
+    metadata = clients.get('metadata')
+
+    assert clients.get('metadata') is metadata
+    assert clients.get('dataset') is not metadata
+    await clients.aclose()
+
+
+@pytest.mark.asyncio
+async def test_upstream_clients_are_recreated_after_close():
+    clients = UpstreamClients(ConfigClass)
+    metadata = clients.get('metadata')
+
+    await clients.aclose()
+
+    assert metadata.is_closed
+    assert clients.get('metadata') is not metadata
+    await clients.aclose()
+
+
+@pytest.mark.asyncio
+async def test_upstream_clients_use_timeout_override(mocker):
+    mocker.patch.object(ConfigClass, 'UPSTREAM_TIMEOUTS', {'search': 60})
+    clients = UpstreamClients(ConfigClass)
+
+    assert clients.get('search').timeout.read == 60
+    assert clients.get('metadata').timeout.read == ConfigClass.UPSTREAM_TIMEOUT
+    await clients.aclose()
+
+
+@pytest.mark.asyncio
+async def test_upstream_clients_use_pool_limit_override(mocker):
+    mocker.patch.object(ConfigClass, 'UPSTREAM_LIMITS', {'search': {'max_connections': 50, 'keepalive_expiry': 60}})
+    clients = UpstreamClients(ConfigClass)
+
+    pool = clients.get('search')._transport._pool
+    assert pool._max_connections == 50
+    assert pool._keepalive_expiry == 60
+    assert pool._max_keepalive_connections == ConfigClass.UPSTREAM_MAX_KEEPALIVE_CONNECTIONS
+    await clients.aclose()
+
+
+@pytest.mark.asyncio
+async def test_upstream_clients_open_creates_clients_up_front():
+    clients = UpstreamClients(ConfigClass)
+
+    clients.open(['search'])
+
+    assert list(clients._clients) == ['search']
+    await clients.aclose()
+
+
+def test_upstream_client_dependency_rejects_unknown_upstream():
+    with pytest.raises(KeyError):
+        upstream_client('unknown')
+
+
+def test_normalize_params_drops_none_and_keeps_boolean_case():
+    params = {'zone': None, 'recursive': False, 'archived': True, 'name': ('test%',), 'page': 0}
+
+    assert normalize_params(params) == [('recursive', 'False'), ('archived', 'True'), ('name', 'test%'), ('page', 0)]
+
+
+@pytest.mark.asyncio
+async def test_upstream_clients_send_params_like_requests(httpx_mock):
+    httpx_mock.add_response(url='http://metadata/items?recursive=False')
+    clients = UpstreamClients(ConfigClass)
+
+    response = await clients.get('metadata').get('http://metadata/items', params={'zone': None, 'recursive': False})
+
+    assert response.status_code == 200
+    await clients.aclose()
+
+
+@pytest.mark.asyncio
+async def test_upstream_clients_follow_redirects_like_requests(httpx_mock):
+    httpx_mock.add_response(
+        url='http://metadata/items', status_code=307, headers={'Location': 'http://metadata/items/'}
+    )
+    httpx_mock.add_response(url='http://metadata/items/', json={'result': []})
+    clients = UpstreamClients(ConfigClass)
+
+    response = await clients.get('metadata').get('http://metadata/items')
+
+    assert response.status_code == 200
+    assert response.json() == {'result': []}
+    await clients.aclose()
+
+
+def test_forward_headers_drops_connection_and_body_headers():
+    headers = [
+        (b'authorization', b'Bearer token'),
+        (b'host', b'bff'),
+        (b'content-length', b'42'),
+        (b'content-type', b'application/json'),
+    ]
+    request = Request({'type': 'http', 'method': 'POST', 'headers': headers})
+
+    assert forward_headers(request) == {'authorization': 'Bearer token'}
+
+
+@pytest.mark.asyncio
+async def test_stream_upstream_response_closes_upstream_when_client_goes_away():
+    async def body():
+        for _ in range(10):
+            yield b'x' * 10
+
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=body()))
+    async with httpx.AsyncClient(transport=transport) as client:
+        response = await client.send(client.build_request('GET', 'http://dataset/preview'), stream=True)
+        chunks = stream_upstream_response(response, 10)
+
+        assert await chunks.__anext__() == b'x' * 10
+        await chunks.aclose()
+
+        assert response.is_closed
@@ -0,0 +1,124 @@
+# Copyright (C) 2022 Indoc Research
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import re
+
+import pytest
+
+from config import ConfigClass
+from resources.tiered_cache import cache_bypass
+from services.meta import entity_cache
+from services.meta import get_entities_by_ids
+from services.meta import get_entity_by_id
+from services.meta import invalidate_entities
+
+ENTITY_URL = ConfigClass.METADATA_SERVICE + 'item/entity-1'
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+
+@pytest.fixture
+def shared_tier(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(entity_cache, 'shared_ttl', 30)
+    monkeypatch.setattr(entity_cache, '_redis', redis)
+    yield redis
+
+
+@pytest.fixture
+def entity_response(httpx_mock):
+    httpx_mock.add_response(method='GET', url=ENTITY_URL, json={'result': {'id': 'entity-1', 'name': 'file.txt'}})
+
+
+@pytest.mark.asyncio
+async def test_entity_is_fetched_once(entity_response, httpx_mock):
+    first = await get_entity_by_id('entity-1')
+    first['name'] = 'modified'
+    second = await get_entity_by_id('entity-1')
+
+    assert second == {'id': 'entity-1', 'name': 'file.txt'}
+    assert len(httpx_mock.get_requests()) == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidated_entity_is_fetched_again(entity_response, httpx_mock):
+    await get_entity_by_id('entity-1')
+    await invalidate_entities(['entity-1'])
+    await get_entity_by_id('entity-1')
+
+    assert len(httpx_mock.get_requests()) == 2
+
+
+@pytest.mark.asyncio
+async def test_entity_is_served_from_shared_tier(shared_tier, entity_response, httpx_mock):
+    await get_entity_by_id('entity-1')
+    entity_cache.clear()
+
+    entity = await get_entity_by_id('entity-1')
+
+    assert entity == {'id': 'entity-1', 'name': 'file.txt'}
+    assert len(httpx_mock.get_requests()) == 1
+    assert entity_cache.stats()['shared_hits'] == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidation_removes_entity_from_shared_tier(shared_tier, entity_response):
+    await get_entity_by_id('entity-1')
+    await invalidate_entities(['entity-1'])
+
+    assert shared_tier.data == {}
+
+
+@pytest.mark.asyncio
+async def test_bypass_skips_cached_entity(entity_response, httpx_mock):
+    await get_entity_by_id('entity-1')
+    token = cache_bypass.set(True)
+    try:
+        await get_entity_by_id('entity-1')
+    finally:
+        cache_bypass.reset(token)
+
+    assert len(httpx_mock.get_requests()) == 2
+
+
+@pytest.mark.asyncio
+async def test_batch_fetch_skips_cached_entities(entity_response, httpx_mock):
+    httpx_mock.add_response(
+        method='GET',
+        url=re.compile(ConfigClass.METADATA_SERVICE + 'items/batch.*'),
+        json={'result': [{'id': 'entity-2', 'name': 'other.txt'}]},
+    )
+    await get_entity_by_id('entity-1')
+
+    entities = await get_entities_by_ids(['entity-1', 'entity-2', 'entity-1'])
+
+    assert set(entities) == {'entity-1', 'entity-2'}
+    batch_request = httpx_mock.get_requests()[-1]
+    assert batch_request.url.params.get_list('ids') == ['entity-2']
+    assert await get_entities_by_ids(['entity-2']) == {'entity-2': {'id': 'entity-2', 'name': 'other.txt'}}
+    assert len(httpx_mock.get_requests()) == 2
@@ -0,0 +1,113 @@
+# Copyright (C) 2022 Indoc Research
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import re
+
+import pytest
+
+from config import ConfigClass
+from services.permissions_service.matrix import PermissionMatrix
+from services.permissions_service.utils import has_permission
+
+MATRIX_URL = ConfigClass.AUTH_SERVICE + 'permissions'
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def incr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+
+
+@pytest.fixture
+def redis():
+    return FakeRedis()
+
+
+def make_matrix(redis):
+    matrix = PermissionMatrix(MATRIX_URL, refresh_interval=300, max_age=900, version_check_interval=0)
+    matrix.version._redis = redis
+    return matrix
+
+
+@pytest.fixture
+def matrix(mocker, redis):
+    matrix = make_matrix(redis)
+    mocker.patch('services.permissions_service.utils.permission_matrix', matrix)
+    yield matrix
+
+
+@pytest.fixture
+def permissions_response(httpx_mock):
+    httpx_mock.add_response(
+        method='GET',
+        url=re.compile(rf'^{MATRIX_URL}\?.*$'),
+        json={
+            'result': [
+                {'role': 'contributor', 'resource': 'file', 'zone': 'greenroom', 'operation': 'view'},
+                {'role': 'admin', 'resource': 'file', 'zone': 'core', 'operation': 'delete'},
+            ],
+            'num_of_pages': 1,
+        },
+    )
+
+
+@pytest.mark.asyncio
+async def test_lookup_is_answered_from_loaded_matrix(matrix, permissions_response):
+    await matrix.refresh()
+
+    assert await matrix.lookup('contributor', 'file', 'greenroom', 'view') is True
+    assert await matrix.lookup('contributor', 'file', 'core', 'view') is False
+
+
+@pytest.mark.asyncio
+async def test_lookup_returns_none_until_matrix_is_loaded(matrix):
+    assert await matrix.lookup('contributor', 'file', 'greenroom', 'view') is None
+
+
+@pytest.mark.asyncio
+async def test_lookup_returns_none_when_matrix_is_stale(matrix, permissions_response):
+    await matrix.refresh()
+    matrix.refreshed_at -= matrix.max_age
+
+    assert await matrix.lookup('contributor', 'file', 'greenroom', 'view') is None
+
+
+@pytest.mark.asyncio
+async def test_has_permission_does_not_call_authorize_api_with_loaded_matrix(matrix, permissions_response, httpx_mock):
+    await matrix.refresh()
+    identity = {'role': 'member', 'realm_roles': ['test_project-contributor']}
+
+    assert await has_permission('test_project', 'file', 'greenroom', 'view', identity) is True
+    assert await has_permission('test_project', 'file', 'core', 'view', identity) is False
+    assert [request.url.path for request in httpx_mock.get_requests()] == ['/v1/permissions']
+
+
+@pytest.mark.asyncio
+async def test_refresh_all_workers_makes_other_workers_reload(matrix, redis, permissions_response, httpx_mock):
+    other = make_matrix(redis)
+    await other.refresh()
+
+    await matrix.refresh_all_workers()
+
+    assert await other.lookup('contributor', 'file', 'greenroom', 'view') is None
+    await other._background_refresh
+    assert await other.lookup('contributor', 'file', 'greenroom', 'view') is True
+    assert len(httpx_mock.get_requests()) == 3
@@ -0,0 +1,32 @@
+# Copyright (C) 2022 Indoc Research
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import pytest
+
+from services.permissions_service.utils import has_permissions_batch
+
+
+@pytest.mark.asyncio
+async def test_has_permissions_batch_evaluates_each_unique_check_once(mocker):
+    has_permission = mocker.patch(
+        'services.permissions_service.utils.has_permission',
+        side_effect=lambda project_code, resource, zone, operation, identity: zone == 'core',
+    )
+    checks = [('project', 'core', 'view')] * 500 + [('project', 'greenroom', 'view')] * 500
+
+    results = await has_permissions_batch('file', checks, {'role': 'member'})
+
+    assert results == {('project', 'core', 'view'): True, ('project', 'greenroom', 'view'): False}
+    assert has_permission.call_count == 2